@@ -62,13 +62,17 @@ from .tools import (
     update_investigation_plan_tool,
     run_bash_command,
     read_file_tool,
+    read_file_ranges_tool,
     search_code_tool,
+    find_references_tool,
     search_res_tool,
+    find_asset_dependencies_tool,
     get_git_log_tool,
     get_git_diff_tool,
     get_git_blame_tool,
     get_svn_log_tool,
-    get_svn_diff_tool
+    get_svn_diff_tool,
+    rank_suspect_commits_tool
 )
 
 from .tools.search_code import check_search_tools
@@ -314,13 +318,17 @@ bug_analyze_agent = VisualLlmAgent(
         update_investigation_plan_tool, 
         run_bash_command,
         read_file_tool,
+        read_file_ranges_tool,
         search_code_tool,
+        find_references_tool,
         search_res_tool,
+        find_asset_dependencies_tool,
         get_git_log_tool,
         get_git_diff_tool,
         get_git_blame_tool,
         get_svn_log_tool,
         get_svn_diff_tool,
+        rank_suspect_commits_tool,
         load_artifacts,
         analyze_skill_registry
     ],
@@ -1,9 +1,12 @@
 from .bash import run_bash_command
-from .file_reader import read_file_tool
+from .file_reader import read_file_tool, read_file_ranges_tool
 from .search_code import search_code_tool
+from .find_references import find_references_tool
 from .search_res import search_res_tool
+from .asset_deps import find_asset_dependencies_tool
 from .git import get_git_log_tool, get_git_diff_tool, get_git_blame_tool
 from .svn import get_svn_log_tool, get_svn_diff_tool, get_svn_blame_tool
+from .suspect_commits import rank_suspect_commits_tool
 from .utils import time_convert_tool
 from .plan import update_investigation_plan_tool
 
@@ -0,0 +1,145 @@
+
+import os
+import logging
+from pathlib import Path
+from google.adk.tools.tool_context import ToolContext
+from bug_sleuth.indexer.asset_index import AssetIndex
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+# Configure logging
+logger = logging.getLogger("AssetDependenciesTool")
+
+MAX_DEPTH = 5
+MAX_RESULTS = 200
+DIRECTIONS = ("dependents", "dependencies")
+
+
+def _walk(index: AssetIndex, roots: list, direction: str, depth: int) -> list:
+    """
+    Breadth-first walk of the dependency graph from the resolved roots.
+
+    Returns:
+        list: (level, path or None, asset_id or None) per reached node, in walk order.
+    """
+    found = []
+    seen = {path for _, path in roots}
+    frontier = roots
+    for level in range(1, depth + 1):
+        next_frontier = []
+        for asset_id, path in frontier:
+            if direction == "dependents":
+                if asset_id is None:
+                    continue
+                neighbours = [(source_id, source) for source, source_id in index.dependents(asset_id)]
+            else:
+                neighbours = [(target, target_path) for target, target_path in index.dependencies(path)]
+
+            for neighbour_id, neighbour_path in neighbours:
+                key = neighbour_path or neighbour_id
+                if key in seen:
+                    continue
+                seen.add(key)
+                found.append((level, neighbour_path, neighbour_id))
+                if neighbour_path is not None:
+                    next_frontier.append((neighbour_id, neighbour_path))
+                if len(found) >= MAX_RESULTS:
+                    return found
+        frontier = next_frontier
+    return found
+
+
+async def find_asset_dependencies_tool(
+    asset: str,
+    tool_context: ToolContext,
+    direction: str = "dependents",
+    depth: int = 1
+) -> dict:
+    """
+    查询 Unity / Unreal 资源的**依赖关系**。基于预构建的资源依赖索引 (GUID / 包名)，毫秒级返回。
+
+    **适用场景 (When to Use)**:
+    - 查找**哪些资源引用了**某个资源 (direction="dependents")
+      e.g., "哪些 Prefab/场景用到了这张贴图？" "哪些材质引用了这个 Shader？"
+    - 查找某个资源**引用了哪些**资源 (direction="dependencies")
+      e.g., "这个 Prefab 依赖哪些贴图、材质、动画？"
+    - depth > 1 时沿依赖链继续展开 (e.g., 贴图 -> 材质 -> Prefab -> 场景)
+
+    **限制 (Limitations)**:
+    - Unity 仅支持文本序列化 (Force Text) 的资源；Unreal 通过 .uasset/.umap 中的 /Game/... 包名解析
+    - 需要预先运行 `bug-sleuth index` 构建索引；索引不存在时请改用 search_code_tool 搜索 GUID
+    - 未解析的引用 (Unity 内置资源、其他仓库中的资源) 只显示 GUID/包名
+
+    Args:
+        asset: 资源标识，可以是文件路径 (e.g., "Assets/Textures/T_Hero.png" 或仅 "T_Hero.png")、
+               Unity GUID (32 位十六进制) 或 Unreal 包名 (e.g., "/Game/Characters/Hero/T_Hero_D")
+        direction: "dependents" (谁引用了它，默认) 或 "dependencies" (它引用了谁)
+        depth: 展开层数，1-5，默认 1
+
+    Returns:
+        dict: 依赖资源列表，每行带层级、路径和 GUID/包名
+    """
+    if not asset:
+        return {"status": "error", "error": "asset is required."}
+    if direction not in DIRECTIONS:
+        return {"status": "error", "error": f"direction must be one of {', '.join(DIRECTIONS)}."}
+    depth = max(1, min(int(depth or 1), MAX_DEPTH))
+
+    # 1. Identify Repositories
+    repo_registry = tool_context.state.get(StateKeys.REPO_REGISTRY, [])
+    repos = [str(Path(p).resolve()) for repo in repo_registry if (p := repo.get("path"))]
+
+    if not repos:
+        return {"status": "error", "summary": "No repositories configured."}
+
+    # 2. Resolve the asset and walk the graph in every indexed repository
+    output_lines = []
+    indexed = 0
+    resolved = 0
+    total = 0
+    for repo_path in repos:
+        index = AssetIndex(repo_path)
+        if not index.exists():
+            continue
+        indexed += 1
+
+        try:
+            roots = index.resolve(asset)
+            if not roots:
+                continue
+            found = _walk(index, roots, direction, depth)
+        except Exception as e:
+            logger.error(f"Error querying DB {index.db_path}: {e}")
+            continue
+
+        repo_name = os.path.basename(repo_path)
+        resolved += len(roots)
+        total += len(found)
+        for asset_id, path in roots:
+            output_lines.append(f"[{repo_name}] {path}" + (f" ({asset_id})" if asset_id else ""))
+        for level, path, asset_id in found:
+            arrow = "<-" if direction == "dependents" else "->"
+            label = path if path is not None else f"(unresolved) {asset_id}"
+            output_lines.append(f"{'  ' * level}{arrow} {label}")
+        if len(found) >= MAX_RESULTS:
+            output_lines.append(f"... (capped at {MAX_RESULTS} results, reduce depth)")
+
+    # 3. Format Output
+    if not indexed:
+        return {
+            "status": "error",
+            "error": "No asset index found. Run 'bug-sleuth index' or use search_code_tool to search for the GUID instead."
+        }
+
+    if not resolved:
+        return {
+            "status": "success",
+            "summary": f"Asset '{asset}' not found in the asset index."
+        }
+
+    what = "assets referencing" if direction == "dependents" else "assets referenced by"
+    summary = f"Found {total} {what} '{asset}' (depth {depth})."
+    return {
+        "status": "success",
+        "output": "\n".join([summary] + output_lines),
+        "summary": summary
+    }
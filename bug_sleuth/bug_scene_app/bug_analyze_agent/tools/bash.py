@@ -2,7 +2,88 @@ import asyncio
 import os
 import subprocess
 import logging
-from typing import Optional
+import threading
+from typing import Callable, List, Optional
+
+def decode_output(data: bytes) -> str:
+    """Decode process output: system locale, then UTF-8, then locale with replacement."""
+    if not data:
+        return ""
+    try:
+        # 1. Try system locale (e.g. cp936 on CN Windows)
+        import locale
+        return data.decode(locale.getpreferredencoding(), errors='strict')
+    except UnicodeDecodeError:
+        try:
+            # 2. Try UTF-8
+            return data.decode('utf-8', errors='strict')
+        except UnicodeDecodeError:
+            # 3. Fallback to system locale with replace
+            return data.decode(locale.getpreferredencoding(), errors='replace')
+
+async def stream_command(
+    args: List[str],
+    on_line: Callable[[str], bool],
+    cwd: Optional[str] = None,
+    encoding: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> dict:
+    """
+    Run a command (argv list, no shell) and feed its stdout to `on_line` one decoded line at a time.
+    When `on_line` returns False the process is killed, so callers can stop reading as soon as
+    they have enough output instead of buffering everything the command would print.
+
+    Lines are decoded with `encoding` (errors replaced) when given, e.g. "utf-8" for tools that
+    emit JSON; otherwise with the same locale/UTF-8 fallback as run_bash_command.
+
+    With `timeout` (seconds) the process is killed once it runs that long; the lines read until
+    then have already been delivered.
+
+    Returns:
+        dict: 'exit_code' (None if stopped early or timed out), 'stopped', 'timed_out', 'error' (stderr text).
+    """
+    def run_sync():
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
+        # Drain stderr concurrently so a chatty stderr cannot block the stdout reader
+        stderr_chunks = []
+        stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+        stderr_reader.start()
+
+        timed_out = threading.Event()
+        timer = None
+        if timeout:
+            def expire():
+                timed_out.set()
+                proc.kill()
+            timer = threading.Timer(timeout, expire)
+            timer.daemon = True
+            timer.start()
+
+        stopped = False
+        try:
+            for raw in proc.stdout:
+                raw = raw.rstrip(b"\r\n")
+                line = raw.decode(encoding, errors='replace') if encoding else decode_output(raw)
+                if not on_line(line):
+                    stopped = True
+                    break
+        finally:
+            if timer:
+                timer.cancel()
+            if stopped:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+            stderr_reader.join()
+
+        return {
+            "exit_code": None if stopped or timed_out.is_set() else proc.returncode,
+            "stopped": stopped,
+            "timed_out": timed_out.is_set(),
+            "error": decode_output(b"".join(c for c in stderr_chunks if c)).strip(),
+        }
+
+    return await asyncio.to_thread(run_sync)
 
 async def run_bash_command(command: str, cwd: Optional[str] = None) -> dict:
     """
@@ -61,22 +142,6 @@ async def run_bash_command(command: str, cwd: Optional[str] = None) -> dict:
         # Run blocking IO in a separate thread
         completed_process = await asyncio.to_thread(run_sync_cmd)
         
-        # Helper to decode with fallback
-        def decode_output(data: bytes) -> str:
-            if not data:
-                return ""
-            try:
-                # 1. Try system locale (e.g. cp936 on CN Windows)
-                import locale
-                return data.decode(locale.getpreferredencoding(), errors='strict')
-            except UnicodeDecodeError:
-                try:
-                    # 2. Try UTF-8
-                    return data.decode('utf-8', errors='strict')
-                except UnicodeDecodeError:
-                    # 3. Fallback to system locale with replace
-                    return data.decode(locale.getpreferredencoding(), errors='replace')
-
         output_str = decode_output(completed_process.stdout).strip()
         error_str = decode_output(completed_process.stderr).strip()
         
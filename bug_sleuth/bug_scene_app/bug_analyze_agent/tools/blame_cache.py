@@ -0,0 +1,261 @@
+"""
+Per-line blame cache for the git and svn blame tools.
+
+Blaming a file costs about the same for one line as for all of them (git walks the same history,
+and `svn blame` downloads every revision of the file from the server), so the first request for
+a file blames it whole and stores one attribution per line. Later requests for any line range of
+the same file are served from memory while the file's revision is unchanged. git blames the working
+copy, so its entries are keyed by path, HEAD and the file's mtime and size (local edits are never
+attributed from a stale blame); svn blames BASE, so its entries are keyed by path and the file's
+last-changed revision.
+
+`svn blame` is bounded with `-r 1:<last-changed revision>` and its `--xml` output is parsed
+incrementally while it streams; the line texts come from the local pristine copy (`svn cat -r
+BASE`), which needs no server round trip.
+"""
+import os
+import asyncio
+import logging
+import threading
+import subprocess
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import IO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from bug_sleuth.indexer.vcs import get_git_head
+from .text_encoding import decode_text, sniff_encoding
+
+logger = logging.getLogger(__name__)
+
+# Blamed files kept in memory.
+MAX_CACHED_BLAMES = 64
+# Seconds a blame command may run (svn blame of a long-lived file over a slow server is slow).
+BLAME_TIMEOUT = 300
+
+_CREATION_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+class BlameLine(NamedTuple):
+    revision: str   # Commit hash (git) or revision number (svn); all zeros for uncommitted git lines
+    author: str
+    date: str       # "2026-01-01 10:00:00 +0800"
+    text: str
+
+
+class _BlameCache:
+    """LRU of per-line blames keyed by path, valid while the entry's signature is unchanged."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_BLAMES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[tuple, List[BlameLine]]]" = OrderedDict()
+
+    def get(self, path: str, signature: tuple) -> Optional[List[BlameLine]]:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != signature:
+                return None
+            self._entries.move_to_end(path)
+            return entry[1]
+
+    def put(self, path: str, signature: tuple, lines: List[BlameLine]):
+        with self._lock:
+            self._entries[path] = (signature, lines)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _BlameCache()
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _format_date(timestamp: int, tz: str) -> str:
+    try:
+        sign = -1 if tz.startswith("-") else 1
+        offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])) * sign
+    except ValueError:
+        offset, tz = timedelta(0), "+0000"
+    return f"{datetime.fromtimestamp(timestamp, timezone(offset)):%Y-%m-%d %H:%M:%S} {tz}"
+
+
+def _decode_line(raw: bytes) -> str:
+    return decode_text(raw, "utf-8")[0]
+
+
+# ----------------------------------------------------------------------
+# git
+# ----------------------------------------------------------------------
+
+def parse_git_porcelain(data: bytes) -> List[BlameLine]:
+    """Lines of `git blame --porcelain` output, in file order."""
+    commits: Dict[str, Dict[str, str]] = {}
+    lines: List[BlameLine] = []
+    current: Optional[Dict[str, str]] = None
+    current_hash = ""
+    for raw in data.split(b"\n"):
+        if raw.startswith(b"\t"):
+            if current is not None:
+                date = _format_date(int(current.get("author-time", "0")), current.get("author-tz", "+0000"))
+                lines.append(BlameLine(current_hash, current.get("author", ""), date, _decode_line(raw[1:])))
+            continue
+        key, _, value = raw.partition(b" ")
+        key_text = key.decode("ascii", errors="replace")
+        if len(key_text) in (40, 64) and all(c in "0123456789abcdef" for c in key_text):
+            # "<hash> <original line> <final line> [<lines in group>]" starts every line
+            current_hash = key_text
+            current = commits.setdefault(key_text, {})
+        elif current is not None and key_text in ("author", "author-time", "author-tz"):
+            current[key_text] = value.decode("utf-8", errors="replace")
+    return lines
+
+
+async def git_blame(path: str, repo_root: str) -> List[BlameLine]:
+    """Per-line blame of a file's working copy (uncommitted lines included), cached per HEAD."""
+    key = os.path.abspath(path)
+    signature = (get_git_head(repo_root), *_file_signature(path))
+    lines = _cache.get(key, signature)
+    if lines is not None:
+        return lines
+
+    completed = await asyncio.to_thread(
+        subprocess.run,
+        ["git", "blame", "--porcelain", "--", path],
+        cwd=repo_root,
+        capture_output=True,
+        timeout=BLAME_TIMEOUT,
+        creationflags=_CREATION_FLAGS,
+    )
+    if completed.returncode != 0:
+        raise OSError(completed.stderr.decode("utf-8", errors="replace").strip() or f"git blame failed (rc={completed.returncode})")
+    lines = parse_git_porcelain(completed.stdout)
+    _cache.put(key, signature, lines)
+    return lines
+
+
+def format_git_blame(lines: List[BlameLine], start_line: int, end_line: int) -> str:
+    """Lines `start_line`..`end_line` in `git blame`'s default layout."""
+    selected = list(enumerate(lines, 1))[max(0, start_line - 1):max(0, end_line)]
+    if not selected:
+        return ""
+    author_width = max(len(line.author) for _, line in selected)
+    number_width = len(str(selected[-1][0]))
+    return "\n".join(
+        f"{line.revision[:8]} ({line.author:<{author_width}} {line.date} {number:>{number_width}}) {line.text}"
+        for number, line in selected
+    )
+
+
+# ----------------------------------------------------------------------
+# svn
+# ----------------------------------------------------------------------
+
+def iter_svn_blame_xml(stream: IO[bytes]) -> Iterator[Tuple[int, str, str, str]]:
+    """(line number, revision, author, date) of every `<entry>` of `svn blame --xml`, while it streams."""
+    for _, element in ET.iterparse(stream, events=("end",)):
+        if element.tag != "entry":
+            continue
+        commit = element.find("commit")
+        revision = author = date = ""
+        if commit is not None:
+            revision = commit.get("revision", "")
+            author = commit.findtext("author") or ""
+            date = commit.findtext("date") or ""
+        yield int(element.get("line-number", "0")), revision, author, date
+        element.clear()
+
+
+def _svn_date(value: str) -> str:
+    """svn's "2026-01-01T02:00:00.000000Z" in the blame date format (UTC)."""
+    try:
+        moment = datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return value
+    return f"{moment:%Y-%m-%d %H:%M:%S} +0000"
+
+
+def _svn_last_changed_revision(path: str) -> Optional[str]:
+    completed = subprocess.run(
+        ["svn", "info", "--xml", path], capture_output=True, creationflags=_CREATION_FLAGS
+    )
+    if completed.returncode != 0:
+        return None
+    try:
+        commit = ET.fromstring(completed.stdout).find("entry/commit")
+    except ET.ParseError:
+        return None
+    return commit.get("revision") if commit is not None else None
+
+
+def _svn_blame_sync(path: str, revision: str) -> List[BlameLine]:
+    cwd = os.path.dirname(path) or None
+    pristine = subprocess.run(
+        ["svn", "cat", "-r", "BASE", path], cwd=cwd, capture_output=True, creationflags=_CREATION_FLAGS
+    )
+    if pristine.returncode != 0:
+        raise OSError(pristine.stderr.decode("utf-8", errors="replace").strip() or "svn cat failed")
+    text, _ = decode_text(pristine.stdout, sniff_encoding(pristine.stdout, complete=True) or "utf-8")
+    # svn numbers lines by "\n" only; splitlines() would also break at \f, \x1c-\x1e, \x85, \u2028...
+    texts = [line[:-1] if line.endswith("\r") else line for line in text.split("\n")]
+
+    proc = subprocess.Popen(
+        ["svn", "blame", "--xml", "-r", f"1:{revision}", path],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        creationflags=_CREATION_FLAGS,
+    )
+    # Drained concurrently so auth/network warnings cannot fill the pipe and stall svn
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    stderr_reader.start()
+    timer = threading.Timer(BLAME_TIMEOUT, proc.kill)
+    timer.daemon = True
+    timer.start()
+    lines: List[BlameLine] = []
+    try:
+        for number, rev, author, date in iter_svn_blame_xml(proc.stdout):
+            line_text = texts[number - 1] if 0 < number <= len(texts) else ""
+            lines.append(BlameLine(rev, author, _svn_date(date), line_text))
+    except ET.ParseError:
+        pass  # Reported through the exit code below
+    finally:
+        timer.cancel()
+        proc.stdout.close()
+        proc.wait()
+        stderr_reader.join()
+    if proc.returncode != 0:
+        error = b"".join(c for c in stderr_chunks if c)
+        raise OSError(error.decode("utf-8", errors="replace").strip() or f"svn blame failed (rc={proc.returncode})")
+    return lines
+
+
+async def svn_blame(path: str) -> List[BlameLine]:
+    """Per-line blame of a file's BASE revision, cached per last-changed revision."""
+    key = os.path.abspath(path)
+    revision = await asyncio.to_thread(_svn_last_changed_revision, path)
+    if revision is None:
+        raise OSError(f"Not under version control: {path}")
+    signature = ("svn", revision)
+    lines = _cache.get(key, signature)
+    if lines is not None:
+        return lines
+
+    lines = await asyncio.to_thread(_svn_blame_sync, path, revision)
+    _cache.put(key, signature, lines)
+    return lines
+
+
+def format_svn_blame(lines: List[BlameLine], start_line: int, end_line: int) -> str:
+    """Lines `start_line`..`end_line` in `svn blame`'s default layout."""
+    selected = lines[max(0, start_line - 1):max(0, end_line)]
+    return "\n".join(f"{line.revision or '-':>6} {line.author or '-':>10} {line.text}" for line in selected)
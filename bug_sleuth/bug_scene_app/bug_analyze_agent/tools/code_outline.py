@@ -0,0 +1,165 @@
+"""
+Code outlines for read_code_tool: the class/method skeleton of a source file with line ranges.
+
+Symbols come from the symbol indexer's tree-sitter parsers (bug_sleuth.indexer.parsers) and are
+cached per file by path, mtime and size, so asking for the outline again (or after a full read
+was refused) does not re-parse. The outline is fitted to a token budget: types first, then
+methods/functions, then fields, each level added only while it fits.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+from bug_sleuth.indexer.parsers import Symbol, extract_symbols, get_language
+
+# Default budget for an outline, in tokens.
+OUTLINE_TOKEN_BUDGET = 4000
+# Rough size of a token in characters of source code.
+CHARS_PER_TOKEN = 4
+# Longest signature shown per symbol.
+MAX_SIGNATURE_CHARS = 160
+# Parsed files kept in memory.
+MAX_CACHED_OUTLINES = 32
+
+# Symbol types by outline level; anything not listed is on the last level.
+_LEVELS = (
+    {"namespace", "class", "struct", "interface", "record", "union", "enum", "table"},
+    {"method", "constructor", "function", "property", "delegate", "event", "macro", "typedef"},
+)
+# Lines skipped when looking for a symbol's signature (attributes, decorators, comments).
+_PREAMBLE_PREFIXES = ("[", "@", "//", "/*", "*")
+
+
+class OutlineEntry(NamedTuple):
+    start_line: int
+    end_line: int
+    type: str
+    signature: str
+    depth: int
+
+
+class _SymbolCache:
+    """LRU of parsed symbols keyed by path, valid while the file's (mtime, size) is unchanged."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_OUTLINES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], List[Symbol]]]" = OrderedDict()
+
+    def get(self, path: str, signature: Tuple[int, int]) -> Optional[List[Symbol]]:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != signature:
+                return None
+            self._entries.move_to_end(path)
+            return entry[1]
+
+    def put(self, path: str, signature: Tuple[int, int], symbols: List[Symbol]):
+        with self._lock:
+            self._entries[path] = (signature, symbols)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _SymbolCache()
+
+
+def supports_outline(path: str) -> bool:
+    """Whether the file type has a parser (and its grammar is installed)."""
+    return get_language(path) is not None
+
+
+def file_symbols(path: str, text: str) -> List[Symbol]:
+    """
+    Symbols declared in a file, parsed from its decoded `text` (re-encoded as UTF-8, so line
+    numbers hold for GBK / UTF-16 files too) and cached until the file changes.
+    """
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    symbols = _cache.get(key, signature)
+    if symbols is None:
+        symbols = extract_symbols(path, text.encode("utf-8"))
+        _cache.put(key, signature, symbols)
+    return symbols
+
+
+def _level(symbol_type: str) -> int:
+    for level, types in enumerate(_LEVELS):
+        if symbol_type in types:
+            return level
+    return len(_LEVELS)
+
+
+def _signature(lines: List[str], start_line: int, end_line: int) -> str:
+    """First line of the declaration itself, skipping attributes, decorators and comments."""
+    first = start_line - 1
+    last = min(end_line, len(lines))
+    for i in range(first, last):
+        text = lines[i].strip()
+        if text and not text.startswith(_PREAMBLE_PREFIXES):
+            break
+    else:
+        text = lines[first].strip() if first < len(lines) else ""
+    if len(text) > MAX_SIGNATURE_CHARS:
+        text = text[:MAX_SIGNATURE_CHARS] + "..."
+    return text
+
+
+def _format(entry: OutlineEntry) -> str:
+    return f"{'  ' * entry.depth}{entry.start_line}-{entry.end_line} {entry.type}: {entry.signature}"
+
+
+def _nest(symbols: List[Symbol], lines: List[str]) -> List[OutlineEntry]:
+    """Entries in file order, with depth = number of shown symbols enclosing each one."""
+    entries = []
+    open_ranges: List[int] = []  # end lines of the enclosing symbols
+    for s in sorted(symbols, key=lambda s: (s.start_line, -s.end_line)):
+        while open_ranges and open_ranges[-1] < s.start_line:
+            open_ranges.pop()
+        entries.append(OutlineEntry(s.start_line, s.end_line, s.type, _signature(lines, s.start_line, s.end_line), len(open_ranges)))
+        open_ranges.append(s.end_line)
+    return entries
+
+
+def build_outline(symbols: List[Symbol], lines: List[str], max_tokens: int = OUTLINE_TOKEN_BUDGET) -> Tuple[List[str], int]:
+    """
+    Outline lines ("start-end type: signature", indented by nesting) that fit `max_tokens`.
+
+    Levels (types, then members with bodies, then fields and the rest) are added whole while they
+    fit; the first level that does not fit is added in file order until the budget is spent.
+
+    Returns:
+        Tuple[List[str], int]: The outline lines and the number of symbols left out.
+    """
+    budget = max(1, max_tokens) * CHARS_PER_TOKEN
+    by_level: List[List[Symbol]] = [[] for _ in range(len(_LEVELS) + 1)]
+    for s in symbols:
+        by_level[_level(s.type)].append(s)
+
+    chosen: List[Symbol] = []
+    for level_symbols in by_level:
+        if not level_symbols:
+            continue
+        candidate = chosen + level_symbols
+        rendered = [_format(e) for e in _nest(candidate, lines)]
+        if sum(len(r) + 1 for r in rendered) <= budget:
+            chosen = candidate
+            continue
+        # Partial level: keep the earliest members of this level that still fit
+        used = sum(len(_format(e)) + 1 for e in _nest(chosen, lines))
+        for s in sorted(level_symbols, key=lambda s: s.start_line):
+            # Indentation is at most a few levels; estimate with the signature alone
+            cost = len(_signature(lines, s.start_line, s.end_line)) + len(s.type) + 24
+            if used + cost > budget:
+                break
+            chosen.append(s)
+            used += cost
+        break
+
+    return [_format(e) for e in _nest(chosen, lines)], len(symbols) - len(chosen)
@@ -0,0 +1,334 @@
+"""
+Size-aware diffs for get_git_diff_tool and get_svn_diff_tool.
+
+A raw diff cut at a fixed length loses every file after the first large one, typically a
+generated file or a serialized Unity asset. Diffs are therefore handled per file:
+
+1. Per-file line counts come first (`git diff --numstat`; for svn they are counted while the
+   diff streams).
+2. Files are ranked: source code, other text, generated/serialized files, binary files; smaller
+   changes first within a rank. git fetches hunks only for the files that can fit the budget.
+3. Hunks are added in that order until the character budget is spent. Hunks that only change
+   whitespace are collapsed to a count.
+
+Every changed file is listed with its counts and the new-side line ranges of its hunks, whether
+its text fitted or not, so follow-up reads (read_file_tool / a path-limited diff) are targeted.
+"""
+import os
+import re
+import fnmatch
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+# Characters of hunk text returned per diff call.
+DIFF_CHAR_BUDGET = 10000
+# Rough size of one changed line in a diff, used to pick the files worth fetching.
+CHARS_PER_DIFF_LINE = 80
+# Hunk text kept per file while parsing (the rest is only counted).
+MAX_FILE_DIFF_CHARS = 200_000
+# Files whose hunks are fetched in one command (keeps the command line short).
+MAX_FETCHED_FILES = 100
+# Smallest head of an oversized hunk worth returning.
+MIN_PARTIAL_HUNK_CHARS = 500
+
+_CUT_MARKER = "... (hunk cut, over budget)"
+
+_SOURCE_EXTENSIONS = {
+    ".cs", ".lua", ".c", ".cc", ".cpp", ".cxx", ".h", ".hh", ".hpp", ".hxx", ".inl", ".m", ".mm",
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".java", ".kt", ".go", ".rs", ".swift",
+    ".shader", ".hlsl", ".cginc", ".compute", ".glsl", ".usf", ".ush",
+}
+# Generated, serialized or lock files: hunks are shown last.
+_GENERATED_PATTERNS = (
+    "*.meta", "*.prefab", "*.unity", "*.asset", "*.mat", "*.anim", "*.controller", "*.overrideController",
+    "*.physicMaterial", "*.spriteatlas", "*.playable", "*.mask", "*.lighting",
+    "*.designer.cs", "*.g.cs", "*.generated.*", "*.pb.*", "*_pb2.py", "*.min.js", "*.map",
+    "*.csproj", "*.sln", "*.lock", "package-lock.json", "*/generated/*", "*/gen/*",
+)
+# Leading indentation is syntax here, so re-indenting a line is a real change.
+_INDENT_SENSITIVE_EXTENSIONS = {".py", ".yaml", ".yml"}
+_KIND_RANK = {"source": 0, "text": 1, "generated": 2, "binary": 3}
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class FileStat(NamedTuple):
+    path: str
+    added: int
+    deleted: int
+    binary: bool
+
+
+class Hunk(NamedTuple):
+    new_start: int
+    new_count: int
+    text: str               # Header and body lines
+    whitespace_only: bool
+
+
+class FileDiff(NamedTuple):
+    path: str
+    hunks: List[Hunk]
+    added: int
+    deleted: int
+    binary: bool
+    truncated: bool         # Text beyond MAX_FILE_DIFF_CHARS was counted but not kept
+
+
+def classify(path: str, binary: bool = False) -> str:
+    """'source', 'text', 'generated' or 'binary'."""
+    if binary:
+        return "binary"
+    lower = "/" + path.replace("\\", "/").lower()
+    name = lower.rsplit("/", 1)[-1]
+    if any(fnmatch.fnmatchcase(name, p.lower()) or fnmatch.fnmatchcase(lower, p.lower()) for p in _GENERATED_PATTERNS):
+        return "generated"
+    dot = name.rfind(".")
+    if dot > 0 and name[dot:] in _SOURCE_EXTENSIONS:
+        return "source"
+    return "text"
+
+
+def _priority(path: str, binary: bool, changed_lines: int) -> Tuple[int, int]:
+    return _KIND_RANK[classify(path, binary)], changed_lines
+
+
+def parse_numstat_z(output: str) -> List[FileStat]:
+    """`git diff --numstat -z --no-renames` output ("added\\tdeleted\\tpath\\0"; binary files show '-')."""
+    stats = []
+    for record in output.split("\0"):
+        parts = record.strip("\n").split("\t", 2)
+        if len(parts) != 3:
+            continue
+        added, deleted, path = parts
+        binary = added == "-" or deleted == "-"
+        stats.append(FileStat(path, 0 if binary else int(added), 0 if binary else int(deleted), binary))
+    return stats
+
+
+def select_files(stats: List[FileStat], budget: int = DIFF_CHAR_BUDGET) -> List[str]:
+    """Text files whose hunks are worth fetching, in priority order, while their estimated size fits."""
+    selected, estimate = [], 0
+    for stat in sorted(stats, key=lambda s: _priority(s.path, s.binary, s.added + s.deleted)):
+        if stat.binary:
+            continue
+        if len(selected) >= MAX_FETCHED_FILES:
+            break
+        cost = (stat.added + stat.deleted) * CHARS_PER_DIFF_LINE
+        # Always fetch the first file: even a part of it is better than nothing
+        if selected and estimate + cost > budget:
+            continue
+        selected.append(stat.path)
+        estimate += cost
+    return selected
+
+
+def _whitespace_only(body: List[str], path: str) -> bool:
+    """
+    Whether the hunk's removed and added lines are the same, in the same order, apart from runs of
+    whitespace and blank lines (indentation counts in indentation-sensitive files).
+    """
+    keep_indent = os.path.splitext(path.lower())[1] in _INDENT_SENSITIVE_EXTENSIONS
+
+    def normalized(sign: str) -> List[str]:
+        lines = []
+        for line in body:
+            if line[:1] != sign or not line[1:].strip():
+                continue
+            text = line[1:]
+            indent = text[:len(text) - len(text.lstrip())] if keep_indent else ""
+            lines.append(indent + " ".join(text.split()))
+        return lines
+
+    return any(line[:1] in ("+", "-") for line in body) and normalized("-") == normalized("+")
+
+
+class _FileBuilder:
+    def __init__(self, path: str):
+        self.path = path
+        self.hunks: List[Hunk] = []
+        self.added = self.deleted = 0
+        self.binary = False
+        self.truncated = False
+        self.kept = 0
+        self._header: Optional[Tuple[int, int, str]] = None
+        self._body: List[str] = []
+
+    def start_hunk(self, line: str) -> bool:
+        match = _HUNK_HEADER.match(line)
+        if not match:
+            return False
+        self.end_hunk()
+        self._header = (int(match.group(3)), int(match.group(4) if match.group(4) is not None else 1), line)
+        return True
+
+    def add_line(self, line: str):
+        if self._header is None:
+            return
+        if line.startswith("+"):
+            self.added += 1
+        elif line.startswith("-"):
+            self.deleted += 1
+        if self.kept + len(line) > MAX_FILE_DIFF_CHARS:
+            self.truncated = True
+        else:
+            self._body.append(line)
+            self.kept += len(line) + 1
+
+    def end_hunk(self):
+        if self._header is not None:
+            start, count, header = self._header
+            if self._body or not self.truncated:
+                text = "\n".join([header, *self._body])
+                self.hunks.append(Hunk(start, count, text, _whitespace_only(self._body, self.path)))
+        self._header, self._body = None, []
+
+    def build(self) -> FileDiff:
+        self.end_hunk()
+        return FileDiff(self.path, self.hunks, self.added, self.deleted, self.binary, self.truncated)
+
+
+class UnifiedDiffParser:
+    """
+    Incremental parser of `git diff` / `git show` or `svn diff` output: feed lines as they stream,
+    then `close()` returns the files. Keeps at most MAX_FILE_DIFF_CHARS of text per file (the
+    counts cover everything).
+    """
+
+    def __init__(self):
+        self.files: List[FileDiff] = []
+        self._current: Optional[_FileBuilder] = None
+        self._in_header = False
+        self._git = False
+
+    def _finish(self):
+        if self._current is not None:
+            self.files.append(self._current.build())
+            self._current = None
+
+    def feed(self, line: str) -> bool:
+        """Consume one line (without its newline). Always returns True (stream_command callback)."""
+        if line.startswith("diff --git ") or line.startswith("Index: "):
+            self._finish()
+            # git: "diff --git a/P b/P" (refined from the +++/--- lines); svn: "Index: P"
+            self._git = line.startswith("diff --git ")
+            path = line.split(" b/", 1)[-1] if self._git else line[len("Index: "):]
+            self._current, self._in_header = _FileBuilder(path.strip()), True
+            return True
+        current = self._current
+        if current is None:
+            return True
+        if line.startswith("Property changes on: "):
+            # svn property section: not part of the file's text diff
+            self._finish()
+            return True
+        if self._in_header:
+            if line.startswith("+++ "):
+                name = line[4:].split("\t", 1)[0]
+                if name != "/dev/null":
+                    current.path = name[2:] if self._git and name[:2] in ("a/", "b/") else name
+            elif line.startswith("Binary files ") or line.startswith("Cannot display: file marked as a binary type"):
+                current.binary = True
+            elif current.start_hunk(line):
+                self._in_header = False
+            return True
+        if not current.start_hunk(line):
+            current.add_line(line)
+        return True
+
+    def close(self) -> List[FileDiff]:
+        self._finish()
+        return self.files
+
+
+def parse_unified_diff(lines: Iterable[str]) -> List[FileDiff]:
+    """Parse a whole diff (see UnifiedDiffParser)."""
+    parser = UnifiedDiffParser()
+    for line in lines:
+        parser.feed(line)
+    return parser.close()
+
+
+def _range(hunk: Hunk) -> str:
+    if hunk.new_count == 0:
+        return f"{hunk.new_start} (deleted lines)"
+    return f"{hunk.new_start}-{hunk.new_start + hunk.new_count - 1}"
+
+
+def render_diff(
+    diffs: List[FileDiff],
+    stats: Optional[List[FileStat]] = None,
+    budget: int = DIFF_CHAR_BUDGET,
+) -> dict:
+    """
+    Per-file entries and the budgeted diff text for a tool result.
+
+    Args:
+        diffs: Parsed hunks (possibly of only some of the files).
+        stats: Counts for every changed file when they came separately (git numstat); files
+            without parsed hunks are then listed with their counts only.
+        budget: Characters of hunk text to return.
+
+    Returns:
+        dict: {"files": [...], "diff": str, "summary": str}
+    """
+    parsed = {d.path: d for d in diffs}
+    if stats is None:
+        stats = [FileStat(d.path, d.added, d.deleted, d.binary) for d in diffs]
+
+    ordered = sorted(stats, key=lambda s: _priority(s.path, s.binary, s.added + s.deleted))
+    entries, sections = [], []
+    used = shown_files = 0
+    for stat in ordered:
+        kind = classify(stat.path, stat.binary)
+        entry = {"path": stat.path, "kind": kind, "added": stat.added, "deleted": stat.deleted}
+        entries.append(entry)
+        diff = parsed.get(stat.path)
+        if kind == "binary":
+            entry["note"] = "binary file"
+            continue
+        if diff is None:
+            entry["note"] = "hunks not shown (over budget); diff this path alone to see them"
+            continue
+
+        entry["hunks"] = [_range(h) for h in diff.hunks]
+        code_hunks = [h for h in diff.hunks if not h.whitespace_only]
+        whitespace = len(diff.hunks) - len(code_hunks)
+        if whitespace:
+            entry["whitespace_only_hunks"] = whitespace
+        if not code_hunks:
+            entry["note"] = "whitespace-only changes" if whitespace else "no text changes"
+            continue
+
+        header = f"=== {stat.path} ({kind}, +{stat.added} -{stat.deleted})"
+        shown: List[str] = []
+        cut = False
+        for hunk in code_hunks:
+            cost = len(hunk.text) + 1 + (0 if shown else len(header) + 3)
+            if used + cost > budget:
+                # A hunk larger than what is left: show its head if that is still worth reading
+                room = budget - used - (0 if shown else len(header) + 3) - len(_CUT_MARKER) - 1
+                if room >= MIN_PARTIAL_HUNK_CHARS:
+                    head = hunk.text[:room].rsplit("\n", 1)[0]
+                    shown.append(f"{head}\n{_CUT_MARKER}")
+                    used = budget
+                    cut = True
+                break
+            shown.append(hunk.text)
+            used += cost
+        if shown:
+            sections.append("\n".join([header, *shown]))
+            shown_files += 1
+        omitted = len(code_hunks) - len(shown)
+        if cut:
+            entry["note"] = f"hunk at {_range(code_hunks[len(shown) - 1])} cut, {omitted} more not shown (over budget); read the file for the rest"
+        elif omitted:
+            entry["note"] = f"{omitted} of {len(code_hunks)} hunks not shown (over budget); diff this path alone to see them"
+        elif diff.truncated:
+            entry["note"] = f"diff text cut after {MAX_FILE_DIFF_CHARS} characters"
+
+    added = sum(s.added for s in stats)
+    deleted = sum(s.deleted for s in stats)
+    summary = f"{len(stats)} files changed (+{added} -{deleted}); hunks shown for {shown_files} files"
+    if shown_files < len([e for e in entries if e["kind"] != "binary"]):
+        summary += f" within the {budget}-character budget, see 'files' for the rest"
+    return {"files": entries, "diff": "\n\n".join(sections), "summary": summary}
@@ -0,0 +1,262 @@
+"""
+Directory listing for read_file_tool: two levels of entries with per-directory file counts and sizes.
+
+The tree is scanned breadth-first with os.scandir. Entries excluded by .gitignore (one batched
+`git check-ignore` per level) or by svn:ignore / svn:global-ignores are skipped, as are hidden
+entries, so the generated folders of a Unity project (Library/, Temp/, obj/ ...) are neither
+walked nor listed. Below the two displayed levels the scan only aggregates counts and sizes, and
+stops after MAX_SCANNED_ENTRIES entries (totals are then marked as lower bounds).
+"""
+import os
+import fnmatch
+import logging
+import subprocess
+import xml.etree.ElementTree as ET
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from bug_sleuth.indexer.vcs import get_working_copy_marker
+
+logger = logging.getLogger(__name__)
+
+# Directory levels shown (the root's entries and those of its subdirectories).
+LIST_DEPTH = 2
+# Entries shown per directory; the rest are summarised.
+MAX_ENTRIES_PER_DIR = 50
+# Ignored entry names mentioned per directory.
+MAX_IGNORED_SHOWN = 5
+# Entries examined in total before the aggregates are cut short.
+MAX_SCANNED_ENTRIES = 200_000
+
+
+class _Dir(NamedTuple):
+    dirs: List[str]                 # Visible subdirectory names
+    files: List[Tuple[str, int]]    # Visible (file name, size)
+    ignored: List[str]              # Ignored entry names (directories end with '/')
+
+
+class _IgnoreRules:
+    """Batched ignore checks for paths relative to the listed directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._git = True  # Until git says the directory is not in a work tree
+        self._svn_ignores: Optional[Dict[str, List[str]]] = None
+        self._svn_global: Dict[str, List[str]] = {}
+        if get_working_copy_marker(root, "svn") is not None:
+            self._load_svn()
+
+    def _load_svn(self):
+        """svn:ignore (per directory) and svn:global-ignores (inherited) of the working copy."""
+        try:
+            completed = subprocess.run(
+                ["svn", "proplist", "-R", "-v", "--xml", "."], cwd=self.root, capture_output=True
+            )
+        except OSError as e:
+            logger.warning(f"svn proplist failed in {self.root}: {e}")
+            return
+        if completed.returncode != 0:
+            return
+        try:
+            tree = ET.fromstring(completed.stdout)
+        except ET.ParseError:
+            return
+
+        self._svn_ignores = {}
+        for target in tree.iter("target"):
+            rel = os.path.relpath(os.path.join(self.root, target.get("path", ".")), self.root)
+            rel = "" if rel == "." else rel.replace(os.sep, "/")
+            for prop in target.iter("property"):
+                patterns = [p.strip() for p in (prop.text or "").splitlines() if p.strip()]
+                if prop.get("name") == "svn:ignore":
+                    self._svn_ignores[rel] = patterns
+                elif prop.get("name") == "svn:global-ignores":
+                    self._svn_global[rel] = patterns
+
+    def _svn_patterns(self, rel_dir: str) -> List[str]:
+        patterns = list(self._svn_ignores.get(rel_dir, []))
+        parts = rel_dir.split("/") if rel_dir else []
+        for i in range(len(parts) + 1):
+            patterns.extend(self._svn_global.get("/".join(parts[:i]), []))
+        return patterns
+
+    def _git_ignored(self, rel_paths: List[str]) -> Set[str]:
+        try:
+            completed = subprocess.run(
+                ["git", "check-ignore", "-z", "--stdin"],
+                input="\0".join(rel_paths).encode("utf-8", errors="surrogateescape"),
+                cwd=self.root,
+                capture_output=True,
+            )
+        except OSError as e:
+            logger.warning(f"git check-ignore failed in {self.root}: {e}")
+            self._git = False
+            return set()
+        if completed.returncode not in (0, 1):
+            # 128: not inside a git work tree (rc=1 means nothing is ignored)
+            self._git = False
+            return set()
+        return {p for p in completed.stdout.decode("utf-8", errors="surrogateescape").split("\0") if p}
+
+    def ignored(self, rel_paths: List[str]) -> Set[str]:
+        """The subset of `rel_paths` (directories end with '/') that is ignored."""
+        if not rel_paths:
+            return set()
+        result = self._git_ignored(rel_paths) if self._git else set()
+        if self._svn_ignores is not None:
+            for rel in rel_paths:
+                parent, _, name = rel.rstrip("/").rpartition("/")
+                if any(fnmatch.fnmatchcase(name, p) for p in self._svn_patterns(parent)):
+                    result.add(rel)
+        return result
+
+
+class DirectoryScan(NamedTuple):
+    listed: Dict[str, _Dir]                   # Entries of the displayed directories ('' = root)
+    totals: Dict[str, List[int]]              # Displayed subdirectory -> [files, bytes] of its subtree
+    total_files: int
+    total_dirs: int
+    total_bytes: int
+    complete: bool                            # False if MAX_SCANNED_ENTRIES cut the scan short
+
+
+def scan_directory(root: str, max_entries: int = MAX_SCANNED_ENTRIES) -> DirectoryScan:
+    """Breadth-first scan of `root` honouring ignore rules (see module docstring)."""
+    rules = _IgnoreRules(root)
+    listed: Dict[str, _Dir] = {}
+    totals: Dict[str, List[int]] = {}
+    total_files = total_dirs = total_bytes = scanned = 0
+    complete = True
+
+    level, depth = [""], 0
+    while level:
+        files: List[Tuple[str, int]] = []
+        subdirs: List[str] = []
+        for rel_dir in level:
+            if scanned >= max_entries:
+                complete = False
+                break
+            try:
+                with os.scandir(os.path.join(root, rel_dir)) as entries:
+                    for entry in entries:
+                        if entry.name.startswith("."):
+                            continue
+                        scanned += 1
+                        rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(rel)
+                            else:
+                                files.append((rel, entry.stat(follow_symlinks=False).st_size))
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+        ignored = rules.ignored([f for f, _ in files] + [d + "/" for d in subdirs])
+        if depth < LIST_DEPTH:
+            for rel_dir in level:
+                listed[rel_dir] = _Dir([], [], [])
+            for rel in sorted(ignored):
+                parent, _, name = rel.rstrip("/").rpartition("/")
+                listed[parent].ignored.append(name + ("/" if rel.endswith("/") else ""))
+
+        next_level = []
+        for rel in subdirs:
+            if rel + "/" in ignored:
+                continue
+            total_dirs += 1
+            next_level.append(rel)
+            if depth < LIST_DEPTH:
+                parent, _, name = rel.rpartition("/")
+                listed[parent].dirs.append(name)
+                totals[rel] = [0, 0]
+        for rel, size in files:
+            if rel in ignored:
+                continue
+            total_files += 1
+            total_bytes += size
+            parent, _, name = rel.rpartition("/")
+            if depth < LIST_DEPTH:
+                listed[parent].files.append((name, size))
+            # Count the file in its displayed ancestors
+            parts = rel.split("/")
+            for i in range(1, min(len(parts), LIST_DEPTH + 1)):
+                bucket = totals.get("/".join(parts[:i]))
+                if bucket is not None:
+                    bucket[0] += 1
+                    bucket[1] += size
+
+        level = next_level
+        depth += 1
+
+    return DirectoryScan(listed, totals, total_files, total_dirs, total_bytes, complete)
+
+
+def format_size(size: int) -> str:
+    """Human readable byte count (1024-based)."""
+    if size < 1024:
+        return f"{size} B"
+    value = size / 1024
+    for unit in ("KB", "MB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+def _shown_dirs(entry: _Dir) -> List[str]:
+    return sorted(entry.dirs, key=str.lower)[:MAX_ENTRIES_PER_DIR]
+
+
+def _format_dir(scan: DirectoryScan, rel_dir: str, indent: str) -> List[str]:
+    entry = scan.listed[rel_dir]
+    more = "" if scan.complete else "+"
+    lines = []
+    dirs = entry.dirs
+    files = sorted(entry.files, key=lambda f: f[0].lower())
+
+    shown_dirs = _shown_dirs(entry)
+    shown_files = files[:max(0, MAX_ENTRIES_PER_DIR - len(shown_dirs))]
+    for name in shown_dirs:
+        count, size = scan.totals[f"{rel_dir}/{name}" if rel_dir else name]
+        lines.append(f"{indent}{name}/  ({count}{more} files, {format_size(size)}{more})")
+    for name, size in shown_files:
+        lines.append(f"{indent}{name}  ({format_size(size)})")
+
+    rest_dirs = len(dirs) - len(shown_dirs)
+    rest_files = files[len(shown_files):]
+    if rest_dirs or rest_files:
+        parts = []
+        if rest_dirs:
+            parts.append(f"{rest_dirs} more directories")
+        if rest_files:
+            parts.append(f"{len(rest_files)} more files ({format_size(sum(s for _, s in rest_files))})")
+        lines.append(f"{indent}... {', '.join(parts)}")
+    if entry.ignored:
+        names = ", ".join(entry.ignored[:MAX_IGNORED_SHOWN])
+        if len(entry.ignored) > MAX_IGNORED_SHOWN:
+            names += f", ... ({len(entry.ignored)} in total)"
+        lines.append(f"{indent}(ignored: {names})")
+    return lines
+
+
+def list_directory(path: str) -> dict:
+    """Listing of `path` for read_file_tool (tool result dict)."""
+    scan = scan_directory(path)
+    output = [f"Directory listing for {path}:"]
+    output.extend(_format_dir(scan, "", "  "))
+    for rel_dir in _shown_dirs(scan.listed[""]):
+        output.append(f"\n[{rel_dir}]")
+        output.extend(_format_dir(scan, rel_dir, "  "))
+
+    more = "" if scan.complete else "+"
+    summary = (
+        f"Listed {path}: {scan.total_files}{more} files in {scan.total_dirs}{more} directories, "
+        f"{format_size(scan.total_bytes)}{more} in total"
+    )
+    if not scan.complete:
+        summary += f" (scan stopped after {MAX_SCANNED_ENTRIES} entries)"
+    return {
+        "status": "success",
+        "output": "\n".join(output),
+        "summary": summary
+    }
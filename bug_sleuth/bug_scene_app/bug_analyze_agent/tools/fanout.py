@@ -0,0 +1,58 @@
+"""
+Helpers for tools that search every configured repository.
+
+Each repository is searched by its own process, concurrently, with its own timeout. The
+per-repository results are then ranked together and cut to one output budget in which every
+repository is first guaranteed an equal share, so a slow or very large repository can no longer
+crowd the others out of the results.
+"""
+import os
+from typing import List, Optional, Sequence, Tuple
+
+# Wall-clock limit for one repository's search; results found before it expires are kept.
+REPO_SEARCH_TIMEOUT = 30
+
+
+def file_mtime(path: str) -> float:
+    """Modification time of `path`, or 0 when it cannot be read (ranks last among recent files)."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def select_ranked(
+    ranked: Sequence[Tuple[int, int, int]],
+    repo_count: int,
+    max_items: int,
+    max_chars: Optional[int] = None,
+) -> List[Tuple[int, int]]:
+    """
+    Choose how much of each entry of `ranked` (best first; each `(repo_index, items, chars)`)
+    fits a global budget of `max_items` and, when given, `max_chars`.
+
+    The first pass gives each repository up to an equal share of `max_items`; the second pass
+    hands what is left of the budget to the best remaining items, whichever repository they
+    come from. An entry may be taken partially; its chars are charged pro rata.
+
+    Returns:
+        List[Tuple[int, int]]: `(index into ranked, items taken)` for every chosen entry, in rank order.
+    """
+    share = max(1, max_items // max(1, repo_count))
+    used = [0] * repo_count
+    taken = [0] * len(ranked)
+    items = chars = 0
+    for fair_share in (True, False):
+        for i, (repo, n, cost) in enumerate(ranked):
+            take = min(n - taken[i], max_items - items)
+            if fair_share:
+                take = min(take, share - used[repo])
+            if max_chars is not None and cost and n:
+                take = min(take, (max_chars - chars) * n // cost)
+            if take <= 0:
+                continue
+            taken[i] += take
+            used[repo] += take
+            items += take
+            chars += cost * take // n if n else 0
+    return [(i, t) for i, t in enumerate(taken) if t]
@@ -1,8 +1,19 @@
-import os
+import asyncio
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Optional
-from .decorators import validate_path
+from typing import Dict, List, Optional, Tuple
+from .decorators import _resolve_and_check, validate_path
+from .dir_listing import list_directory
+from .code_outline import OUTLINE_TOKEN_BUDGET, build_outline, file_symbols, supports_outline
+from .line_index import read_text_range
+from .text_encoding import decode_text, detect_file_encoding
 from google.adk.tools.tool_context import ToolContext
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+# Ranges accepted by one read_file_ranges_tool call.
+MAX_BATCH_RANGES = 30
+# Default character budget of a read_file_ranges_tool response.
+MAX_BATCH_CHARS = 60000
 
 @validate_path
 async def read_file_tool(
@@ -21,8 +32,9 @@ async def read_file_tool(
     - 仅在需要查看 Imports 或完整文件结构时才完整读取
     
     **支持的操作**:
-    - 读取文件: 支持按行号范围读取片段
-    - 列出目录: 当 path 是目录时，返回目录列表（深度限制 2 层）
+    - 读取文件: 支持按行号范围读取片段；自动识别 UTF-8 / GBK / UTF-16 编码
+    - 列出目录: 当 path 是目录时，返回目录列表（深度限制 2 层），附各子目录的文件数和大小；
+      遵循 .gitignore / svn:ignore，跳过 Library/、Temp/ 等生成目录
 
     Args:
         path: 文件或目录的**绝对路径**
@@ -46,98 +58,234 @@ async def read_file_tool(
     if _path.is_dir():
         if start_line or end_line:
              return {"status": "error", "error": "Line range not allowed for directories."}
-        return _handle_dir_list(_path)
+        return await asyncio.to_thread(_handle_dir_list, _path)
 
-    # File Reading
+    # File Reading: only the requested lines are read (line offsets and encoding are cached per file)
     try:
-        content = _path.read_text(encoding='utf-8')
-    except UnicodeDecodeError:
-        return {"status": "error", "error": "File is not valid UTF-8 text."}
+        text_range = read_text_range(str(_path), start_line, end_line)
     except Exception as e:
         return {"status": "error", "error": f"Error reading file: {e}"}
 
-    lines = content.splitlines()
-    total_lines = len(lines)
-    
-    _start = 1
-    _end = total_lines
-    
-    if start_line is not None:
-        _start = start_line
-    if end_line is not None:
-        _end = end_line
-        
-    if _end == -1: _end = total_lines
-    
-    if _start < 1: _start = 1
-    if _end > total_lines: _end = total_lines
+    if text_range.encoding is None:
+        return {"status": "error", "error": f"File appears to be binary: {path}"}
+
+    _start, _end = text_range.first, text_range.last
     if _end < _start:
         return {"status": "error", "error": f"Invalid range: end_line {_end} < start_line {_start}"}
 
-    selected_lines = lines[_start-1 : _end]
-    
-    formatted_output = []
-    for i, line in enumerate(selected_lines):
-        line_num = _start + i
-        formatted_output.append(f"{line_num:6}\t{line}")
-        
-    final_output = "\n".join(formatted_output)
+    selected_lines = text_range.lines
+    final_output = "\n".join(_number_lines(_start, selected_lines))
     summary_text = f"Read {len(selected_lines)} lines from {path} (lines { _start}-{_end})"
+    summary_text += _encoding_note(text_range.encoding, text_range.lossy)
     return {
         "status": "success", 
         "output": f"File: {path}\n{final_output}",
         "summary": summary_text
     }
 
+def _number_lines(start: int, lines: List[str]) -> List[str]:
+    return [f"{start + i:6}\t{line}" for i, line in enumerate(lines)]
+
+def merge_line_ranges(ranges: List[Tuple[int, Optional[int]]]) -> List[Tuple[int, Optional[int]]]:
+    """
+    Merge overlapping or adjacent (start, end) line ranges (end None = end of file), sorted by start.
+    """
+    merged: List[Tuple[int, Optional[int]]] = []
+    for start, end in sorted(ranges, key=lambda r: r[0]):
+        if merged:
+            prev_start, prev_end = merged[-1]
+            if prev_end is None:
+                continue
+            if start <= prev_end + 1:
+                merged[-1] = (prev_start, None if end is None else max(prev_end, end))
+                continue
+        merged.append((start, end))
+    return merged
+
+async def read_file_ranges_tool(
+    ranges: List[dict],
+    tool_context: ToolContext,
+    max_chars: int = MAX_BATCH_CHARS
+) -> dict:
+    """
+    **批量**读取多个文件片段，一次调用代替多次 read_file_tool。
+
+    **适用场景 (When to Use)**:
+    - 搜索结果中有多个值得查看的位置 (不同文件或同一文件的多处)，一次性读取全部片段
+    - 同一文件中重叠或相邻的范围会自动合并，不会重复返回
+
+    **限制 (Limitations)**:
+    - 每次最多 30 个范围；总输出受 max_chars 限制，超出部分会列出未读取的范围，可再次请求
+    - 不支持目录 (请使用 read_file_tool 列出目录)
+
+    Args:
+        ranges: 片段列表，每项为 {"path": 文件路径, "start_line": 起始行号 (可选), "end_line": 结束行号 (可选)}
+                e.g., [{"path": "Assets/Scripts/BattleManager.cs", "start_line": 120, "end_line": 180},
+                       {"path": "Assets/Scripts/Hero.cs", "start_line": 40, "end_line": 60}]
+        max_chars: 输出字符上限，默认 60000
+
+    Returns:
+        dict: 按文件分组的片段内容 (带行号)
+    """
+    if not ranges:
+        return {"status": "error", "error": "ranges is required."}
+    if len(ranges) > MAX_BATCH_RANGES:
+        return {"status": "error", "error": f"Too many ranges ({len(ranges)}). Limit is {MAX_BATCH_RANGES} per call."}
+
+    repos = tool_context.state.get(StateKeys.REPO_REGISTRY, [])
+    if not repos:
+        return {"status": "error", "error": "REPOSITORIES not configured in environment or context."}
+
+    # 1. Validate and group by file (first-mentioned file first)
+    errors: List[str] = []
+    by_path: "OrderedDict[str, List[Tuple[int, Optional[int]]]]" = OrderedDict()
+    for item in ranges:
+        if not isinstance(item, dict) or not item.get("path"):
+            errors.append(f"Invalid range {item!r}: 'path' is required.")
+            continue
+        try:
+            start = max(1, int(item.get("start_line") or 1))
+            end = item.get("end_line")
+            end = None if end is None or int(end) == -1 else int(end)
+        except (TypeError, ValueError):
+            errors.append(f"Invalid line numbers in {item!r}.")
+            continue
+        if end is not None and end < start:
+            errors.append(f"Invalid range for {item['path']}: end_line {end} < start_line {start}")
+            continue
+        resolved = _resolve_and_check(item["path"], repos)
+        if isinstance(resolved, dict):
+            errors.append(resolved["error"])
+            continue
+        by_path.setdefault(str(resolved), []).append((start, end))
+
+    # 2. Read the merged ranges concurrently (thread pool)
+    jobs = [(path, start, end) for path, path_ranges in by_path.items() for start, end in merge_line_ranges(path_ranges)]
+    results = await asyncio.gather(
+        *(asyncio.to_thread(read_text_range, path, start, end) for path, start, end in jobs),
+        return_exceptions=True
+    )
+
+    # 3. Assemble within the character budget
+    budget = max_chars or MAX_BATCH_CHARS
+    used = 0
+    blocks: List[str] = []
+    skipped: List[str] = []
+    lines_read = 0
+    files_read = set()
+    for (path, start, end), result in zip(jobs, results):
+        if isinstance(result, BaseException):
+            reason = "is a directory" if isinstance(result, IsADirectoryError) else str(result)
+            errors.append(f"Error reading {path}: {reason}")
+            continue
+        if result.encoding is None:
+            errors.append(f"File appears to be binary: {path}")
+            continue
+        if result.last < result.first:
+            errors.append(f"{path}: line {start} is past the end of the file ({result.total_lines} lines)")
+            continue
+        if used >= budget:
+            skipped.append(f"{path}:{result.first}-{result.last}")
+            continue
+
+        numbered = _number_lines(result.first, result.lines)
+        taken = []
+        for line in numbered:
+            if used + len(line) + 1 > budget:
+                break
+            taken.append(line)
+            used += len(line) + 1
+        if not taken:
+            skipped.append(f"{path}:{result.first}-{result.last}")
+            used = budget
+            continue
+        last = result.first + len(taken) - 1
+        header = f"File: {path} (lines {result.first}-{last})" + _encoding_note(result.encoding, result.lossy)
+        blocks.append(header + "\n" + "\n".join(taken))
+        used += len(header) + 2
+        lines_read += len(taken)
+        files_read.add(path)
+        if last < result.last:
+            skipped.append(f"{path}:{last + 1}-{result.last}")
+            used = budget
+
+    # 4. Format Output
+    summary = f"Read {lines_read} lines in {len(blocks)} ranges from {len(files_read)} files"
+    if len(jobs) < sum(len(r) for r in by_path.values()):
+        summary += " (overlapping ranges merged)"
+    output = blocks[:]
+    if skipped:
+        summary += f"; {len(skipped)} ranges not read (max_chars {budget} reached)"
+        output.append("Not read (character budget reached), request again if needed:\n" + "\n".join(f"  {s}" for s in skipped))
+    if errors:
+        output.append("Errors:\n" + "\n".join(f"  {e}" for e in errors))
+    if not blocks and not skipped:
+        return {"status": "error", "error": "\n".join(errors) or "Nothing to read."}
+
+    return {
+        "status": "success",
+        "output": "\n\n".join(output),
+        "summary": summary
+    }
+
+def _encoding_note(encoding: str, lossy: bool) -> str:
+    """Summary suffix for files that are not plain UTF-8."""
+    note = ""
+    if encoding not in ("utf-8", "utf-8-sig"):
+        note += f" [encoding: {encoding}]"
+    if lossy:
+        note += " [some bytes could not be decoded and were replaced]"
+    return note
+
+def _outline_result(path: str, content: str, symbols: list, max_tokens: int, too_large: bool) -> dict:
+    lines = content.split("\n")
+    outline_lines, omitted = build_outline(symbols, lines, max_tokens or OUTLINE_TOKEN_BUDGET)
+    line_count = len(content.splitlines())
+
+    output = [f"Code Outline: {path} ({line_count} lines, {len(content)} chars)"]
+    if too_large:
+        output.append("File is too large for a full read; showing its outline (start-end type: signature).")
+    output.extend(outline_lines)
+    if omitted:
+        output.append(f"... ({omitted} more symbols omitted; raise max_tokens or read a class range for its members)")
+    output.append("Use read_file_tool(path, start_line, end_line) to read a range.")
+
+    return {
+        "status": "success",
+        "output": "\n".join(output),
+        "summary": f"Outline of {path}: {len(outline_lines)} of {len(symbols)} symbols ({line_count} lines)"
+    }
+
 def _handle_dir_list(path: Path) -> dict:
     try:
-        output = []
-        output.append(f"Directory listing for {path}:")
-        root_depth = len(path.parts)
-        for root, dirs, files in os.walk(path):
-            current_depth = len(Path(root).parts)
-            if current_depth - root_depth >= 2:
-                del dirs[:] 
-                continue
-            
-            # Filter hidden
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
-            files = [f for f in files if not f.startswith('.')]
-            
-            rel_path = os.path.relpath(root, path)
-            if rel_path == ".":
-                rel_path = ""
-            else:
-                output.append(f"\n[{rel_path}]")
-            
-            for d in dirs:
-                output.append(f"  {d}/")
-            for f in files:
-                output.append(f"  {f}")
-                
-        summary_text = f"Listed {len(files)} files and {len(dirs)} directories in {path}"
-        return {
-            "status": "success", 
-            "output": "\n".join(output),
-            "summary": summary_text
-        }
+        return list_directory(str(path))
     except Exception as e:
         return {"status": "error", "error": f"Error listing directory: {e}"}
 
 @validate_path
 async def read_code_tool(
     path: str,
-    tool_context: ToolContext
+    tool_context: ToolContext,
+    outline: bool = False,
+    max_tokens: int = OUTLINE_TOKEN_BUDGET
 ) -> dict:
     """
     Read a CODE file completely to understand full context.
     Use this for .cs, .py, .cpp, .lua, etc.
+    The encoding (UTF-8, GBK, UTF-16) is detected automatically.
+
+    Files over 100k chars (large manager classes) return an OUTLINE instead: the class/method
+    skeleton with line ranges and signatures. Then use read_file_tool(path, start_line, end_line)
+    to read just the method you need.
     
     Args:
         path: Absolute path to the code file.
+        outline: Return the outline even for small files (cheap first look at a big class).
+        max_tokens: Token budget for the outline (default 4000). Types come first, then
+            methods, then fields.
         
     Returns:
-        dict: Full file content.
+        dict: Full file content, or its outline.
     """
     MAX_CHARS = 100000  # 100k chars limit (~20k-30k tokens)
     
@@ -155,10 +303,20 @@ async def read_code_tool(
          return {"status": "error", "error": f"Path is a directory, not a file: {path}. Use list_dir_tool."}
 
     try:
-        # Read text
-        content = _path.read_text(encoding='utf-8')
+        # Read text in its detected encoding (GBK / UTF-16 config tables are common)
+        encoding = detect_file_encoding(str(_path))
+        if encoding is None:
+            return {"status": "error", "error": f"File appears to be binary: {path}"}
+        content, lossy = decode_text(_path.read_bytes(), encoding)
+        content = content.lstrip("\ufeff")
+
+        too_large = len(content) > MAX_CHARS
+        if (outline or too_large) and supports_outline(str(_path)):
+            symbols = await asyncio.to_thread(file_symbols, str(_path), content)
+            if symbols:
+                return _outline_result(path, content, symbols, max_tokens, too_large)
         
-        if len(content) > MAX_CHARS:
+        if too_large:
             # Safety Truncation
             head = content[:2000]
             tail = content[-2000:]
@@ -186,10 +344,8 @@ async def read_code_tool(
         return {
             "status": "success",
             "output": f"Code File: {path}\n```{ext}\n{final_output}\n```",
-            "summary": f"Read full code file {path} ({len(lines)} lines)"
+            "summary": f"Read full code file {path} ({len(lines)} lines)" + _encoding_note(encoding, lossy)
         }
         
-    except UnicodeDecodeError:
-         return {"status": "error", "error": "File is not valid UTF-8 text."}
     except Exception as e:
          return {"status": "error", "error": f"Error reading code file: {e}"}
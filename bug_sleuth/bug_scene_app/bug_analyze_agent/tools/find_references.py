@@ -0,0 +1,105 @@
+
+import os
+import logging
+from pathlib import Path
+from google.adk.tools.tool_context import ToolContext
+from bug_sleuth.indexer.symbol_index import SymbolIndex
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+# Configure logging
+logger = logging.getLogger("FindReferencesTool")
+
+MAX_REFS_PER_REPO = 500
+MAX_GROUPS_SHOWN = 40
+
+async def find_references_tool(
+    symbol_name: str,
+    tool_context: ToolContext
+) -> dict:
+    """
+    查找代码符号的**引用/调用位置** (References)，按调用方法分组。基于预构建的 SQLite 索引。
+
+    **适用场景 (When to Use)**:
+    - 查找**谁调用了**某个函数/方法 (e.g., "谁调用了 Explode？")
+    - 查找某个类、字段、常量、枚举值**在哪里被使用**
+    - 沿调用链向上追溯 (对结果中的调用方再次调用本工具)
+
+    **优势 (Advantages)**:
+    - ⚡ **毫秒级响应**: 直接查索引，不做全文扫描
+    - 结果按**所在方法** (e.g., BattleManager.Update) 分组，并给出行号
+
+    **限制 (Limitations)**:
+    - 按**标识符精确匹配** (区分大小写)，不支持部分匹配；`M:Foo` / `obj.Foo()` 请只传 "Foo"
+    - 仅覆盖索引中的源码 (C#, C/C++, Lua, Python)；字符串、注释、配置表中的出现请用 search_code_tool
+    - 同名的不同符号不做区分 (无类型推断)
+    - 需要预先运行 indexer 构建索引；索引不存在时请改用 search_code_tool
+
+    Args:
+        symbol_name: 要查找引用的标识符 (e.g., "Explode", "MAX_HP")
+
+    Returns:
+        dict: 按所在方法分组的引用列表，包含文件路径和行号
+    """
+    if not symbol_name:
+        return {"status": "error", "error": "symbol_name is required."}
+
+    # 1. Identify Repositories
+    repo_registry = tool_context.state.get(StateKeys.REPO_REGISTRY, [])
+    repos = [str(Path(p).resolve()) for repo in repo_registry if (p := repo.get("path"))]
+
+    if not repos:
+        return {"status": "error", "summary": "No repositories configured."}
+
+    # 2. Query each repo's index, grouping by (repo, file, enclosing definition)
+    groups = {}
+    total = 0
+    indexed = 0
+    truncated = False
+    for repo_path in repos:
+        index = SymbolIndex(repo_path)
+
+        if not index.exists():
+            logger.warning(f"Index not found for {repo_path}")
+            continue
+
+        try:
+            refs = index.find_references(symbol_name, limit=MAX_REFS_PER_REPO)
+        except Exception as e:
+            logger.error(f"Error querying DB {index.db_path}: {e}")
+            continue
+
+        indexed += 1
+        truncated = truncated or len(refs) >= MAX_REFS_PER_REPO
+        total += len(refs)
+        for ref in refs:
+            key = (os.path.basename(repo_path), ref["file"], ref["enclosing"])
+            groups.setdefault(key, []).append(ref["line"])
+
+    # 3. Format Output
+    if not indexed:
+        return {
+            "status": "error",
+            "error": "No symbol index found. Run 'bug-sleuth index' or use search_code_tool instead."
+        }
+
+    if not groups:
+        return {
+            "status": "success",
+            "summary": f"No references to '{symbol_name}' found in the index."
+        }
+
+    output_lines = [f"Found {total} references to '{symbol_name}' in {len(groups)} locations:"]
+    for i, ((repo, file_path, enclosing), lines) in enumerate(list(groups.items())[:MAX_GROUPS_SHOWN], 1):
+        where = enclosing or "(top level)"
+        output_lines.append(f"{i}. {where} in {repo}/{file_path} (Lines {', '.join(str(n) for n in lines)})")
+
+    if len(groups) > MAX_GROUPS_SHOWN:
+        output_lines.append(f"... and {len(groups) - MAX_GROUPS_SHOWN} more locations.")
+    if truncated:
+        output_lines.append(f"(Results capped at {MAX_REFS_PER_REPO} references per repository.)")
+
+    return {
+        "status": "success",
+        "output": "\n".join(output_lines),
+        "summary": f"Found {total} references to '{symbol_name}' in {len(groups)} locations."
+    }
@@ -1,16 +1,91 @@
 import asyncio
 import os
+import subprocess
+from datetime import datetime
 from typing import Optional, List, Dict
-from .bash import run_bash_command
+from .bash import decode_output
 from google.adk.tools import ToolContext
 from .decorators import validate_path
+from .blame_cache import format_git_blame, git_blame
+from .diff_engine import DIFF_CHAR_BUDGET, parse_numstat_z, parse_unified_diff, render_diff, select_files
+from bug_sleuth.indexer.history_index import HistoryIndex
+from bug_sleuth.shared_libraries.git_worker import GitWorker, commit_subject, format_git_date, get_git_worker
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+
+def _worker_for(path: Optional[str], tool_context: Optional[ToolContext]) -> Optional[GitWorker]:
+    """Git worker of the repository containing `path`, else of the primary repository / PROJECT_ROOT."""
+    candidates = [path]
+    if tool_context is not None and hasattr(tool_context, "state"):
+        repos = tool_context.state.get(StateKeys.REPO_REGISTRY, [])
+        candidates.extend(repo.get("path") for repo in repos[:1])
+    candidates.append(os.environ.get("PROJECT_ROOT"))
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            worker = get_git_worker(candidate)
+            if worker is not None:
+                return worker
+    return None
+
+
+def _not_a_repository(path: Optional[str]) -> dict:
+    return {"status": "error", "error": f"Not inside a git repository: {path or 'no path given and no repository configured'}"}
+
+
+async def _run_git(worker: GitWorker, args: List[str]) -> dict:
+    """Run a git command (no shell) and return it in run_bash_command's result shape."""
+    command = "git " + " ".join(args)
+    try:
+        completed = await worker.run(args)
+    except subprocess.TimeoutExpired:
+        return {"status": "error", "error": f"Command '{command}' timed out."}
+    except OSError as e:
+        return {"status": "error", "error": f"Failed to run git: {e}"}
+
+    output_str = decode_output(completed.stdout).strip()
+    error_str = decode_output(completed.stderr).strip()
+    if completed.returncode == 0:
+        return {
+            "status": "success",
+            "output": output_str,
+            "error": error_str,
+            "exit_code": 0,
+            "summary": f"Executed '{command}' successfully (rc=0)."
+        }
+    short_err = error_str.split('\n')[0] if error_str else output_str.split('\n')[0]
+    if len(short_err) > 100:
+        short_err = short_err[:100] + "..."
+    return {
+        "status": "error",
+        "output": output_str,
+        "error": error_str,
+        "exit_code": completed.returncode,
+        "summary": f"Command '{command}' failed (rc={completed.returncode}). Reason: {short_err}"
+    }
+
+def _parse_date(value: Optional[str]) -> Optional[int]:
+    """ISO date ('2026-10-01' or '2026-10-01T08:00:00+08:00') to Unix seconds (local time if no offset)."""
+    if not value:
+        return None
+    return int(datetime.fromisoformat(value.strip()).timestamp())
+
+
+def _repo_relative(path: Optional[str], repo_root: str) -> Optional[str]:
+    """`path` relative to the repository root in git's form, or None for the root itself."""
+    if not path:
+        return None
+    rel = os.path.relpath(os.path.realpath(path), os.path.realpath(repo_root))
+    return None if rel == "." else rel.replace(os.sep, "/")
+
 
 @validate_path
 async def get_git_log_tool(
     path: Optional[str] = None, 
     tool_context: ToolContext = None,
     limit: int = 5,
-    author: Optional[str] = None
+    author: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
 ) -> dict:
     """
     Get recent git commits. 
@@ -19,31 +94,66 @@ async def get_git_log_tool(
     Args:
         path: Optional. Specific file or directory path to check history for.
         limit: Number of commits to retrieve (default 5).
-        author: Optional. Filter by author.
+        author: Optional. Filter by author: case-insensitive substring of the name or email (not a regex).
+        since: Optional. Only commits on or after this ISO date, e.g. '2026-10-01'.
+        until: Optional. Only commits on or before this ISO date, e.g. '2026-10-15T18:00:00'.
 
     Returns:
         dict: List of commits with hash, author, date, message.
     """
-    cmd = f'git log -n {limit} --pretty=format:"%h|%an|%ad|%s"'
-    
+    worker = _worker_for(path, tool_context)
+    if worker is None:
+        return _not_a_repository(path)
+    limit = max(1, int(limit or 5))
+    try:
+        since_ts, until_ts = _parse_date(since), _parse_date(until)
+    except ValueError as e:
+        return {"status": "error", "error": f"Invalid date (expected ISO format like '2026-10-01'): {e}"}
+    rel_path = _repo_relative(path, worker.repo_root)
+
+    # Indexed history (bug-sleuth index): filters are table lookups instead of a git log walk
+    index = HistoryIndex(worker.repo_root)
+    if await asyncio.to_thread(index.refresh):
+        rows = await asyncio.to_thread(index.query, rel_path, author, since_ts, until_ts, limit)
+        hashes = await asyncio.gather(*(worker.abbreviate(c.hash) for c in rows))
+        commits = [
+            {
+                "hash": short_hash,
+                "author": c.author,
+                "date": format_git_date(c.author_time, c.author_tz),
+                "message": c.subject
+            }
+            for short_hash, c in zip(hashes, rows)
+        ]
+        return {"status": "success", "commits": commits}
+
+    # Whole-repository history is walked through the persistent cat-file worker (no process spawn)
+    if not author and rel_path is None and since_ts is None and until_ts is None:
+        history = await worker.log("HEAD", limit)
+        hashes = await asyncio.gather(*(worker.abbreviate(c.oid) for c in history))
+        commits = [
+            {
+                "hash": short_hash,
+                "author": c.author,
+                "date": format_git_date(c.author_time, c.author_tz),
+                "message": commit_subject(c.message)
+            }
+            for short_hash, c in zip(hashes, history)
+        ]
+        return {"status": "success", "commits": commits}
+
+    args = ["log", "-n", str(limit), "--pretty=format:%h|%an|%ad|%s"]
     if author:
-        cmd += f' --author="{author}"'
-        
-    if path:
-        cmd += f' -- "{path}"'
-        
-    # Determine CWD
-    cwd = None
+        # Same matching as the index: case-insensitive substring, not a regex
+        args += ["--regexp-ignore-case", "--fixed-strings", f"--author={author}"]
+    if since_ts is not None:
+        args.append(f"--since=@{since_ts}")
+    if until_ts is not None:
+        args.append(f"--until=@{until_ts}")
     if path:
-        if os.path.isfile(path):
-            cwd = os.path.dirname(path)
-        elif os.path.isdir(path):
-            cwd = path
-    
-    if not cwd:
-        cwd = os.environ.get("PROJECT_ROOT")
+        args += ["--", path]
 
-    result = await run_bash_command(cmd, cwd=cwd)
+    result = await _run_git(worker, args)
     
     if result.get("status") == "error":
         return result
@@ -68,10 +178,13 @@ async def get_git_diff_tool(
     target: str,
     tool_context: ToolContext = None,
     base: Optional[str] = None,
-    path: Optional[str] = None
+    path: Optional[str] = None,
+    max_chars: int = DIFF_CHAR_BUDGET
 ) -> dict:
     """
     Get git diff to see what actually changed in a commit or between commits.
+    Every changed file is listed in 'files' (kind, +/- line counts, hunk line ranges); hunk text
+    in 'diff' favours source files over generated/binary ones within `max_chars`.
     
     Args:
         target: **REQUIRED**. The commit hash (e.g., 'a1b2c3d') or 'HEAD' to check.
@@ -85,6 +198,8 @@ async def get_git_diff_tool(
               
         path: **OPTIONAL**. Limit diff to specific file path.
               Example: 'Assets/Scripts/Player.cs'
+
+        max_chars: **OPTIONAL**. Budget for hunk text (default 10000).
     
     Usage Examples:
         1. View changes in a specific commit:
@@ -99,38 +214,50 @@ async def get_git_diff_tool(
     Returns:
         dict: The diff output with status and diff content.
     """
+    worker = _worker_for(path, tool_context)
+    if worker is None:
+        return _not_a_repository(path)
+
+    # Revisions are resolved through the cat-file worker first: a bad hash fails fast, and only
+    # full object ids (never option-like strings) reach the command line
+    target_oid = await worker.resolve(target) if target else None
+    if target_oid is None:
+        return {"status": "error", "error": f"Unknown revision: '{target}'. Use a commit hash from get_git_log_tool."}
+    base_oid = None
     if base:
+        base_oid = await worker.resolve(base)
+        if base_oid is None:
+            return {"status": "error", "error": f"Unknown revision: '{base}'. Use a commit hash from get_git_log_tool."}
+
+    if base_oid:
         # Range diff: git diff base target -- path
-        cmd = f"git diff {base} {target}"
+        args = ["diff", base_oid, target_oid]
     else:
-        # Single commit show: git show target -- path
-        cmd = f"git show {target}"
-        
-    if path:
-        cmd += f' -- "{path}"'
-    
-    # Determine CWD
-    cwd = None
-    if path:
-        if os.path.isfile(path):
-            cwd = os.path.dirname(path)
-        elif os.path.isdir(path):
-            cwd = path
-            
-    if not cwd:
-        cwd = os.environ.get("PROJECT_ROOT")
-    
-    result = await run_bash_command(cmd, cwd=cwd)
-    
-    if result.get("status") == "error":
-        return result
-        
-    # Truncate if too long (simple protection)
-    output = result.get("output", "")
-    if len(output) > 10000:
-        output = output[:10000] + "\n... (Diff truncated, too long) ..."
-        
-    return {"status": "success", "diff": output}
+        # Single commit: against its first parent (git show for a root commit)
+        parent_oid = await worker.resolve(f"{target_oid}^")
+        args = ["diff", parent_oid, target_oid] if parent_oid else ["show", "--format=", target_oid]
+    args = ["-c", "core.quotePath=false", *args, "--no-renames"]
+
+    # Per-file counts first, then hunks only for the files that can fit the budget
+    numstat = await _run_git(worker, [*args, "--numstat", "-z", *(["--", path] if path else [])])
+    if numstat.get("status") == "error":
+        return numstat
+    stats = parse_numstat_z(numstat.get("output", ""))
+    selected = select_files(stats, max_chars)
+    diffs = []
+    if selected:
+        result = await _run_git(worker, [*args, "-U3", "--", *selected])
+        if result.get("status") == "error":
+            return result
+        # Lines as stream_command delivers them: splitlines() would also break at \f, \x85, \u2028...
+        diffs = parse_unified_diff(line.rstrip("\r") for line in result.get("output", "").split("\n"))
+
+    rendered = render_diff(diffs, stats, max_chars)
+    if not base_oid:
+        commit = await worker.read_commit(target_oid)
+        if commit is not None:
+            rendered["commit"] = f"{commit.oid[:10]} {commit.author}: {commit_subject(commit.message)}"
+    return {"status": "success", **rendered}
 
 @validate_path
 async def get_git_blame_tool(
@@ -150,17 +277,24 @@ async def get_git_blame_tool(
     Returns:
         dict: Blame info for lines.
     """
-    cmd = f'git blame -L {start_line},{end_line} -- "{path}"'
-    
-    # Determine CWD
-    cwd = None
-    if os.path.isfile(path):
-        cwd = os.path.dirname(path)
-    elif os.path.isdir(path):
-        cwd = path
-        
-    if not cwd:
-        cwd = os.environ.get("PROJECT_ROOT")
+    worker = _worker_for(path, tool_context)
+    if worker is None:
+        return _not_a_repository(path)
+
+    # The whole file is blamed once per HEAD; any range of it is then served from memory
+    try:
+        lines = await git_blame(path, worker.repo_root)
+    except subprocess.TimeoutExpired:
+        return {"status": "error", "error": f"git blame of {path} timed out."}
+    except OSError as e:
+        return {"status": "error", "error": f"git blame failed: {e}"}
 
-    result = await run_bash_command(cmd, cwd=cwd)
-    return result
+    start_line, end_line = max(1, int(start_line)), int(end_line)
+    if start_line > len(lines):
+        return {"status": "error", "error": f"Line {start_line} is past the end of {path} ({len(lines)} lines)."}
+    end_line = min(end_line, len(lines))
+    return {
+        "status": "success",
+        "output": format_git_blame(lines, start_line, end_line),
+        "summary": f"Blamed lines {start_line}-{end_line} of {path} ({len(lines)} lines)"
+    }
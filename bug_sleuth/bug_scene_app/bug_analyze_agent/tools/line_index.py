@@ -0,0 +1,153 @@
+"""
+Line-offset index over memory-mapped files, for ranged reads.
+
+read_file_tool is called with a line range most of the time. Instead of reading and splitting the
+whole file per call, the byte offset of every line start is computed once per file (cached by
+path, mtime and size) and each read maps the file and slices just the requested lines' bytes.
+
+Lines end at '\\n' (a preceding '\\r' is stripped), the same rule ripgrep uses for the line
+numbers in search results. read_text_range decodes the range with the file's detected encoding;
+UTF-16/32 files, where a 0x0A byte is not necessarily a line break, are decoded whole instead.
+"""
+import os
+import re
+import mmap
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+from .text_encoding import decode_text, detect_file_encoding, is_ascii_compatible
+
+# Line indexes kept in memory (8 bytes per line each).
+MAX_CACHED_INDEXES = 64
+
+_NEWLINE = re.compile(b"\n")
+
+
+class LineRange(NamedTuple):
+    data: bytes        # Raw bytes of lines first..last, without the final line terminator
+    first: int         # 1-based, clamped to the file
+    last: int
+    total_lines: int
+
+
+class TextRange(NamedTuple):
+    lines: List[str]   # Lines first..last, without line terminators
+    first: int
+    last: int
+    total_lines: int
+    encoding: Optional[str]  # None: binary file, `lines` is empty
+    lossy: bool        # Some bytes were invalid in `encoding` and were replaced
+
+
+def build_line_offsets(data) -> array:
+    """Byte offset of the start of every line in `data` (bytes or mmap)."""
+    if not len(data):
+        return array("q")
+    offsets = array("q", [0])
+    offsets.extend(m.end() for m in _NEWLINE.finditer(data))
+    if offsets[-1] == len(data):
+        # A trailing newline ends the last line; it does not start a new one
+        offsets.pop()
+    return offsets
+
+
+class _IndexCache:
+    """LRU of line offsets keyed by path, valid while the file's (mtime, size) is unchanged."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_INDEXES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], array]]" = OrderedDict()
+
+    def get(self, path: str, signature: Tuple[int, int], data) -> array:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(path)
+                return entry[1]
+        offsets = build_line_offsets(data)
+        with self._lock:
+            self._entries[path] = (signature, offsets)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return offsets
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _IndexCache()
+
+
+def read_line_range(path: str, start_line: Optional[int] = None, end_line: Optional[int] = None) -> LineRange:
+    """
+    Read lines `start_line`..`end_line` (1-based, inclusive) of a file as raw bytes.
+
+    `start_line` defaults to 1 and `end_line` (None or -1) to the last line; both are clamped to
+    the file. `last < first` in the result means the (clamped) range is empty.
+
+    Raises:
+        OSError: The file cannot be opened or mapped.
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            return LineRange(b"", 1, 0, 0)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offsets = _cache.get(os.path.abspath(path), (st.st_mtime_ns, st.st_size), mm)
+            total = len(offsets)
+
+            first = max(1, start_line or 1)
+            last = total if end_line is None or end_line == -1 else min(end_line, total)
+            if last < first:
+                return LineRange(b"", first, last, total)
+
+            begin = offsets[first - 1]
+            end = offsets[last] if last < total else st.st_size
+            data = mm[begin:end]
+
+    if data.endswith(b"\n"):
+        data = data[:-1]
+    if data.endswith(b"\r"):
+        data = data[:-1]
+    return LineRange(data, first, last, total)
+
+
+def read_text_range(path: str, start_line: Optional[int] = None, end_line: Optional[int] = None) -> TextRange:
+    """
+    Read lines `start_line`..`end_line` of a text file in its detected encoding.
+
+    Range semantics are those of read_line_range. Decoding does not fail: invalid bytes are
+    replaced and reported through `lossy`.
+
+    Raises:
+        OSError: The file cannot be read.
+    """
+    encoding = detect_file_encoding(path)
+    if encoding is None:
+        return TextRange([], 1, 0, 0, None, False)
+
+    if is_ascii_compatible(encoding):
+        line_range = read_line_range(path, start_line, end_line)
+        first, last, total = line_range.first, line_range.last, line_range.total_lines
+        if last < first:
+            return TextRange([], first, last, total, encoding, False)
+        text, lossy = decode_text(line_range.data, encoding)
+        lines = [line.rstrip("\r") for line in text.split("\n")]
+        return TextRange(lines, first, last, total, encoding, lossy)
+
+    with open(path, "rb") as f:
+        text, lossy = decode_text(f.read(), encoding)
+    # The BOM is consumed by the "utf-16"/"utf-32" codecs but not by the explicit-endian ones
+    text = text.lstrip("\ufeff")
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    total = len(lines)
+    first = max(1, start_line or 1)
+    last = total if end_line is None or end_line == -1 else min(end_line, total)
+    selected = [line.rstrip("\r") for line in lines[first - 1:last]]
+    return TextRange(selected, first, last, total, encoding, lossy)
@@ -1,14 +1,38 @@
 import os
+import re
 import json
-from typing import Optional
+import asyncio
+from typing import List, Optional
 from pathlib import Path
 from .decorators import validate_path
-from .bash import run_bash_command
+from .bash import stream_command
+from .fanout import REPO_SEARCH_TIMEOUT, file_mtime, select_ranked
+from bug_sleuth.shared_libraries.result_cache import cached_search
+from bug_sleuth.indexer.trigram_index import TrigramIndex
+import base64
 import shutil
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on the command-line length spent on candidate files from the trigram index.
+# cmd.exe caps a command at 8191 chars; beyond this we scan the whole repository instead.
+MAX_CANDIDATE_ARGS_CHARS = 6000 if os.name == 'nt' else 120000
+
+# Output budget for one search. rg is stopped as soon as either limit is hit, so broad queries
+# cost neither the full scan output nor the memory to hold it.
+MAX_MATCHES = 200
+MAX_OUTPUT_CHARS = 20000
+CONTEXT_LINES = 2
+
+# Match lines that look like a declaration (class/struct/enum/function/#define ...). Files with
+# one rank first: when the query names a symbol, its definition is usually what is being sought.
+DEFINITION_LINE = re.compile(
+    r"^\s*(?:(?:public|private|protected|internal|static|virtual|override|abstract|sealed|partial"
+    r"|async|export|extern|inline|local|const|readonly|unsafe)\s+)*"
+    r"(?:class|struct|interface|enum|record|namespace|def|function|func|fn|typedef|#\s*define)\b"
+)
+
 def check_search_tools() -> Optional[str]:
     """
     Verify if 'ripgrep' is available.
@@ -21,10 +45,247 @@ def check_search_tools() -> Optional[str]:
     return "Critical Error: 'ripgrep' (rg) is missing. Please contact administrator to install it."
 
 
+def _narrow_search_targets(repo_path: str, query: str, file_pattern: Optional[str]) -> List[str]:
+    """
+    Use the repository's trigram index to reduce a search to candidate files.
+    Returns [repo_path] (full scan) when the index is missing, stale, or not selective enough.
+    """
+    try:
+        candidates = TrigramIndex(repo_path).candidates(query, file_pattern)
+    except Exception as e:
+        logger.warning(f"Trigram index lookup failed for {repo_path}: {e}")
+        candidates = None
+
+    if candidates is None:
+        return [repo_path]
+    if sum(len(c) + 3 for c in candidates) > MAX_CANDIDATE_ARGS_CHARS:
+        logger.info(f"Trigram index not selective for '{query}' in {repo_path} ({len(candidates)} files), scanning repo.")
+        return [repo_path]
+    logger.info(f"Trigram index narrowed '{query}' in {repo_path} to {len(candidates)} files.")
+    return candidates
+
+
+def _json_text(data: dict) -> str:
+    """Text of an rg --json 'arbitrary data' object ({"text": ...} or base64 {"bytes": ...})."""
+    if "text" in data:
+        return data["text"]
+    return base64.b64decode(data.get("bytes", "")).decode("utf-8", errors="replace")
+
+
+def _char_offset(text: str, byte_offset: int) -> int:
+    """rg reports submatch offsets in bytes of the UTF-8 line; convert to a character offset."""
+    if text.isascii():
+        return byte_offset
+    return len(text.encode("utf-8")[:byte_offset].decode("utf-8", errors="replace"))
+
+
+class _SearchResults:
+    """
+    Consumes `rg --json` events and groups them per file under the output budget.
+
+    Each file keeps its rendered lines ('12:text' for matches, '13-text' for context, '--' between
+    non-adjacent hunks) and structured matches: line, 1-based column, and 0-based character spans
+    of every submatch. Paths are resolved once, on the file's 'begin' event. The rendered size of
+    each file and whether any of its matches is a definition-like line are kept for ranking.
+    """
+
+    def __init__(self, root_path: Path, max_matches: int, max_chars: int):
+        self.root_path = root_path
+        self.max_matches = max_matches
+        self.max_chars = max_chars
+        self.files: List[dict] = []
+        self.match_count = 0
+        self.chars = 0
+        self.truncated = False
+        self._current = None
+        self._last_line = None
+
+    def _resolve(self, path_str: str) -> str:
+        p = Path(path_str)
+        try:
+            return str(p.resolve() if p.is_absolute() else (self.root_path / p).resolve())
+        except Exception:
+            return path_str
+
+    def _emit(self, line_number: int, marker: str, text: str) -> bool:
+        rendered = []
+        if self._last_line is not None and line_number > self._last_line + 1:
+            rendered.append("--")
+        rendered.append(f"{line_number}{marker}{text}")
+        cost = sum(len(r) + 1 for r in rendered)
+        if self.chars + cost > self.max_chars:
+            self.truncated = True
+            return False
+        self.chars += cost
+        self._current["chars"] += cost
+        self._current["lines"].extend(rendered)
+        self._last_line = line_number
+        first, last = self._current["range"]
+        self._current["range"] = [min(first, line_number), max(last, line_number)]
+        return True
+
+    def on_line(self, line: str) -> bool:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return True
+        kind = event.get("type")
+        data = event.get("data", {})
+
+        if kind == "begin":
+            path = self._resolve(_json_text(data["path"]))
+            self.chars += len(path) + 2
+            self._current = {
+                "path": path, "range": [float("inf"), 0], "matches": [], "lines": [],
+                "chars": len(path) + 2, "definition": False, "match_lines": [],
+            }
+            self._last_line = None
+            self.files.append(self._current)
+            return True
+
+        if kind not in ("match", "context") or self._current is None:
+            return True
+
+        text = _json_text(data["lines"]).rstrip("\r\n")
+        line_number = data.get("line_number") or 0
+        if kind == "context":
+            return self._emit(line_number, "-", text)
+
+        if self.match_count >= self.max_matches:
+            self.truncated = True
+            return False
+        if not self._emit(line_number, ":", text):
+            return False
+        self.match_count += 1
+        self._current["match_lines"].append(len(self._current["lines"]) - 1)
+        if DEFINITION_LINE.match(text):
+            self._current["definition"] = True
+        spans = [
+            [_char_offset(text, sm["start"]), _char_offset(text, sm["end"])]
+            for sm in data.get("submatches", [])
+        ]
+        self._current["matches"].append({
+            "line": line_number,
+            "column": spans[0][0] + 1 if spans else 1,
+            "submatches": spans,
+        })
+        return True
+
+
+def _render(files: List[dict]) -> str:
+    return "\n\n".join(
+        f"{f['path']}:\n" + "\n".join(f["lines"]) for f in files if f["lines"]
+    )
+
+
+def _structured(files: List[dict]) -> List[dict]:
+    """Per-file results without the line text (that is in `_render()`)."""
+    return [
+        {"path": f["path"], "range": f["range"], "matches": f["matches"]}
+        for f in files if f["matches"]
+    ]
+
+
+_RENDERED_LINE = re.compile(r"^(\d+)([:-])")
+
+
+def _trim(f: dict, keep: int) -> dict:
+    """A copy of file result `f` reduced to its first `keep` matches and their trailing context."""
+    if keep >= len(f["matches"]):
+        return f
+    lines = f["lines"]
+    end = f["match_lines"][keep - 1] + 1
+    for _ in range(CONTEXT_LINES):
+        m = _RENDERED_LINE.match(lines[end]) if end < len(lines) else None
+        if not m or m.group(2) != "-":
+            break
+        end += 1
+    last_line = int(_RENDERED_LINE.match(lines[end - 1]).group(1))
+    return {
+        **f,
+        "lines": lines[:end],
+        "matches": f["matches"][:keep],
+        "match_lines": f["match_lines"][:keep],
+        "range": [f["range"][0], last_line],
+    }
+
+
+async def _search_repo(repo_path: str, rg_options: List[str], search_targets: List[str]) -> dict:
+    """Run one repository's search under its own budget and timeout."""
+    cmd = ["rg", "--json", "-C", str(CONTEXT_LINES), *rg_options, *search_targets]
+    logger.info(f"DEBUG: Running RG command: {cmd}")
+
+    results = _SearchResults(Path(repo_path), MAX_MATCHES, MAX_OUTPUT_CHARS)
+    try:
+        run = await stream_command(
+            cmd, results.on_line, cwd=repo_path, encoding="utf-8", timeout=REPO_SEARCH_TIMEOUT
+        )
+    except OSError as e:
+        run = {"exit_code": 2, "stopped": False, "timed_out": False, "error": f"Failed to run rg: {e}"}
+    if run["timed_out"]:
+        logger.warning(f"rg timed out after {REPO_SEARCH_TIMEOUT}s in {repo_path}, keeping partial results.")
+    return {"path": repo_path, "targets": search_targets, "results": results, "run": run}
+
+
+def _merge_ranked(searches: List[dict]) -> tuple:
+    """
+    Rank every file found across repositories and cut the list to the output budget.
+
+    Order: files with a definition-like match, then the primary (first) repository, then the
+    most recently modified. Each repository is guaranteed its share of the budget; a file that
+    only partly fits keeps its first matches.
+
+    Returns:
+        tuple: (chosen files in rank order, whether anything found was left out)
+    """
+    candidates = []
+    for repo_index, search in enumerate(searches):
+        for f in search["results"].files:
+            if f["matches"]:
+                key = (not f["definition"], repo_index != 0, -file_mtime(f["path"]), repo_index, f["path"])
+                candidates.append((key, repo_index, f))
+    candidates.sort(key=lambda c: c[0])
+
+    chosen = select_ranked(
+        [(repo_index, len(f["matches"]), f["chars"]) for _, repo_index, f in candidates],
+        len(searches), MAX_MATCHES, MAX_OUTPUT_CHARS,
+    )
+    files = [_trim(candidates[i][2], keep) for i, keep in chosen]
+    truncated = sum(len(f["matches"]) for f in files) < sum(len(c[2]["matches"]) for c in candidates) or any(
+        s["results"].truncated or s["run"]["timed_out"] for s in searches
+    )
+    return files, truncated
+
+
+async def _count_matches(rg_options: List[str], search_targets: List[str], cwd: str) -> Optional[tuple]:
+    """Total (matching lines, matching files) via `rg --count`, or None if rg fails."""
+    totals = {"lines": 0, "files": 0}
+
+    def on_line(line: str) -> bool:
+        count = line.rsplit(':', 1)[-1]
+        if count.isdigit():
+            totals["lines"] += int(count)
+            totals["files"] += 1
+        return True
+
+    try:
+        result = await stream_command(
+            ["rg", "--count", "--with-filename", "--no-messages", *rg_options, *search_targets], on_line,
+            cwd=cwd, timeout=REPO_SEARCH_TIMEOUT
+        )
+    except OSError as e:
+        logger.warning(f"rg --count failed: {e}")
+        return None
+    if result["timed_out"] or (result["exit_code"] not in (0, 1) and not totals["files"]):
+        return None
+    return totals["lines"], totals["files"]
+
+
 from google.adk.tools.tool_context import ToolContext
 from bug_sleuth.shared_libraries.state_keys import StateKeys
 
 @validate_path
+@cached_search()
 async def search_code_tool(
     query: str,
     tool_context: ToolContext,
@@ -35,13 +296,17 @@ async def search_code_tool(
     
     **适用场景 (When to Use)**:
     - 查找**引用** (References): 谁调用了某个函数？哪里使用了某个常量？
+      (已建索引的源码优先使用 find_references_tool，毫秒级返回并按调用方法分组)
     - 查找**字符串常量**: 错误码 (e.g., "ERR_1001")、日志关键词
     - 搜索**配置和脚本**: Lua, Json, XML, 配置表等
     - 查找**类或方法定义**: 在代码中搜索 "class BattleManager" 等
     
     **限制 (Limitations)**:
-    - 全文本扫描，大仓库可能较慢
+    - 全文本扫描，大仓库可能较慢 (已运行 `bug-sleuth index` 的仓库会先用 trigram 索引缩小候选文件)
     - 结果可能包含注释、字符串等非定义位置
+    - 相同查询在仓库版本未变化时直接返回缓存结果 (切换分支/更新后自动失效)
+    - 输出有上限 (最多约 200 条匹配 / 20000 字符)，超出时提前停止并给出真实总数，请用更精确的关键词或 file_pattern 缩小范围
+    - 多仓库并发搜索 (每个仓库单独限时 30 秒)，结果排序: 含定义行 (class/function 等) 的文件优先，其次主仓库，其次最近修改的文件；每个仓库保底分配一部分输出额度
     
     Args:
         query: 要搜索的内容字符串 (e.g., "InitPlayer", "ERR_1001")
@@ -49,25 +314,20 @@ async def search_code_tool(
                       用于缩减搜索范围提高速度
 
     Returns:
-        dict: 包含匹配行的搜索结果
+        dict: output 为按文件分组的匹配行 ("12:" 为匹配行, "13-" 为上下文行);
+              files 为结构化结果 [{path, range: [起始行, 结束行], matches: [{line, column, submatches}]}]，
+              range 可直接作为 read_file_tool 的 start_line/end_line；
+              多个位置可用 read_file_ranges_tool 一次读取
     """
     if not query:
         return {"status": "error", "error": "Query is required."}
 
-    # 1. Build Command (Strictly use rg)
-    cmd_parts = ["rg", "-n", "-C", "2", "--no-heading", "--smart-case"]
-    
+    # 1. Build Command (Strictly use rg). Arguments are passed as a list, so no shell quoting is needed.
+    rg_options = ["--smart-case"]
     if file_pattern:
         # rg uses --glob for patterns
-        # Handle OS-specific quoting
-        if os.name == 'nt':
-            # Windows (cmd.exe) requires double quotes
-            cmd_parts.append(f'--glob "{file_pattern}"')
-        else:
-            # Linux/macOS (bash) prefers single quotes to prevent expansion
-            cmd_parts.append(f"--glob '{file_pattern}'")
-    
-    cmd_parts += ["-e", f'"{query}"']
+        rg_options += ["--glob", file_pattern]
+    rg_options += ["-e", query]
 
     # New Multi-Repo Logic: Retrieve from ToolContext
     repo_registry = tool_context.state.get(StateKeys.REPO_REGISTRY, [])
@@ -90,131 +350,88 @@ async def search_code_tool(
         logger.error(f"DEBUG: Repo parsing failed: {e}")
         pass
         
+    # 2. Narrow to candidate files via the per-repo trigram index (falls back to full repo scan)
+    repo_targets = []
     for path in repo_list:
-        cmd_parts.append(f'"{path}"')
-        
-    cmd = " ".join(cmd_parts)
-    logger.info(f"DEBUG: Search CMD: {cmd}") # Fallback to default behavior (search cwd)
+        targets = _narrow_search_targets(path, query, file_pattern)
+        if targets:
+            repo_targets.append((path, targets))
 
-    cmd = " ".join(cmd_parts)
+    if repo_list and not repo_targets:
+        return {
+            "status": "success",
+            "output": "No matches found.",
+            "summary": f"No matches found for '{query}' (trigram index)."
+        }
+    if not repo_targets:
+        # No repositories configured: search the working directory
+        repo_targets.append((".", ["."]))
 
-    # 3. Execution
-    # Run from Primary Repo as CWD (fallback '.' if fail)
-    cwd = "."
-    try:
-        if repos:
-            cwd = repos[0]["path"]
-    except:
-        pass
-    
-    logger.info(f"DEBUG: Running RG command: {cmd}")
-    # Increase timeout for large searches
-    result = await run_bash_command(cmd, cwd=cwd)
-    
-    # ... (Regex fallback logic skipped for brevity, assumed unchanged) ...
-
-    if result.get("status") == "error":
-        # 4. Handle 'rg' exit codes
-        # rc=1 means "No matches found" (not an error)
-        # rc=2 means Error
-        if result.get("exit_code") == 1:
-             return {
-                 "status": "success",
-                 "output": "No matches found.",
-                 "summary": f"No matches found for '{query}'."
-             }
-        return result
-
-    output = result.get("output", "")
-    # logger.info(f"DEBUG: Raw RG Output:\n{output[:500]}") 
-
-    # --- PATH FIX: Convert to Absolute Paths ---
-    # rg -n output format: relative_path:line_num:content
-    # OR absolute_path:line_num:content (if args were absolute)
-    
-    lines = output.splitlines()
-    abs_lines = []
-    root_path = Path(cwd).resolve()
-    
-    for line in lines:
-        # Standard rg -n output: path:line:content
-        # On Windows absolute path: C:\path\file:line:content (Colon issue)
-        
-        parts = line.split(':', 2) 
-        path_str = ""
-        line_num = ""
-        content = ""
-        
-        if len(parts) >= 3:
-            # Check for Windows Drive Letter (e.g. C:\...)
-            if len(parts[0]) == 1 and parts[1].startswith('\\'):
-                # Resplit with limit 3 to capture drive, path_part, line, content
-                # Actually, simpler: reconstruct path
-                # parts[0] = 'C', parts[1] = '\path\file', parts[2] = 'line:content'
-                # But wait, split(':', 2) results in 3 parts max.
-                # If C:\path:5:txt
-                # 0: C
-                # 1: \path
-                # 2: 5:txt
-                # So we need to parse parts[2] further.
-                
-                path_str = f"{parts[0]}:{parts[1]}"
-                
-                # parts[2] is 'line:content'
-                subparts = parts[2].split(':', 1)
-                if len(subparts) >= 2:
-                    line_num = subparts[0]
-                    content = subparts[1]
-                else:
-                    # Malformed or different format
-                    abs_lines.append(line)
-                    continue
-            else:
-                # Standard relative path or Linux absolute
-                path_str = parts[0]
-                line_num = parts[1]
-                content = parts[2]
-        
-        if path_str:
-            try:
-                # Normalize slashes first
-                path_str = str(Path(path_str))
-                p = Path(path_str)
-                
-                is_abs = p.is_absolute()
-                # logger.info(f"DEBUG: Path check: '{path_str}' is_abs={is_abs}")
-
-                if not is_abs:
-                    # Check if it has a drive letter manually (Windows Edge Case)
-                    if os.name == 'nt' and len(path_str) > 1 and path_str[1] == ':':
-                            # It IS absolute but pathlib missed it? (Rare/Impossible for Path, but safest to fallback)
-                            abs_path = p.resolve()
-                    else:
-                            abs_path = (root_path / p).resolve()
-                else:
-                    abs_path = p.resolve()
-                
-                # Reconstruct line
-                new_line = f"{abs_path}:{line_num}:{content}"
-                abs_lines.append(new_line)
-            except Exception:
-                abs_lines.append(line)
-            else:
-                 abs_lines.append(line)
+    # 3. Execution: one rg per repository, concurrently, each streaming its JSON events under
+    #    its own budget and timeout. The primary repo stays first for ranking.
+    searches = await asyncio.gather(*(
+        _search_repo(path, rg_options, targets) for path, targets in repo_targets
+    ))
+    files, truncated = _merge_ranked(searches)
+    match_count = sum(len(f["matches"]) for f in files)
+
+    # 4. Handle 'rg' exit codes
+    # rc=1 means "No matches found" (not an error)
+    # rc=2 means Error (rg still prints what it found when only some files were unreadable)
+    if not match_count:
+        failed = next((s["run"] for s in searches if s["run"]["exit_code"] == 2), None)
+        if failed:
+            return {
+                "status": "error",
+                "error": failed["error"],
+                "exit_code": 2,
+                "summary": f"rg failed for '{query}': {failed['error'].splitlines()[0] if failed['error'] else 'unknown error'}"
+            }
+        if any(s["run"]["timed_out"] for s in searches):
+            return {
+                "status": "success",
+                "timed_out": True,
+                "output": f"No matches found before the search timed out ({REPO_SEARCH_TIMEOUT}s).",
+                "summary": f"No matches found for '{query}' (timed out, use file_pattern to narrow the search)."
+            }
+        return {
+            "status": "success",
+            "output": "No matches found.",
+            "summary": f"No matches found for '{query}'."
+        }
+
+    final_output = _render(files)
+    timed_out = [os.path.basename(s["path"]) or s["path"] for s in searches if s["run"]["timed_out"]]
+    if timed_out:
+        final_output += (
+            f"\n... (Timed out after {REPO_SEARCH_TIMEOUT}s in {', '.join(timed_out)}: results there are partial) ..."
+        )
+
+    # 5. Truncated: report the true totals from count-only passes (tiny output, no context)
+    if truncated:
+        counts = await asyncio.gather(*(
+            _count_matches(rg_options, s["targets"], s["path"]) for s in searches
+        ))
+        if all(counts):
+            total_lines = sum(c[0] for c in counts)
+            total_files = sum(c[1] for c in counts)
+            final_output += (
+                f"\n... (Truncated: showing {match_count} of {total_lines} matching lines"
+                f" in {total_files} files. Narrow the query or use file_pattern.) ..."
+            )
+            summary = f"Found {total_lines} matches for '{query}' in {total_files} files (showing {match_count})."
         else:
-            abs_lines.append(line)
-            
-    final_output = "\n".join(abs_lines)
-
-    # 4. Formatting (Optional cleanup or truncation)
-    match_count = len(abs_lines)
-    if len(final_output) > 20000:
-        final_output = final_output[:20000] + "\n... (Truncated) ..."
-        
-    fallback_note = " (Literal search fallback used)" if result.get("_fallback_used") else ""
-        
-    return {
+            final_output += "\n... (Truncated) ..."
+            summary = f"Found more than {match_count} matches for '{query}' (truncated)."
+    else:
+        summary = f"Found {match_count} matches for '{query}'."
+
+    result = {
         "status": "success", 
-        "output": f"Search Results ('{file_pattern or 'All'}'){fallback_note}:\n{final_output}",
-        "summary": f"Found ~{match_count} matches for '{query}' in All.{fallback_note}"
+        "output": f"Search Results ('{file_pattern or 'All'}'):\n{final_output}",
+        "files": _structured(files),
+        "summary": summary
     }
+    if timed_out:
+        result["timed_out"] = True
+    return result
@@ -1,17 +1,75 @@
 
 import os
 import shutil
+import asyncio
 from pathlib import Path
 from typing import Optional
 from .decorators import validate_path
-from .bash import run_bash_command
+from .bash import stream_command
+from .fanout import REPO_SEARCH_TIMEOUT, file_mtime, select_ranked
+from bug_sleuth.shared_libraries.result_cache import cached_search
+from bug_sleuth.indexer.file_index import FileNameIndex
 from google.adk.tools.tool_context import ToolContext
 from bug_sleuth.shared_libraries.state_keys import StateKeys
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Paths listed in the output
+MAX_RESULTS_SHOWN = 100
+# Paths kept per repository for ranking (the rest are only counted)
+MAX_FILES_PER_REPO = 1000
+
+
+def _lookup_index(repo_path: str, glob_pattern: str) -> Optional[dict]:
+    """Answer from the repository's file name index, or None when it has none."""
+    try:
+        matches = FileNameIndex(repo_path).find(glob_pattern)
+    except Exception as e:
+        logger.warning(f"File name index lookup failed for {repo_path}: {e}")
+        return None
+    if matches is None:
+        return None
+    return {
+        "path": repo_path,
+        "run": {"exit_code": 0 if matches else 1, "stopped": False, "timed_out": False, "error": ""},
+        "paths": [os.path.join(repo_path, *m.split("/")) for m in matches[:MAX_FILES_PER_REPO]],
+        "count": len(matches),
+    }
+
+
+async def _list_repo(repo_path: str, glob_pattern: str) -> dict:
+    """
+    List one repository's files matching `glob_pattern`, counting all but keeping the first few.
+    Uses the file name index built by `bug-sleuth index` when there is one, else `rg --files`.
+    """
+    indexed = await asyncio.to_thread(_lookup_index, repo_path, glob_pattern)
+    if indexed is not None:
+        return indexed
+
+    found = {"paths": [], "count": 0}
+
+    def on_line(line: str) -> bool:
+        if line:
+            found["count"] += 1
+            if len(found["paths"]) < MAX_FILES_PER_REPO:
+                found["paths"].append(line)
+        return True
+
+    try:
+        run = await stream_command(
+            ["rg", "--files", "--iglob", glob_pattern, repo_path], on_line,
+            cwd=repo_path, timeout=REPO_SEARCH_TIMEOUT
+        )
+    except OSError as e:
+        run = {"exit_code": 2, "stopped": False, "timed_out": False, "error": f"Failed to run rg: {e}"}
+    if run["timed_out"]:
+        logger.warning(f"rg --files timed out after {REPO_SEARCH_TIMEOUT}s in {repo_path}, keeping partial results.")
+    return {"path": repo_path, "run": run, **found}
+
+
 @validate_path
+@cached_search(ignore_case=("name_pattern", "directory_filter"))
 async def search_res_tool(
     name_pattern: str,
     tool_context: ToolContext,
@@ -20,7 +78,14 @@ async def search_res_tool(
     """
     Search for ASSET files by FILENAME (not content) across repositories.
     Use this to find resources like Prefabs, Textures, Anim sequences, etc.
-    
+    To find which assets reference a resource (or what it references), use
+    find_asset_dependencies_tool instead.
+
+    Repositories with a file name index (`bug-sleuth index`) answer in milliseconds; the others
+    are listed with ripgrep, concurrently (each limited to 30s). Results are ranked: the
+    primary repository first, then the most recently modified files, with every repository
+    guaranteed a share of the output.
+
     Args:
         name_pattern: The filename pattern to search for (glob). 
                       e.g., "*AK47*", "*.png", "B_Hero_*.uasset".
@@ -38,23 +103,13 @@ async def search_res_tool(
     if not shutil.which("rg"):
         return {"status": "error", "error": "'ripgrep' (rg) not found."}
 
-    # 1. Build Command
-    # rg --files: List files that would be searched
-    # -g: Glob pattern
-    # --iglob: Case insensitive glob (better for user queries)
-    
-    # We want to match the FILENAME. 
-    # rg --files lists ALL files. We need to filter.
-    # Actually, `rg --files -g "*pattern*"` works efficiently.
-    
+    # 1. Build the glob (matched against the FILENAME, case-insensitively via --iglob)
     # Ensure pattern is glob-friendly
     if "*" not in name_pattern:
         glob_pattern = f"*{name_pattern}*"
     else:
         glob_pattern = name_pattern
 
-    cmd_parts = ["rg", "--files", "--iglob", f'"{glob_pattern}"']
-    
     # 2. Target Directories (Repos)
     repo_registry = tool_context.state.get(StateKeys.REPO_REGISTRY, [])
     
@@ -87,49 +142,49 @@ async def search_res_tool(
     if not repo_paths:
          return {"status": "error", "error": "No repositories configured to search."}
 
-    # Append paths to command
-    for p in repo_paths:
-        cmd_parts.append(f'"{p}"')
-
-    # Join 
-    cmd = " ".join(cmd_parts)
-    
-    # 3. Execution
-    # Run from CWD or first repo
-    cwd = "."
-    if repo_paths:
-        cwd = repo_paths[0]
-
-    result = await run_bash_command(cmd, cwd=cwd)
-    
-    if result.get("status") == "error":
-         return result
+    # 3. Execution: one `rg --files` per repository, concurrently. The primary repo stays first.
+    listings = await asyncio.gather(*(_list_repo(p, glob_pattern) for p in repo_paths))
 
-    output = result.get("output", "")
-    lines = output.splitlines()
-    
-    # 4. Filter by Directory Filter (Secondary Check if needed)
-    # Since we passed query to rg, it filtered by name.
-    # If we had a directory_filter that WASN'T a repo root, we might want to filter paths here.
-    # But for now, simple is best.
-    
-    match_count = len(lines)
-    
-    # Truncate
-    if match_count > 100:
-        display_output = "\n".join(lines[:100]) + f"\n... (and {match_count - 100} more)"
-    else:
-        display_output = output
-
-    if not output.strip():
-        return {
+    match_count = sum(l["count"] for l in listings)
+    if not match_count:
+        failed = next((l["run"] for l in listings if l["run"]["exit_code"] == 2), None)
+        if failed:
+            return {
+                "status": "error",
+                "error": failed["error"],
+                "summary": f"Asset search failed for '{name_pattern}'."
+            }
+        result = {
             "status": "success",
             "output": "No files found matching that name.",
             "summary": f"No assets found for '{name_pattern}'."
         }
+        if any(l["run"]["timed_out"] for l in listings):
+            result["timed_out"] = True
+        return result
 
-    return {
+    # 4. Rank (primary repo, then most recently modified) and cut to the output budget
+    candidates = sorted(
+        ((repo_index != 0, -file_mtime(path), repo_index, path), repo_index, path)
+        for repo_index, listing in enumerate(listings)
+        for path in listing["paths"]
+    )
+    chosen = select_ranked(
+        [(repo_index, 1, 0) for _, repo_index, _ in candidates], len(listings), MAX_RESULTS_SHOWN
+    )
+    display_output = "\n".join(candidates[i][2] for i, _ in chosen)
+    if match_count > len(chosen):
+        display_output += f"\n... (and {match_count - len(chosen)} more)"
+
+    timed_out = [os.path.basename(l["path"]) for l in listings if l["run"]["timed_out"]]
+    if timed_out:
+        display_output += f"\n... (Timed out after {REPO_SEARCH_TIMEOUT}s in {', '.join(timed_out)}: listing there is partial) ..."
+
+    result = {
         "status": "success",
         "output": f"Found {match_count} asset files:\n{display_output}",
         "summary": f"Found {match_count} assets matching '{name_pattern}'."
     }
+    if timed_out:
+        result["timed_out"] = True
+    return result
@@ -0,0 +1,362 @@
+import os
+import re
+import asyncio
+import logging
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from google.adk.tools.tool_context import ToolContext
+from bug_sleuth.indexer.symbol_index import SymbolIndex
+from bug_sleuth.indexer.svn_log_mirror import LoggedRevision, SvnLogMirror, read_svn_info
+from bug_sleuth.shared_libraries.git_worker import format_git_date, get_git_worker
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+from .bash import stream_command
+from .decorators import validate_path
+
+# Configure logging
+logger = logging.getLogger("SuspectCommitsTool")
+
+# Commits (svn: revisions) examined between the good and the bad revision, newest first.
+MAX_RANGE_COMMITS = 2000
+# Seconds the history pass may run.
+RANGE_TIMEOUT = 300
+# Touched files listed per ranked commit, and in the overall touched-file list.
+MAX_FILES_SHOWN = 10
+MAX_TOUCHED_FILES_SHOWN = 30
+
+# Score of each kind of evidence (every distinct reason counts once per commit).
+SCORE_SUSPECT_FILE = 5
+SCORE_DEFINITION_EDITED = 4
+SCORE_DIFF_MENTION = 3
+SCORE_DEFINING_FILE = 2
+SCORE_REFERENCING_FILE = 1
+
+_HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+class _Suspects:
+    """Suspect files and symbols, with the symbols' definitions and references from the symbol index."""
+
+    def __init__(self, files: List[str], symbols: List[str]):
+        self.files = [f.replace("\\", "/").strip("/") for f in files if f and f.strip("/\\")]
+        # "BattleManager.Explode" / "M:OnHit" -> the identifier the index knows
+        self.names = sorted({re.split(r"[.:]", s.strip())[-1] for s in symbols if s and s.strip()} - {""})
+        self.definitions: Dict[str, List[Tuple[str, int, int]]] = {}
+        self.references: Dict[str, Set[str]] = {}
+        self.indexed = False
+        self.mention = re.compile(r"\b(?:" + "|".join(map(re.escape, self.names)) + r")\b") if self.names else None
+
+    def load(self, repo_root: str):
+        index = SymbolIndex(repo_root)
+        if not self.names or not index.exists():
+            return
+        self.indexed = True
+        for name in self.names:
+            for row in index.search(name, limit=50):
+                if row["match"] == "exact":
+                    self.definitions.setdefault(row["file"], []).append((row["name"], row["start_line"], row["end_line"]))
+            for ref in index.find_references(name):
+                self.references.setdefault(ref["file"], set()).add(name)
+
+    def is_suspect_file(self, rel_path: str) -> bool:
+        return any(rel_path == f or rel_path.endswith("/" + f) for f in self.files)
+
+
+class _Commit:
+    def __init__(self, revision: str, author: str, date: str, message: str):
+        self.revision = revision
+        self.author = author
+        self.date = date
+        self.message = message
+        self.files: List[str] = []
+        self.reasons: Dict[str, int] = {}
+
+    @property
+    def score(self) -> int:
+        return sum(self.reasons.values())
+
+    def add(self, reason: str, score: int):
+        self.reasons.setdefault(reason, score)
+
+    def touch(self, rel_path: str, suspects: _Suspects):
+        self.files.append(rel_path)
+        if suspects.is_suspect_file(rel_path):
+            self.add(f"touches suspect file {rel_path}", SCORE_SUSPECT_FILE)
+        for name, _, _ in suspects.definitions.get(rel_path, ()):
+            self.add(f"touches {rel_path}, which defines {name}", SCORE_DEFINING_FILE)
+        names = suspects.references.get(rel_path)
+        if names:
+            self.add(f"touches {rel_path}, which uses {', '.join(sorted(names))}", SCORE_REFERENCING_FILE)
+
+
+class _GitRangeParser:
+    """Scores commits while `git log -p -U0` streams (see _git_pass)."""
+
+    def __init__(self, suspects: _Suspects):
+        self.suspects = suspects
+        self.commits: List[_Commit] = []
+        self._commit: Optional[_Commit] = None
+        self._file: Optional[str] = None
+        self._in_header = False
+
+    def feed(self, line: str) -> bool:
+        if line.startswith("\x1e"):
+            oid, author, date, subject = (line[1:].split("\x1f", 3) + ["", "", "", ""])[:4]
+            stamp, _, tz = date.partition(" ")
+            self._commit = _Commit(oid, author, format_git_date(int(stamp or 0), tz or "+0000"), subject)
+            self.commits.append(self._commit)
+            self._file = None
+            return True
+        if self._commit is None:
+            return True
+        if line.startswith("diff --git "):
+            self._file = line.split(" b/", 1)[-1]
+            self._in_header = True
+            self._commit.touch(self._file, self.suspects)
+            return True
+        if self._file is None:
+            return True
+        match = _HUNK_HEADER.match(line)
+        if match:
+            self._in_header = False
+            self._hunk(int(match.group(1)), int(match.group(2)) if match.group(2) is not None else 1)
+        elif not self._in_header and line[:1] in ("+", "-") and self.suspects.mention is not None:
+            for name in set(self.suspects.mention.findall(line)):
+                self._commit.add(f"diff mentions {name}", SCORE_DIFF_MENTION)
+        return True
+
+    def _hunk(self, start: int, count: int):
+        # Definitions are at the working copy's line numbers, so the overlap is approximate
+        end = start + max(count, 1) - 1
+        for name, first, last in self.suspects.definitions.get(self._file, ()):
+            if start <= last and end >= first:
+                self._commit.add(f"edits {name} ({self._file}:{first}-{last})", SCORE_DEFINITION_EDITED)
+
+
+async def _git_pass(root: str, good: str, bad: str, path: Optional[str], suspects: _Suspects) -> dict:
+    worker = get_git_worker(root)
+    if worker is None:
+        return {"status": "error", "error": f"Not inside a git repository: {root}"}
+    good_oid, bad_oid = await asyncio.gather(worker.resolve(good), worker.resolve(bad))
+    for name, oid in ((good, good_oid), (bad, bad_oid)):
+        if oid is None:
+            return {"status": "error", "error": f"Unknown revision: '{name}'. Use a commit hash from get_git_log_tool."}
+
+    # One pass over the whole range: touched files, hunk ranges and changed lines of every commit
+    parser = _GitRangeParser(suspects)
+    args = [
+        "git", "-c", "core.quotePath=false", "log", "--no-renames", "--no-ext-diff", "--no-color",
+        "-p", "-U0", "--date=raw", f"--max-count={MAX_RANGE_COMMITS}",
+        "--format=%x1e%H%x1f%an%x1f%ad%x1f%s", f"{good_oid}..{bad_oid}",
+    ]
+    if path:
+        args += ["--", path]
+    result = await stream_command(args, parser.feed, cwd=worker.repo_root, encoding="utf-8", timeout=RANGE_TIMEOUT)
+    if result.get("timed_out"):
+        return {"status": "error", "error": f"git log {good}..{bad} timed out after {RANGE_TIMEOUT}s; narrow the range or pass a path."}
+    if result.get("exit_code") != 0:
+        return {"status": "error", "error": result.get("error") or f"git log failed (rc={result.get('exit_code')})"}
+
+    for commit in parser.commits:
+        commit.revision = await worker.abbreviate(commit.revision) if commit.score else commit.revision[:10]
+    return {"status": "success", "commits": parser.commits, "truncated": len(parser.commits) >= MAX_RANGE_COMMITS, "notes": []}
+
+
+async def _svn_range(root_url: str, first: int, last: int) -> Tuple[dict, List[LoggedRevision]]:
+    """`svn log -v` of first..last, parsed while it streams (oldest first)."""
+    entries: List[LoggedRevision] = []
+    parser = ET.XMLPullParser(events=("end",))
+    parse_errors: List[str] = []
+
+    def on_line(line: str) -> bool:
+        try:
+            parser.feed(line + "\n")
+            for _, element in parser.read_events():
+                if element.tag != "logentry":
+                    continue
+                entries.append(LoggedRevision(
+                    int(element.get("revision", "0")),
+                    element.findtext("author") or "",
+                    element.findtext("date") or "",
+                    element.findtext("msg") or "",
+                    [(p.get("action", "M"), p.text or "") for p in element.findall("paths/path")],
+                ))
+                element.clear()
+        except ET.ParseError as e:
+            parse_errors.append(str(e))
+            return False
+        return True
+
+    args = ["svn", "log", "--xml", "-v", "--non-interactive", "-r", f"{first}:{last}", root_url]
+    result = await stream_command(args, on_line, encoding="utf-8", timeout=RANGE_TIMEOUT)
+    if parse_errors:
+        result = {**result, "exit_code": 1, "error": f"Failed to parse SVN XML output: {parse_errors[0]}"}
+    return result, entries
+
+
+async def _svn_pass(root: str, good: str, bad: str, path: Optional[str], suspects: _Suspects) -> dict:
+    if not (str(good).isdigit() and str(bad).isdigit()):
+        return {"status": "error", "error": "SVN revisions must be numbers (e.g. good='1200', bad='1260')."}
+    if int(good) >= int(bad):
+        return {"status": "error", "error": f"good ({good}) must be an older revision than bad ({bad})."}
+    # Only the newest MAX_RANGE_COMMITS revisions are requested, so a wide range stays one bounded read
+    last = int(bad)
+    first = max(int(good) + 1, last - MAX_RANGE_COMMITS + 1)
+    info = await asyncio.to_thread(read_svn_info, root)
+    target = await asyncio.to_thread(read_svn_info, path) if path else info
+    if info is None or target is None:
+        return {"status": "error", "error": f"Not an SVN working copy: {path or root}"}
+
+    # The local revision mirror (bug-sleuth index) answers without the server when it covers the range
+    mirror = SvnLogMirror(info.wc_root, info.root_url)
+    if mirror.last_revision() >= last:
+        entries = await asyncio.to_thread(mirror.revisions, first, last)
+    else:
+        try:
+            result, entries = await _svn_range(info.root_url, first, last)
+        except OSError as e:
+            return {"status": "error", "error": f"Failed to run svn: {e}"}
+        if result.get("timed_out"):
+            return {"status": "error", "error": f"svn log -r {first}:{last} timed out after {RANGE_TIMEOUT}s; narrow the range or run `bug-sleuth index` to mirror the log."}
+        if result.get("exit_code") != 0:
+            return {"status": "error", "error": result.get("error") or f"svn log failed (rc={result.get('exit_code')})"}
+
+    # Repository paths ("/trunk/Assets/Hero.cs") relative to the working copy root and the queried path
+    wc_prefix = info.path.rstrip("/") + "/"
+    scope = target.path.rstrip("/")
+    commits = []
+    for entry in reversed(entries):
+        changed = [p for _, p in entry.paths if p == scope or p.startswith(scope + "/")]
+        if not changed:
+            continue
+        commit = _Commit(str(entry.revision), entry.author, entry.date, entry.message)
+        for repo_path in changed:
+            commit.touch(repo_path[len(wc_prefix):] if repo_path.startswith(wc_prefix) else repo_path, suspects)
+        commits.append(commit)
+    return {
+        "status": "success",
+        "commits": commits,
+        "truncated": first > int(good) + 1,
+        "notes": ["svn: matched by touched files only (diff text is not scanned)"],
+    }
+
+
+def _repo_for(path: Optional[str], repos: List[dict]) -> dict:
+    if path:
+        resolved = Path(path).resolve()
+        for repo in repos:
+            root = Path(repo.get("path", "")).resolve()
+            if resolved == root or root in resolved.parents:
+                return repo
+    return repos[0]
+
+
+@validate_path
+async def rank_suspect_commits_tool(
+    good: str,
+    bad: str,
+    tool_context: ToolContext,
+    symbols: Optional[List[str]] = None,
+    files: Optional[List[str]] = None,
+    path: Optional[str] = None,
+    limit: int = 10
+) -> dict:
+    """
+    在"上一个正常版本"和"出问题版本"之间，一次性找出与可疑符号/文件相关的提交并排序 (类似 bisect 的嫌疑排序)。
+
+    **适用场景 (When to Use)**:
+    - Bug 在两个客户端版本/构建之间出现，想知道**哪些提交最可疑**
+    - 已经通过 search_symbol_tool / 日志定位到可疑的类、方法或文件，需要找出改动过它们的提交
+    - 代替逐个提交调用 get_git_log_tool + get_git_diff_tool 的多轮排查
+
+    **工作方式**:
+    - 对 good..bad 区间只做**一次**批量历史读取 (git: `git log -p -U0`；svn: `svn log -v`，已建本地镜像时不访问服务器)
+    - 用符号索引找到可疑符号的定义和引用所在文件，按以下证据给每个提交打分:
+      改动可疑文件 (+5) > 改动了符号定义的行范围 (+4) > diff 中出现符号名 (+3) > 改动定义所在文件 (+2) > 改动引用所在文件 (+1)
+
+    **限制 (Limitations)**:
+    - 定义行范围取自当前索引，对较早的提交是近似值
+    - SVN 仅按改动文件匹配，不扫描 diff 文本
+    - 最多检查区间内最近的 2000 个提交 (SVN: 最近的 2000 个版本号)
+
+    Args:
+        good: 最后一个正常的版本 (git 提交 hash / 标签，或 SVN 版本号)，不包含在区间内
+        bad: 出问题的版本 (git 提交 hash / 标签 / 'HEAD'，或 SVN 版本号)
+        symbols: 可选，可疑的符号名 (e.g., ["BattleManager", "Explode", "M:OnHit"])
+        files: 可选，可疑的文件 (完整路径或仓库内相对路径，也可只写文件名 e.g., "Hero.cs")
+        path: 可选，只看该目录/文件下的提交；也用于选择仓库 (默认第一个仓库)
+        limit: 返回的嫌疑提交数量 (默认 10)
+
+    Returns:
+        dict: 按得分排序的嫌疑提交 (含理由和改动文件)，以及区间内所有被改动文件的统计
+    """
+    repos = tool_context.state.get(StateKeys.REPO_REGISTRY, [])
+    if not repos:
+        return {"status": "error", "error": "No repositories configured."}
+    if not symbols and not files:
+        return {"status": "error", "error": "Give at least one suspect symbol or file."}
+    repo = _repo_for(path, repos)
+    root = str(Path(repo["path"]).resolve())
+
+    rel_files = []
+    for f in files or []:
+        if os.path.isabs(f):
+            f = os.path.relpath(os.path.realpath(f), root)
+        rel_files.append(f)
+    suspects = _Suspects(rel_files, symbols or [])
+    await asyncio.to_thread(suspects.load, root)
+
+    vcs = repo.get("vcs", "git").lower()
+    if vcs == "svn":
+        result = await _svn_pass(root, str(good), str(bad), path, suspects)
+    else:
+        result = await _git_pass(root, good, bad, path, suspects)
+    if result["status"] == "error":
+        return result
+
+    commits: List[_Commit] = result["commits"]
+    notes = list(result["notes"])
+    if suspects.names and not suspects.indexed:
+        notes.append("symbol index not built: symbols were matched in diff text only (run `bug-sleuth index`)")
+
+    touched: Dict[str, int] = {}
+    for commit in commits:
+        for f in commit.files:
+            touched[f] = touched.get(f, 0) + 1
+
+    # Newest first among equal scores (commits are in newest-first order)
+    ranked = sorted((c for c in commits if c.score), key=lambda c: -c.score)[:max(1, int(limit or 10))]
+    suspects_out = [
+        {
+            "revision": c.revision,
+            "author": c.author,
+            "date": c.date,
+            "message": c.message.strip().split("\n", 1)[0],
+            "score": c.score,
+            "reasons": sorted(c.reasons, key=lambda r: -c.reasons[r]),
+            "files": c.files[:MAX_FILES_SHOWN],
+            "files_touched": len(c.files),
+        }
+        for c in ranked
+    ]
+    touched_files = [
+        {"path": f, "commits": n}
+        for f, n in sorted(touched.items(), key=lambda item: (-item[1], item[0]))[:MAX_TOUCHED_FILES_SHOWN]
+    ]
+
+    matched = sum(1 for c in commits if c.score)
+    summary = f"Scanned {len(commits)} commits in {good}..{bad}: {matched} touch the suspects"
+    if result["truncated"]:
+        summary += f" (only the newest {MAX_RANGE_COMMITS} revisions were examined)"
+    if ranked:
+        summary += f"; top suspect {ranked[0].revision} (score {ranked[0].score})"
+    result = {
+        "status": "success",
+        "summary": summary,
+        "suspects": suspects_out,
+        "touched_files": touched_files,
+        "touched_file_count": len(touched),
+    }
+    if notes:
+        result["notes"] = notes
+    return result
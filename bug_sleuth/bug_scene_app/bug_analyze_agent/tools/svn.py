@@ -1,17 +1,171 @@
 
 import os
+import asyncio
+import sqlite3
+import fnmatch
+import threading
+import subprocess
 import xml.etree.ElementTree as ET
 from typing import Optional, List, Dict
-from .bash import run_bash_command
+from .bash import decode_output, stream_command
 from .decorators import validate_path
+from .blame_cache import format_svn_blame, svn_blame
+from .diff_engine import DIFF_CHAR_BUDGET, UnifiedDiffParser, render_diff
+from bug_sleuth.indexer.svn_log_mirror import SvnLogMirror, read_svn_info
 from google.adk.tools import ToolContext
 
+# Log entries requested per `svn log` call when entries are filtered (pages continue below the last
+# revision); with --search, the number of revisions per window instead.
+SVN_LOG_PAGE_SIZE = 200
+# Log entries (revisions, with --search) examined in total before a filtered search gives up.
+MAX_SVN_LOG_SCANNED = 5000
+# Changed paths listed per commit with verbose=True.
+MAX_CHANGED_PATHS = 50
+# Revisions a tool call fetches into the log mirror itself; larger gaps are synced in the background.
+MAX_INLINE_SYNC = 500
+# Seconds an svn diff may stream.
+SVN_DIFF_TIMEOUT = 120
+
+# Whether the svn client accepts --search / --search-and (1.8+); None until the first filtered log
+_search_supported: Optional[bool] = None
+
+
+def _svn_cwd(path: Optional[str]) -> Optional[str]:
+    cwd = None
+    if path:
+        if os.path.isfile(path):
+            cwd = os.path.dirname(path)
+        elif os.path.isdir(path):
+            cwd = path
+    return cwd or os.environ.get("PROJECT_ROOT")
+
+
+def _log_entry(element: ET.Element, verbose: bool) -> dict:
+    commit = {
+        "revision": element.get("revision"),
+        "author": element.findtext("author") or "unknown",
+        "date": element.findtext("date") or "",
+        "message": element.findtext("msg") or ""
+    }
+    if verbose:
+        _changed_paths(commit, [f"{p.get('action', '?')} {p.text or ''}" for p in element.findall("paths/path")])
+    return commit
+
+
+def _stream_log_page(args: List[str], cwd: Optional[str], accept, wanted: int) -> dict:
+    """
+    Run one `svn log --xml` page and parse it while it streams; the process is killed as soon as
+    `wanted` entries were accepted. Returns the page's entry count, last revision and stderr.
+    """
+    proc = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    stderr_reader.start()
+
+    seen, accepted, last_revision, stopped, parse_error = 0, 0, None, False, False
+    try:
+        for _, element in ET.iterparse(proc.stdout, events=("end",)):
+            if element.tag != "logentry":
+                continue
+            seen += 1
+            last_revision = element.get("revision")
+            if accept(element):
+                accepted += 1
+            element.clear()
+            if accepted >= wanted:
+                stopped = True
+                break
+    except ET.ParseError:
+        parse_error = True
+    finally:
+        if stopped:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+        stderr_reader.join()
+
+    return {
+        "seen": seen,
+        "last_revision": last_revision,
+        "stopped": stopped,
+        "exit_code": None if stopped else proc.returncode,
+        "parse_error": parse_error and not stopped,
+        "error": decode_output(b"".join(c for c in stderr_chunks if c)).strip(),
+    }
+
+
+async def _newest_revision(path: Optional[str], cwd: Optional[str]) -> Optional[int]:
+    """Revision `svn log [path]` starts from: the working copy's (local), else the newest log entry."""
+    info = await asyncio.to_thread(read_svn_info, path or cwd) if path or cwd else None
+    if info is not None:
+        return info.revision
+    args = ["svn", "log", "--xml", "-l", "1"] + ([path] if path else [])
+    page = await asyncio.to_thread(_stream_log_page, args, cwd, lambda element: True, 1)
+    return int(page["last_revision"]) if page["last_revision"] else None
+
+
+def _changed_paths(commit: dict, changed: List[str]):
+    commit["paths"] = changed[:MAX_CHANGED_PATHS]
+    if len(changed) > MAX_CHANGED_PATHS:
+        commit["paths_omitted"] = len(changed) - MAX_CHANGED_PATHS
+
+
+async def _log_from_mirror(
+    target: Optional[str], limit: int, author: Optional[str], search: Optional[str], verbose: bool
+) -> Optional[dict]:
+    """
+    Answer from the local revision mirror (see svn_log_mirror) when it covers the working copy's
+    revision of `target`, fetching a small gap first. Returns None to fall back to `svn log`.
+    """
+    if not target:
+        return None
+    info = await asyncio.to_thread(read_svn_info, target)
+    if info is None:
+        return None
+    mirror = SvnLogMirror(info.wc_root, info.root_url)
+    mirrored = mirror.last_revision()
+    if mirrored < info.revision:
+        if mirrored == 0 or info.revision - mirrored > MAX_INLINE_SYNC:
+            mirror.sync_in_background()
+            return None
+        try:
+            await asyncio.to_thread(mirror.sync, str(info.revision))
+        except (OSError, sqlite3.Error):
+            return None
+        if mirror.last_revision() < info.revision:
+            return None
+
+    entries = await asyncio.to_thread(mirror.query, info.path, author, search, info.revision, limit, verbose)
+    commits = []
+    for entry in entries:
+        commit = {
+            "revision": str(entry.revision),
+            "author": entry.author or "unknown",
+            "date": entry.date,
+            "message": entry.message
+        }
+        if verbose:
+            _changed_paths(commit, [f"{action} {changed}" for action, changed in entry.paths])
+        commits.append(commit)
+    return {"status": "success", "commits": commits}
+
+
+def _matches_search(element: ET.Element, search: str) -> bool:
+    """Client-side equivalent of `svn log --search` (glob, case-insensitive) for older clients."""
+    pattern = f"*{search.lower()}*"
+    fields = [element.findtext("author") or "", element.findtext("msg") or "", element.findtext("date") or ""]
+    fields += [p.text or "" for p in element.findall("paths/path")]
+    return any(fnmatch.fnmatchcase(f.lower(), pattern) for f in fields)
+
+
 @validate_path
 async def get_svn_log_tool(
     path: Optional[str] = None, 
     tool_context: ToolContext = None,
     limit: int = 5,
-    author: Optional[str] = None
+    author: Optional[str] = None,
+    search: Optional[str] = None,
+    verbose: bool = False
 ) -> dict:
     """
     Get recent SVN commits using `svn log`.
@@ -19,113 +173,152 @@ async def get_svn_log_tool(
     Args:
         path: Optional. Specific file or directory path to check history for.
         limit: Number of commits to retrieve (default 5).
-        author: Optional. Filter by author (filtering done in Python as svn log --search is newer).
+        author: Optional. Filter by author (exact name). History is searched until `limit` of their commits are found.
+        search: Optional. Only commits whose author, message or changed paths contain this text (glob wildcards allowed).
+        verbose: Optional. Include the paths each commit changed (e.g. "M /trunk/Assets/Hero.cs"), so no diff is needed just to see touched files.
         
     Returns:
-        dict: List of commits with revision, author, date, message.
+        dict: List of commits with revision, author, date, message (and paths if verbose).
     """
-    # Use XML for easier parsing
-    cmd = f'svn log --xml -l {limit}'
-    
-    if path:
-        cmd += f' "{path}"'
-        
-    # Determine CWD
-    cwd = None
-    if path:
-        if os.path.isfile(path):
-            cwd = os.path.dirname(path)
-        elif os.path.isdir(path):
-            cwd = path
-            
-    if not cwd:
-        cwd = os.environ.get("PROJECT_ROOT")
+    global _search_supported
+    limit = max(1, int(limit or 5))
+    cwd = _svn_cwd(path)
+    filtered = bool(author or search)
 
-    result = await run_bash_command(cmd, cwd=cwd)
-    
-    if result.get("status") == "error":
-        return result
-        
-    output = result.get("output", "")
-    commits = []
-    
-    try:
-        if output.strip():
-            root = ET.fromstring(output)
-            for entry in root.findall('logentry'):
-                rev = entry.get('revision')
-                author_tag = entry.find('author')
-                date_tag = entry.find('date')
-                msg_tag = entry.find('msg')
-                
-                commit_author = author_tag.text if author_tag is not None else "unknown"
-                
-                # Filter by author if requested
-                if author and author != commit_author:
-                    continue
-                    
-                commits.append({
-                    "revision": rev,
-                    "author": commit_author,
-                    "date": date_tag.text if date_tag is not None else "",
-                    "message": msg_tag.text if msg_tag is not None else ""
-                })
-    except ET.ParseError:
-        return {"status": "error", "error": "Failed to parse SVN XML output", "raw_output": output}
-                
-    return {"status": "success", "commits": commits}
+    # Mirrored revision metadata answers without a server round trip
+    mirrored = await _log_from_mirror(path or cwd, limit, author, search, verbose)
+    if mirrored is not None:
+        return mirrored
+
+    # svn 1.8+ filters while the log streams: --search matches author/message/paths, --search-and narrows it
+    search_args: List[str] = []
+    if author:
+        search_args += ["--search", author]
+    if search:
+        search_args += ["--search-and" if author else "--search", search]
+
+    commits: List[dict] = []
+    scanned = 0
+    start_revision: Optional[str] = None
+    window_start: Optional[int] = None
+    use_server_search = bool(search_args) and _search_supported is not False
+
+    # --search also matches messages containing the author's name, so the author is checked exactly here
+    def accept(element: ET.Element) -> bool:
+        if author and (element.findtext("author") or "unknown") != author:
+            return False
+        if search and not use_server_search and not _matches_search(element, search):
+            return False
+        commits.append(_log_entry(element, verbose))
+        return True
+
+    while len(commits) < limit:
+        page_size = max(limit, SVN_LOG_PAGE_SIZE) if filtered else limit
+        args = ["svn", "log", "--xml"]
+        # A client-side text search needs the changed paths too
+        if verbose or (search and not use_server_search):
+            args.append("-v")
+        try:
+            if use_server_search:
+                # With --search, -l caps the entries searched rather than the matches: page through
+                # explicit revision windows instead
+                if window_start is None:
+                    window_start = await _newest_revision(path, cwd)
+                    if window_start is None:
+                        return {"status": "success", "commits": commits}
+                window_end = max(1, window_start - SVN_LOG_PAGE_SIZE + 1)
+                args += search_args + ["-r", f"{window_start}:{window_end}"]
+            else:
+                args += ["-l", str(page_size)]
+                if start_revision is not None:
+                    args += ["-r", f"{start_revision}:1"]
+            if path:
+                args.append(path)
+
+            page = await asyncio.to_thread(_stream_log_page, args, cwd, accept, limit - len(commits))
+        except OSError as e:
+            return {"status": "error", "error": f"Failed to run svn: {e}"}
+
+        if page["exit_code"] not in (0, None) and page["seen"] == 0:
+            if use_server_search and "--search" in page["error"]:
+                # Pre-1.8 client: filter the pages here instead
+                _search_supported = False
+                use_server_search = False
+                continue
+            if use_server_search and scanned:
+                break  # Older windows predate the path
+            return {"status": "error", "error": page["error"] or f"svn log failed (rc={page['exit_code']})"}
+        if page["parse_error"]:
+            return {"status": "error", "error": f"Failed to parse SVN XML output. {page['error']}".strip()}
+        if use_server_search:
+            _search_supported = True
+            scanned += window_start - window_end + 1
+            # Enough matches, history exhausted, or enough history examined for a rare author/text
+            if page["stopped"] or window_end <= 1 or scanned >= MAX_SVN_LOG_SCANNED:
+                break
+            window_start = window_end - 1
+            continue
+
+        scanned += page["seen"]
+        next_revision = int(page["last_revision"] or 0) - 1
+        # History exhausted, or enough history examined for a rare author/text
+        if page["stopped"] or page["seen"] < page_size or next_revision < 1 or scanned >= MAX_SVN_LOG_SCANNED:
+            break
+        start_revision = str(next_revision)
+
+    result = {"status": "success", "commits": commits}
+    if filtered and len(commits) < limit and scanned >= MAX_SVN_LOG_SCANNED:
+        unit = "revisions" if use_server_search else "log entries"
+        result["summary"] = f"Found {len(commits)} matching commits in the newest {scanned} {unit} (search stopped there)."
+    return result
 
 @validate_path
 async def get_svn_diff_tool(
     target: str,
     tool_context: ToolContext = None,
     base: Optional[str] = None,
-    path: Optional[str] = None
+    path: Optional[str] = None,
+    max_chars: int = DIFF_CHAR_BUDGET
 ) -> dict:
     """
     Get SVN diff.
+    Every changed file is listed in 'files' (kind, +/- line counts, hunk line ranges); hunk text
+    in 'diff' favours source files over generated/binary ones within `max_chars`.
     
     Args:
         target: The revision number (e.g., '1001') or 'HEAD'.
                 If 'base' is NOT provided, behaves like `svn diff -c target` (changes IN that revision).
         base: Optional. If provided, `svn diff -r base:target`.
         path: Optional. Limit diff to specific file path.
+        max_chars: Optional. Budget for hunk text (default 10000).
 
     Returns:
-        dict: The diff output.
+        dict: Per-file summary ('files') and the selected hunks ('diff').
     """
     if base:
         # Range diff: svn diff -r base:target
-        cmd = f"svn diff -r {base}:{target}"
+        args = ["svn", "diff", "-r", f"{base}:{target}"]
     else:
         # Single commit change: svn diff -c target
         # Note: 'svn show' is not standard in older SVN, usually 'diff -c' or 'log -v --diff'
-        cmd = f"svn diff -c {target}"
+        args = ["svn", "diff", "-c", str(target)]
         
     if path:
-        cmd += f' "{path}"'
-    
-    # Determine CWD
-    cwd = None
-    if path:
-        if os.path.isfile(path):
-            cwd = os.path.dirname(path)
-        elif os.path.isdir(path):
-            cwd = path
-            
-    if not cwd:
-        cwd = os.environ.get("PROJECT_ROOT")
-    
-    result = await run_bash_command(cmd, cwd=cwd)
-    
-    if result.get("status") == "error":
-        return result
-        
-    output = result.get("output", "")
-    if len(output) > 10000:
-        output = output[:10000] + "\n... (Diff truncated, too long) ..."
-        
-    return {"status": "success", "diff": output}
+        args.append(path)
+
+    # svn has no numstat: the diff is parsed while it streams and counted per file, keeping
+    # bounded text per file, then the budget is applied across files
+    parser = UnifiedDiffParser()
+    try:
+        result = await stream_command(args, parser.feed, cwd=_svn_cwd(path), timeout=SVN_DIFF_TIMEOUT)
+    except OSError as e:
+        return {"status": "error", "error": f"Failed to run svn: {e}"}
+    if result.get("timed_out"):
+        return {"status": "error", "error": f"svn diff timed out after {SVN_DIFF_TIMEOUT}s."}
+    if result.get("exit_code") != 0:
+        return {"status": "error", "error": result.get("error") or f"svn diff failed (rc={result.get('exit_code')})"}
+
+    return {"status": "success", **render_diff(parser.close(), budget=max_chars)}
 
 @validate_path
 async def get_svn_blame_tool(
@@ -136,7 +329,7 @@ async def get_svn_blame_tool(
 ) -> dict:
     """
     Get SVN blame for a file.
-    Note: SVN blame does not support line range natively in CLI, so we fetch all and slice.
+    The whole file is blamed once per revision and cached, so later ranges of the same file are instant.
 
     Args:
         path: File path.
@@ -146,33 +339,11 @@ async def get_svn_blame_tool(
     Returns:
         dict: Blame info for selected lines.
     """
-    cmd = f'svn blame "{path}"'
-    
-    # Determine CWD
-    cwd = None
-    if os.path.isfile(path):
-        cwd = os.path.dirname(path)
-    elif os.path.isdir(path):
-        cwd = path
-        
-    if not cwd:
-        cwd = os.environ.get("PROJECT_ROOT")
+    try:
+        lines = await svn_blame(path)
+    except OSError as e:
+        return {"status": "error", "error": f"svn blame failed: {e}"}
 
-    result = await run_bash_command(cmd, cwd=cwd)
-    
-    if result.get("status") == "error":
-        return result
-        
-    output = result.get("output", "")
-    lines = output.splitlines()
-    
-    # Slice lines (1-based index)
-    # Ensure indices are within bounds
-    total_lines = len(lines)
-    start_idx = max(0, start_line - 1)
-    end_idx = min(total_lines, end_line)
-    
-    selected_lines = lines[start_idx:end_idx]
-    
+    # Slice lines (1-based index), within bounds
     # SVN Blame format: "  123   user   line content"
-    return {"status": "success", "blame": "\n".join(selected_lines)}
+    return {"status": "success", "blame": format_svn_blame(lines, start_line, end_line)}
@@ -0,0 +1,160 @@
+"""
+Text encoding detection for the file reading tools.
+
+Config tables exported from Chinese-localized Excel/WPS are often GBK or UTF-16 rather than
+UTF-8. The encoding of a file is sniffed from its head: a BOM wins, otherwise the first
+SNIFF_BYTES are run through incremental decoders (UTF-16 without BOM is recognised by its NUL
+byte pattern, then strict UTF-8, then GB18030, a superset of GBK/GB2312). The result is cached
+per file by path, mtime and size.
+
+Decoding never hard-fails: bytes that are invalid in the detected encoding are replaced and the
+read is reported as lossy.
+"""
+import os
+import codecs
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Bytes of the file head inspected when there is no BOM.
+SNIFF_BYTES = 16 * 1024
+# Detected encodings kept in memory.
+MAX_CACHED_ENCODINGS = 1024
+
+# Longest BOMs first: the UTF-32-LE BOM starts with the UTF-16-LE one.
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# Tried in order on the sniffed head; the first one that decodes it cleanly wins.
+_CANDIDATES = ("utf-8", "gb18030")
+# Used when no candidate decodes the head cleanly; invalid bytes are replaced on decode.
+FALLBACK_ENCODING = "utf-8"
+
+# Share of NUL bytes in one byte lane that marks BOM-less UTF-16 (mostly ASCII text).
+_UTF16_NUL_RATIO = 0.3
+
+
+def sniff_encoding(sample: bytes, complete: bool = False) -> Optional[str]:
+    """
+    Guess the encoding of a file from its first bytes.
+
+    Args:
+        sample: Head of the file.
+        complete: True if `sample` is the whole file, so a multi-byte character cut off at its
+            end is an error rather than a truncation artefact.
+
+    Returns:
+        str: A codec name usable with bytes.decode(), or None for binary data.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    if b"\0" in sample:
+        return _sniff_utf16(sample)
+
+    for encoding in _CANDIDATES:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=complete)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return FALLBACK_ENCODING
+
+
+def _sniff_utf16(sample: bytes) -> Optional[str]:
+    """BOM-less UTF-16 has NULs in one byte lane (high bytes of ASCII characters); else binary."""
+    pairs = len(sample) // 2
+    if not pairs:
+        return None
+    even = sample[0:pairs * 2:2].count(0) / pairs
+    odd = sample[1:pairs * 2:2].count(0) / pairs
+    if odd >= _UTF16_NUL_RATIO and even < _UTF16_NUL_RATIO / 10:
+        return "utf-16-le"
+    if even >= _UTF16_NUL_RATIO and odd < _UTF16_NUL_RATIO / 10:
+        return "utf-16-be"
+    return None
+
+
+def is_ascii_compatible(encoding: str) -> bool:
+    """Whether b'\\n' in the raw bytes is always a line break (false for UTF-16/32)."""
+    return not encoding.startswith(("utf-16", "utf-32"))
+
+
+def decode_text(data: bytes, encoding: str) -> Tuple[str, bool]:
+    """
+    Decode `data`, replacing invalid bytes instead of failing.
+
+    Returns:
+        Tuple[str, bool]: The text and whether any bytes had to be replaced.
+    """
+    try:
+        return data.decode(encoding), False
+    except UnicodeDecodeError:
+        pass
+    if encoding == "utf-8":
+        # The sniffed head was UTF-8 (often plain ASCII) but the rest of the file is not
+        try:
+            return data.decode("gb18030"), False
+        except UnicodeDecodeError:
+            pass
+    return data.decode(encoding, errors="replace"), True
+
+
+class _EncodingCache:
+    """LRU of detected encodings keyed by path, valid while the file's (mtime, size) is unchanged."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_ENCODINGS):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Optional[str]]]" = OrderedDict()
+
+    def get(self, path: str, signature: Tuple[int, int]):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != signature:
+                return False, None
+            self._entries.move_to_end(path)
+            return True, entry[1]
+
+    def put(self, path: str, signature: Tuple[int, int], encoding: Optional[str]):
+        with self._lock:
+            self._entries[path] = (signature, encoding)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _EncodingCache()
+
+
+def detect_file_encoding(path: str) -> Optional[str]:
+    """
+    Detected encoding of a file (see sniff_encoding), cached until the file changes.
+
+    Returns:
+        str: Codec name, or None for binary files. Empty files are "utf-8".
+
+    Raises:
+        OSError: The file cannot be opened.
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        key = os.path.abspath(path)
+        signature = (st.st_mtime_ns, st.st_size)
+        found, encoding = _cache.get(key, signature)
+        if found:
+            return encoding
+        sample = f.read(SNIFF_BYTES)
+
+    encoding = sniff_encoding(sample, complete=len(sample) >= st.st_size) if sample else "utf-8"
+    _cache.put(key, signature, encoding)
+    return encoding
@@ -78,5 +78,93 @@ def serve(port, host, skills_dir, config, env_file, data_dir, agent_dir, ui_path
         logger.exception(f"Failed to start server: {e}")
         sys.exit(1)
 
+def _load_repositories(config_path):
+    """Reads the 'repositories' list from a config.yaml file."""
+    import yaml
+    with open(config_path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    return [r for r in data.get("repositories", []) if isinstance(r, dict) and r.get("path")]
+
+def _make_progress_printer(name, interval=2.0):
+    """Progress callback for the indexer that prints throughput at most every `interval` seconds."""
+    last_print = [0.0]
+
+    def on_progress(done, total, bytes_done, elapsed):
+        if done < total and elapsed - last_print[0] < interval:
+            return
+        last_print[0] = elapsed
+        rate = done / elapsed if elapsed > 0 else 0.0
+        mb_rate = bytes_done / (1024 * 1024) / elapsed if elapsed > 0 else 0.0
+        click.echo(f"[{name}] parsed {done}/{total} files ({rate:.0f} files/s, {mb_rate:.1f} MB/s)")
+
+    return on_progress
+
+@main.command()
+@click.option("--config", envvar="CONFIG_FILE", help="Path to the configuration file.")
+@click.option("--repo", "repo_names", multiple=True, help="Only index the named repositories (repeatable).")
+@click.option("--full", is_flag=True, help="Rebuild from scratch instead of updating incrementally.")
+@click.option("--workers", type=int, default=None, help="Parser processes (default: one per CPU core).")
+def index(config, repo_names, full, workers):
+    """
+    Build or refresh the code indexes for the configured repositories.
+    Indexes are stored in each repository's .bug_sleuth_agent directory; after the first
+    run only files changed since the last indexed revision (git diff / svn status) are re-parsed.
+    """
+    from bug_sleuth.indexer.builder import index_repository
+
+    # Auto-discovery: If not provided, check CWD for 'config.yaml'
+    if not config and os.path.exists("config.yaml"):
+        config = "config.yaml"
+        logger.info("Auto-discovered 'config.yaml' in current directory.")
+
+    if not config or not os.path.exists(config):
+        logger.error("No config file found. Use --config to specify one.")
+        sys.exit(1)
+
+    repos = _load_repositories(config)
+    if repo_names:
+        repos = [r for r in repos if r.get("name") in repo_names]
+    if not repos:
+        logger.error("No repositories to index.")
+        sys.exit(1)
+
+    for repo in repos:
+        repo_path = os.path.abspath(repo["path"])
+        name = repo.get("name", repo_path)
+        if not os.path.isdir(repo_path):
+            logger.warning(f"Skipping missing repository: {repo_path}")
+            continue
+
+        logger.info(f"Indexing {name} ({repo_path})")
+        try:
+            result = index_repository(
+                repo_path,
+                vcs=repo.get("vcs", "git"),
+                full=full,
+                workers=workers,
+                on_progress=_make_progress_printer(name),
+            )
+        except Exception as e:
+            logger.exception(f"Failed to index {name}: {e}")
+            continue
+
+        symbols = result["symbols"]
+        click.echo(
+            f"[{name}] {result['mode']} index @ {result['revision'] or 'n/a'}: "
+            f"{symbols['parsed']} files parsed, {symbols['symbols']} symbols, {symbols['refs']} references, "
+            f"{symbols['removed']} files removed ({symbols['seconds']}s, "
+            f"{symbols['files_per_sec']} files/s, {symbols['mb_per_sec']} MB/s)"
+        )
+        if "files" in result:
+            click.echo(f"[{name}] file name index: {result['files']}")
+        if "assets" in result:
+            click.echo(f"[{name}] asset index: {result['assets']}")
+        if "trigram" in result:
+            click.echo(f"[{name}] trigram index: {result['trigram']}")
+        if "history" in result:
+            click.echo(f"[{name}] history index: {result['history']}")
+        if "svn_log" in result:
+            click.echo(f"[{name}] svn log mirror: {result['svn_log']}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,290 @@
+"""
+Asset Index - the dependency graph between Unity / Unreal assets behind `find_asset_dependencies_tool`.
+
+Stored per repository in `.bug_sleuth_agent/asset_index.db`:
+
+- `assets` maps an asset id to its file: the GUID from a Unity `.meta` file, or the package name
+  (`/Game/Characters/Hero/T_Hero_D`) of an Unreal `.uasset` / `.umap` under a `Content` directory.
+- `deps` holds one row per (referencing file, referenced asset id): the `guid:` references of
+  text-serialized Unity assets (prefabs, scenes, materials, controllers ...) and the package
+  names found in the name table of Unreal packages.
+
+Both directions are index seeks, so "which prefabs use this texture" no longer needs a full-text
+search over the asset tree. References to ids that are not in `assets` (Unity built-ins, other
+repositories) are kept and reported as unresolved.
+"""
+import os
+import re
+import sqlite3
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .db_pool import get_pool
+from .vcs import get_index_dir
+
+logger = logging.getLogger(__name__)
+
+ASSET_DB_NAME = "asset_index.db"
+SCHEMA_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS assets (
+    asset_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_assets_path ON assets(path);
+CREATE TABLE IF NOT EXISTS deps (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    PRIMARY KEY (source, target)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_deps_target ON deps(target);
+"""
+
+# Unity assets that are YAML when the project uses "Force Text" serialization
+UNITY_YAML_EXTENSIONS = {
+    ".prefab", ".unity", ".mat", ".asset", ".controller", ".overridecontroller", ".anim",
+    ".playable", ".spriteatlas", ".mask", ".physicmaterial", ".physicsmaterial2d", ".guiskin",
+    ".fontsettings", ".mixer", ".signal", ".lighting", ".terrainlayer", ".brush", ".flare",
+    ".rendertexture", ".cubemap",
+}
+UNREAL_PACKAGE_EXTENSIONS = {".uasset", ".umap"}
+
+# Files larger than this are not scanned (very large scenes / cooked data).
+MAX_SCANNED_FILE_SIZE = 256 * 1024 * 1024
+
+_UNITY_META_GUID = re.compile(rb"^guid: *([0-9a-f]{32})", re.MULTILINE)
+_UNITY_REF_GUID = re.compile(rb"guid: *([0-9a-f]{32})")
+# "/Game/Path/Asset" or "/Game/Path/Asset.Asset" (object path) in a package's name table
+_UNREAL_PACKAGE_NAME = re.compile(rb"/Game/[A-Za-z0-9_\-/]+(?:\.[A-Za-z0-9_]+)?")
+
+_GUID = re.compile(r"^[0-9a-fA-F]{32}$")
+
+
+def _extension(rel_path: str) -> str:
+    return os.path.splitext(rel_path)[1].lower()
+
+
+def unreal_package_name(rel_path: str) -> Optional[str]:
+    """
+    Package name of an Unreal asset from its path: `<Project>/Content/A/B.uasset` -> `/Game/A/B`,
+    `Plugins/<Name>/Content/A.uasset` -> `/<Name>/A`. None for files outside a Content directory.
+    """
+    parts = os.path.splitext(rel_path)[0].split("/")
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i] == "Content":
+            if i >= 2 and parts[i - 2] == "Plugins":
+                mount = parts[i - 1]
+            else:
+                mount = "Game"
+            return "/" + "/".join([mount] + parts[i + 1:])
+    return None
+
+
+def is_asset_file(rel_path: str) -> bool:
+    """Whether the indexer reads this file (a .meta file, Unity YAML asset or Unreal package)."""
+    ext = _extension(rel_path)
+    return ext == ".meta" or ext in UNITY_YAML_EXTENSIONS or ext in UNREAL_PACKAGE_EXTENSIONS
+
+
+def scan_asset_file(rel_path: str, data: bytes) -> Tuple[List[Tuple[str, str]], Set[str]]:
+    """
+    Extract what one file contributes to the graph.
+
+    Returns:
+        (assets, references): `(asset_id, asset_path)` pairs the file defines, and the asset ids
+        it references (its own id excluded).
+    """
+    ext = _extension(rel_path)
+    if ext == ".meta":
+        match = _UNITY_META_GUID.search(data)
+        if not match:
+            return [], set()
+        return [(match.group(1).decode("ascii"), rel_path[:-len(".meta")])], set()
+
+    if ext in UNREAL_PACKAGE_EXTENSIONS:
+        own = unreal_package_name(rel_path)
+        refs = {m.group().split(b".", 1)[0].decode("ascii") for m in _UNREAL_PACKAGE_NAME.finditer(data)}
+        refs.discard(own)
+        return ([(own, rel_path)] if own else []), refs
+
+    if ext in UNITY_YAML_EXTENSIONS and data.startswith(b"%YAML"):
+        return [], {m.group(1).decode("ascii") for m in _UNITY_REF_GUID.finditer(data)}
+    # Binary-serialized Unity asset: the GUIDs are not recoverable without Unity's type trees
+    return [], set()
+
+
+class AssetIndex:
+    """Read/write access to a repository's asset dependency database."""
+
+    def __init__(self, repo_path: str):
+        self.repo_path = os.path.abspath(repo_path)
+        self.db_path = os.path.join(get_index_dir(self.repo_path), ASSET_DB_NAME)
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.db_path)
+
+    def connect(self) -> sqlite3.Connection:
+        """Open (and create if needed) the database with the current schema."""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def indexed_schema(self) -> Optional[str]:
+        """Schema version recorded at the last build, or None if there is no readable index."""
+        if not self.exists():
+            return None
+        try:
+            with get_pool().connection(self.db_path) as conn:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    def _index_files(self, conn: sqlite3.Connection, rel_paths: Iterable[str]) -> Dict[str, int]:
+        """(Re)scan the given files; files that no longer exist only lose their rows."""
+        stats = {"files": 0, "assets": 0, "dependencies": 0}
+        for rel_path in rel_paths:
+            if not is_asset_file(rel_path):
+                continue
+            conn.execute("DELETE FROM deps WHERE source = ?", (rel_path,))
+            ext = _extension(rel_path)
+            if ext == ".meta":
+                conn.execute("DELETE FROM assets WHERE path = ?", (rel_path[:-len(".meta")],))
+            elif ext in UNREAL_PACKAGE_EXTENSIONS:
+                conn.execute("DELETE FROM assets WHERE path = ?", (rel_path,))
+
+            abs_path = os.path.join(self.repo_path, rel_path)
+            try:
+                if os.path.getsize(abs_path) > MAX_SCANNED_FILE_SIZE:
+                    logger.info(f"Skipping large asset {rel_path}")
+                    continue
+                with open(abs_path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+
+            assets, refs = scan_asset_file(rel_path, data)
+            conn.executemany("INSERT OR REPLACE INTO assets (asset_id, path) VALUES (?, ?)", assets)
+            conn.executemany(
+                "INSERT OR IGNORE INTO deps (source, target) VALUES (?, ?)",
+                ((rel_path, target) for target in refs),
+            )
+            stats["files"] += 1
+            stats["assets"] += len(assets)
+            stats["dependencies"] += len(refs)
+        return stats
+
+    def _write(self, rel_paths: List[str], revision: str, reset: bool) -> dict:
+        start = time.perf_counter()
+        conn = self.connect()
+        try:
+            with conn:
+                if reset:
+                    conn.execute("DELETE FROM assets")
+                    conn.execute("DELETE FROM deps")
+                stats = self._index_files(conn, rel_paths)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("schema_version", SCHEMA_VERSION), ("revision", revision)],
+                )
+        finally:
+            conn.close()
+        stats["seconds"] = round(time.perf_counter() - start, 2)
+        return stats
+
+    def rebuild(self, files: List[str], revision: str = "") -> Optional[dict]:
+        """
+        Rebuild from the repository's full file list.
+
+        Returns:
+            dict: Build statistics (files, assets, dependencies, seconds), or None when the
+            repository holds no Unity/Unreal assets (no database is created then).
+        """
+        asset_files = [f for f in files if is_asset_file(f)]
+        if not asset_files and not self.exists():
+            return None
+        stats = self._write(asset_files, revision, reset=True)
+        logger.info(f"Built asset index for {self.repo_path}: {stats}")
+        return stats
+
+    def update(self, rel_paths: List[str], revision: str = "") -> dict:
+        """Re-scan changed (modified, added or deleted) files."""
+        stats = self._write(rel_paths, revision, reset=False)
+        logger.info(f"Updated asset index for {self.repo_path}: {stats}")
+        return stats
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def resolve(self, asset: str) -> List[Tuple[Optional[str], str]]:
+        """
+        Files an asset reference can mean: a Unity GUID, an Unreal package/object name, a path
+        relative to the repository (or absolute inside it), or a trailing part of one ("T_Hero.png").
+
+        Returns:
+            List of (asset_id or None, repo-relative path).
+        """
+        asset = asset.strip()
+        with get_pool().connection(self.db_path) as conn:
+            if _GUID.match(asset):
+                rows = conn.execute("SELECT asset_id, path FROM assets WHERE asset_id = ?", (asset.lower(),))
+                return [(r[0], r[1]) for r in rows]
+            if asset.startswith("/"):
+                # "/Game/A/B" or "/Game/A/B.B" (an absolute file path simply finds nothing here)
+                rows = conn.execute(
+                    "SELECT asset_id, path FROM assets WHERE asset_id = ?", (asset.split(".", 1)[0],)
+                ).fetchall()
+                if rows:
+                    return [(r[0], r[1]) for r in rows]
+
+            rel = asset.replace("\\", "/")
+            if os.path.isabs(asset):
+                rel = os.path.relpath(asset, self.repo_path).replace(os.sep, "/")
+            if rel.endswith(".meta"):
+                rel = rel[:-len(".meta")]
+            paths = set()
+            for condition, value in (
+                ("= ?", rel),
+                ("LIKE ? ESCAPE '\\'", "%/" + rel.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")),
+            ):
+                paths.update(r[0] for r in conn.execute(
+                    f"SELECT path FROM assets WHERE path {condition} "
+                    f"UNION SELECT source FROM deps WHERE source {condition}",
+                    (value, value),
+                ))
+                if paths:
+                    break
+            ids = {}
+            for path in paths:
+                row = conn.execute("SELECT asset_id FROM assets WHERE path = ?", (path,)).fetchone()
+                ids[path] = row[0] if row else None
+        return [(ids[p], p) for p in sorted(paths)]
+
+    def dependents(self, asset_id: str) -> List[Tuple[str, Optional[str]]]:
+        """Files referencing `asset_id`, with their own asset id (None if they have none)."""
+        with get_pool().connection(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT d.source, a.asset_id FROM deps d LEFT JOIN assets a ON a.path = d.source "
+                "WHERE d.target = ? ORDER BY d.source",
+                (asset_id,),
+            ).fetchall()
+        return [(r[0], r[1]) for r in rows]
+
+    def dependencies(self, rel_path: str) -> List[Tuple[str, Optional[str]]]:
+        """Asset ids referenced by `rel_path`, with the path they resolve to (None if unknown)."""
+        with get_pool().connection(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT d.target, a.path FROM deps d LEFT JOIN assets a ON a.asset_id = d.target "
+                "WHERE d.source = ? ORDER BY a.path IS NULL, a.path, d.target",
+                (rel_path,),
+            ).fetchall()
+        return [(r[0], r[1]) for r in rows]
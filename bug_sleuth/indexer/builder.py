@@ -0,0 +1,131 @@
+"""
+Index Builder - keeps a repository's indexes in sync with its working copy.
+
+The first run parses every file. Later runs ask the VCS what changed since the revision recorded
+in the index (`git diff --name-only` / `svn diff --summarize`, plus local modifications from
+`git status` / `svn status`) and re-parse only those files.
+"""
+import os
+import json
+import logging
+from typing import Optional
+
+from .symbol_index import SymbolIndex, SCHEMA_VERSION, ProgressCallback
+from .trigram_index import TrigramIndex
+from .file_index import FileNameIndex
+from .asset_index import AssetIndex, SCHEMA_VERSION as ASSET_SCHEMA_VERSION
+from .history_index import HistoryIndex
+from .svn_log_mirror import SvnLogMirror, read_svn_info
+from .vcs import get_committed_changes, get_local_changes, get_repo_revision, list_repo_files
+
+logger = logging.getLogger(__name__)
+
+
+def _detect_changes(repo_path: str, vcs: str, meta: dict, revision: str, local: Optional[list]) -> Optional[list]:
+    """
+    Files to re-index since the last run, or None when a full rebuild is required.
+    Files that had local modifications last time are re-checked too (they may have been reverted).
+    """
+    last_revision = meta.get("revision")
+    if meta.get("schema_version") != SCHEMA_VERSION or not last_revision or not revision:
+        return None
+
+    committed = get_committed_changes(repo_path, vcs, last_revision, revision)
+    if committed is None or local is None:
+        return None
+
+    try:
+        previous_local = json.loads(meta.get("local_changes", "[]"))
+    except ValueError:
+        previous_local = []
+    return sorted(set(committed) | set(local) | set(previous_local))
+
+
+def index_repository(
+    repo_path: str,
+    vcs: str = "git",
+    full: bool = False,
+    workers: Optional[int] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> dict:
+    """
+    Build or incrementally refresh the symbol index, the file name index used by
+    search_res_tool, the asset dependency index (repositories with Unity/Unreal assets) and,
+    for non-SVN repositories, the trigram index used by search_code_tool and the commit history
+    index used by get_git_log_tool. SVN working copies get a local mirror of the repository's
+    revision metadata for get_svn_log_tool instead.
+
+    Args:
+        repo_path: Repository root.
+        vcs: "git" or "svn".
+        full: Force a full rebuild even if an incremental update is possible.
+        workers: Parser processes (default: one per CPU core).
+        on_progress: Optional callback(files_done, files_total, bytes_done, elapsed_seconds).
+
+    Returns:
+        dict: {"mode": "full"|"incremental", "revision": ..., "symbols": {...}, "files": {...}, "assets": {...}, "trigram": {...}, "history": {...}, "svn_log": {...}}
+    """
+    repo_path = os.path.abspath(repo_path)
+    vcs = (vcs or "git").lower()
+    symbols = SymbolIndex(repo_path)
+    meta = symbols.get_meta()
+
+    revision = get_repo_revision(repo_path, vcs) or ""
+    local = get_local_changes(repo_path, vcs) if revision else []
+    changed = None if full else _detect_changes(repo_path, vcs, meta, revision, local)
+
+    new_meta = {
+        "revision": revision,
+        "vcs": vcs,
+        "local_changes": json.dumps(local or []),
+    }
+
+    result = {"revision": revision}
+    files = None
+    if changed is None:
+        logger.info(f"Full index of {repo_path} (revision {revision or 'n/a'})")
+        result["mode"] = "full"
+        files = list_repo_files(repo_path)
+        result["symbols"] = symbols.rebuild(files, new_meta, workers, on_progress)
+    else:
+        logger.info(f"Incremental index of {repo_path}: {len(changed)} changed files since {meta.get('revision')}")
+        result["mode"] = "incremental"
+        result["symbols"] = symbols.update(changed, new_meta, workers, on_progress)
+
+    # Asset lookups happen mostly in SVN repositories, so every repository gets a file name index
+    file_names = FileNameIndex(repo_path)
+    if changed is not None and file_names.exists():
+        result["files"] = file_names.update(changed, revision)
+    else:
+        result["files"] = file_names.build(revision, files)
+
+    assets = AssetIndex(repo_path)
+    if changed is not None and assets.indexed_schema() == ASSET_SCHEMA_VERSION:
+        result["assets"] = assets.update(changed, revision)
+    else:
+        stats = assets.rebuild(files if files is not None else list_repo_files(repo_path), revision)
+        if stats is not None:
+            result["assets"] = stats
+
+    # Content search skips SVN (asset) repositories, so only git/plain repos get a trigram index
+    if vcs != "svn":
+        trigram = TrigramIndex(repo_path)
+        if changed is not None and trigram.indexed_revision() == meta.get("revision"):
+            result["trigram"] = trigram.update(changed, revision)
+        else:
+            result["trigram"] = trigram.build(revision)
+
+        # Commit history follows HEAD, not the working copy, so it is only extended or rebuilt
+        history = HistoryIndex(repo_path).update(full=full)
+        if history is not None:
+            result["history"] = history
+    else:
+        # Revision metadata only grows, so the mirror just fetches what is newer than it
+        info = read_svn_info(repo_path)
+        if info is not None:
+            try:
+                result["svn_log"] = SvnLogMirror(info.wc_root, info.root_url).sync()
+            except OSError as e:
+                logger.warning(f"Could not sync the svn log mirror of {repo_path}: {e}")
+
+    return result
@@ -0,0 +1,104 @@
+"""
+Symbol extraction for config tables (JSON / XML).
+
+Only the top level is indexed: the keys of a JSON root object, and the children of an XML root
+element (named after their id/name/key attribute, or their tag). That is where game config
+tables keep their rows ("1001": {...}, <Item id="Sword" .../>), and it keeps the symbol table
+small for large data files. Both scanners are streaming and never build the document tree.
+"""
+import re
+import json
+import logging
+from typing import List
+from xml.parsers import expat
+
+from .parsers import Symbol
+
+logger = logging.getLogger(__name__)
+
+CONFIG_KEY_TYPE = "key"
+
+# Attributes that name an XML row, in order of preference (matched case-insensitively)
+XML_NAME_ATTRIBUTES = ("id", "name", "key")
+
+# JSON tokens that matter for locating top-level keys; everything else (numbers, literals,
+# whitespace other than newlines) is skipped by finditer.
+_JSON_TOKEN = re.compile(r'"(?:[^"\\\n]|\\.)*"|[{}\[\]:,]|\n')
+
+
+def extract_json_keys(source: bytes) -> List[Symbol]:
+    """Top-level keys of a JSON object, spanning the lines of their values."""
+    text = source.decode("utf-8-sig", errors="replace")
+    symbols: List[Symbol] = []
+    line = 1
+    token_line = 1       # line of the last non-newline token
+    depth = 0
+    last_string = None   # (key, line) of the last string seen at depth 1
+    current = None       # (key, start_line) of the key whose value is being read
+
+    for match in _JSON_TOKEN.finditer(text):
+        token = match.group()
+        if token == "\n":
+            line += 1
+            continue
+        last_line, token_line = token_line, line
+        if token in "{[":
+            if depth == 0 and token == "[":
+                # Array root: no keys to index
+                return []
+            depth += 1
+        elif token in "}]":
+            depth -= 1
+            if depth == 0:
+                # The root's closing brace usually sits on its own line after the last value
+                line = last_line
+                break
+        elif depth != 1:
+            continue
+        elif token == ":":
+            if last_string is not None:
+                current, last_string = last_string, None
+        elif token == ",":
+            if current is not None:
+                symbols.append(Symbol(current[0], CONFIG_KEY_TYPE, current[1], line, ""))
+                current = None
+        else:
+            try:
+                last_string = (json.loads(token), line)
+            except ValueError:
+                last_string = (token[1:-1], line)
+
+    if current is not None:
+        symbols.append(Symbol(current[0], CONFIG_KEY_TYPE, current[1], line, ""))
+    return symbols
+
+
+def extract_xml_keys(source: bytes) -> List[Symbol]:
+    """Children of the XML root element. Malformed documents yield the rows parsed so far."""
+    symbols: List[Symbol] = []
+    open_rows = []  # [name, start_line] of the depth-2 element being read
+    state = {"depth": 0, "root": ""}
+    parser = expat.ParserCreate()
+
+    def start(tag, attrs):
+        state["depth"] += 1
+        if state["depth"] == 1:
+            state["root"] = tag
+        elif state["depth"] == 2:
+            by_lower = {k.lower(): v for k, v in attrs.items()}
+            name = next((by_lower[a] for a in XML_NAME_ATTRIBUTES if by_lower.get(a)), tag)
+            open_rows.append((name, parser.CurrentLineNumber))
+
+    def end(tag):
+        if state["depth"] == 2 and open_rows:
+            name, start_line = open_rows.pop()
+            symbols.append(Symbol(name, CONFIG_KEY_TYPE, start_line, parser.CurrentLineNumber, state["root"]))
+        state["depth"] -= 1
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    try:
+        parser.Parse(source, True)
+    except expat.ExpatError as e:
+        logger.debug(f"XML parse stopped early: {e}")
+    return symbols
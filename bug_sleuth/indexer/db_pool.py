@@ -0,0 +1,111 @@
+"""
+Read-only SQLite connection pool for the query tools.
+
+Tool calls used to open (and close) a connection per repository per call. The pool keeps idle
+connections per database file so repeated lookups skip the open, reuse the connection's
+prepared-statement cache and keep the memory map warm.
+
+Connections are opened with `mode=ro` and SQLite's normal locking, because `bug-sleuth index`
+may rewrite a database in place while the agent is running (SymbolIndex and AssetIndex delete and
+re-insert rows): a read either sees the old or the new contents, never a half-written page.
+Indexes that are rebuilt into a temp file and swapped in with `os.replace` leave pooled
+connections on the old file, so every checkout also compares the file's (mtime, size) with the
+values seen when the pooled connections were opened, and reopens them when it changed.
+"""
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Idle connections kept per database file.
+MAX_IDLE_PER_DB = 4
+# Upper bound for memory-mapped I/O per connection (SQLite never maps more than the file size).
+MMAP_SIZE = 256 * 1024 * 1024
+# Per-connection prepared statement cache (sqlite3 module default is 128).
+CACHED_STATEMENTS = 256
+
+_Signature = Tuple[int, int]
+
+
+def _signature(db_path: str) -> _Signature:
+    st = os.stat(db_path)
+    return st.st_mtime_ns, st.st_size
+
+
+class ReadOnlyConnectionPool:
+    """Thread-safe pool of read-only connections, keyed by database path."""
+
+    def __init__(self, max_idle: int = MAX_IDLE_PER_DB):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        # db_path -> (signature the idle connections were opened at, idle connections)
+        self._idle: Dict[str, Tuple[_Signature, List[sqlite3.Connection]]] = {}
+
+    @staticmethod
+    def _open(db_path: str) -> sqlite3.Connection:
+        uri = "file:" + db_path.replace("\\", "/") + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self, db_path: str) -> Iterator[sqlite3.Connection]:
+        """
+        Check out a connection to `db_path` for the duration of the `with` block.
+
+        Raises:
+            FileNotFoundError: The database does not exist.
+        """
+        db_path = os.path.abspath(db_path)
+        signature = _signature(db_path)
+        conn = None
+        stale: List[sqlite3.Connection] = []
+        with self._lock:
+            entry = self._idle.get(db_path)
+            if entry is not None and entry[0] != signature:
+                stale = entry[1]
+                entry = None
+                del self._idle[db_path]
+            if entry is not None and entry[1]:
+                conn = entry[1].pop()
+        for old in stale:
+            old.close()
+        if stale:
+            logger.info(f"Index {db_path} changed, reopened pooled connections.")
+
+        if conn is None:
+            conn = self._open(db_path)
+        try:
+            yield conn
+        finally:
+            self._release(db_path, signature, conn)
+
+    def _release(self, db_path: str, signature: _Signature, conn: sqlite3.Connection):
+        with self._lock:
+            entry = self._idle.setdefault(db_path, (signature, []))
+            if entry[0] == signature and len(entry[1]) < self.max_idle:
+                entry[1].append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        """Close every idle connection. Connections currently checked out return to the pool as usual."""
+        with self._lock:
+            entries = list(self._idle.values())
+            self._idle.clear()
+        for _, conns in entries:
+            for conn in conns:
+                conn.close()
+
+
+_default_pool = ReadOnlyConnectionPool()
+
+
+def get_pool() -> ReadOnlyConnectionPool:
+    """The process-wide pool shared by all tools."""
+    return _default_pool
@@ -0,0 +1,397 @@
+"""
+File Name Index - answers filename lookups (search_res_tool) without walking the repository.
+
+`bug-sleuth index` stores every file path of the repository, plus the mtime of every directory
+that holds them, in `.bug_sleuth_agent/file_index.db`. Tools load it into memory once per
+process: the paths are kept sorted and their lowercased basenames (and full paths) are joined
+into one newline-separated string, so a glob compiles to a single multiline regex that runs over
+that string in C, and each match offset maps back to its path by bisection.
+
+The in-memory copy is kept fresh through the directory mtimes: at most every REFRESH_INTERVAL
+seconds the known directories are stat()ed and only those whose mtime changed (an entry was
+added, removed or renamed in them) are listed again. Editing a file in place does not change
+its name, so it needs no refresh.
+"""
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+import subprocess
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .db_pool import get_pool
+from .vcs import _find_git_dir, get_index_dir, list_repo_files
+
+logger = logging.getLogger(__name__)
+
+FILE_INDEX_DB_NAME = "file_index.db"
+INDEX_FORMAT_VERSION = "1"
+
+# Minimum seconds between two directory mtime checks of the same repository.
+REFRESH_INTERVAL = 10.0
+
+
+def _parent(rel_path: str) -> str:
+    return rel_path.rsplit("/", 1)[0] if "/" in rel_path else ""
+
+
+def _with_ancestors(rel_dirs: Iterable[str]) -> Set[str]:
+    """The given directories and all their parents, up to the root ("")."""
+    out = {""}
+    for rel_dir in rel_dirs:
+        while rel_dir and rel_dir not in out:
+            out.add(rel_dir)
+            rel_dir = _parent(rel_dir)
+    return out
+
+
+def glob_to_regex(pattern: str) -> Tuple[re.Pattern, bool]:
+    """
+    Compile a ripgrep-style glob into a multiline regex over lowercased, newline-joined names.
+
+    Like `rg --iglob`, a pattern without '/' matches the basename anywhere in the tree; one with
+    '/' matches the whole path relative to the repository root ('**' spans directories).
+    Supports '*', '?', '[...]' / '[!...]' and '{a,b}'.
+
+    Returns:
+        (regex, full_path): full_path tells whether to run it over paths or basenames.
+    """
+    pattern = pattern.lower().replace("\\", "/")
+    full_path = "/" in pattern
+    if full_path:
+        pattern = pattern.lstrip("/")
+    star = "[^/\n]*" if full_path else "[^\n]*"
+
+    out = []
+    braces = 0
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if full_path and pattern.startswith("**", i):
+                i += 2
+                if pattern.startswith("/", i):
+                    out.append("(?:[^\n]*/)?")
+                    i += 1
+                else:
+                    out.append("[^\n]*")
+                continue
+            out.append(star)
+        elif c == "?":
+            out.append("[^/\n]")
+        elif c == "[":
+            # A ']' right after '[' or '[!' is a literal member of the class
+            start = i + 2 if pattern.startswith(("[!", "[^"), i) else i + 1
+            end = pattern.find("]", start + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body[0] in "!^":
+                    body = "^/\n" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        elif c == "{":
+            braces += 1
+            out.append("(?:")
+        elif c == "}" and braces:
+            braces -= 1
+            out.append(")")
+        elif c == "," and braces:
+            out.append("|")
+        else:
+            out.append(re.escape(c))
+        i += 1
+    out.append(")" * braces)
+
+    # A basename glob's leading/trailing '*' can match anything up to the line boundary, so
+    # leave that side unanchored instead: the regex engine then jumps straight to the literal
+    # part instead of trying every line start (the caller dedupes several hits on one line).
+    head, tail = "^", "$"
+    if not full_path and out and out[0] == star:
+        head = ""
+        out = out[1:]
+    if not full_path and out and out[-1] == star:
+        tail = ""
+        out = out[:-1]
+    return re.compile(head + "".join(out) + tail, re.MULTILINE), full_path
+
+
+class _Snapshot:
+    """One repository's file list in memory, with lazily built search strings."""
+
+    def __init__(self, paths: Set[str], dirs: Dict[str, int]):
+        self.paths = paths
+        self.dirs = dirs  # rel_dir -> st_mtime_ns
+        self.checked_at = time.monotonic()
+        self.lock = threading.Lock()
+        self._view = None
+
+    def invalidate(self):
+        self._view = None
+
+    def _build_view(self):
+        ordered = sorted(self.paths)
+        lowered = [p.lower() for p in ordered]
+        names = [p.rsplit("/", 1)[-1] for p in lowered]
+        views = {}
+        for full_path, entries in ((True, lowered), (False, names)):
+            offsets = list(accumulate((len(e) + 1 for e in entries), initial=0))
+            views[full_path] = ("\n".join(entries), offsets)
+        return ordered, views
+
+    def match(self, regex: re.Pattern, full_path: bool) -> List[str]:
+        view = self._view
+        if view is None:
+            view = self._view = self._build_view()
+        ordered, views = view
+        blob, offsets = views[full_path]
+        found = []
+        last = -1
+        for m in regex.finditer(blob):
+            i = bisect_right(offsets, m.start()) - 1
+            if i != last:
+                found.append(ordered[i])
+                last = i
+        return found
+
+
+class FileNameIndex:
+    """On-disk file name index for a single repository, queried through an in-memory copy."""
+
+    # repo_path -> (db signature the snapshot was loaded at, snapshot)
+    _loaded: Dict[str, Tuple[Tuple[int, int], _Snapshot]] = {}
+    _loaded_lock = threading.Lock()
+
+    def __init__(self, repo_path: str):
+        self.repo_path = os.path.abspath(repo_path)
+        self.db_path = os.path.join(get_index_dir(self.repo_path), FILE_INDEX_DB_NAME)
+        self._is_git = _find_git_dir(self.repo_path) is not None
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.db_path)
+
+    # ------------------------------------------------------------------
+    # Directory scanning
+    # ------------------------------------------------------------------
+
+    def _stat_dirs(self, rel_dirs: Iterable[str]) -> Dict[str, int]:
+        mtimes = {}
+        for rel_dir in rel_dirs:
+            try:
+                mtimes[rel_dir] = os.stat(os.path.join(self.repo_path, rel_dir)).st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    def _git_ignored(self, rel_paths: List[str]) -> Set[str]:
+        """The subset of `rel_paths` (directories end with '/') excluded by .gitignore."""
+        if not self._is_git or not rel_paths:
+            return set()
+        try:
+            completed = subprocess.run(
+                ["git", "check-ignore", "-z", "--stdin"],
+                input="\0".join(rel_paths).encode("utf-8", errors="surrogateescape"),
+                cwd=self.repo_path,
+                capture_output=True,
+            )
+        except OSError as e:
+            logger.warning(f"git check-ignore failed in {self.repo_path}: {e}")
+            return set()
+        # rc=1 means nothing is ignored
+        return {p for p in completed.stdout.decode("utf-8", errors="surrogateescape").split("\0") if p}
+
+    def _list_dirs(self, rel_dirs: List[str]) -> Tuple[List[str], List[str]]:
+        """Visible (non-hidden, not git-ignored) files and subdirectories directly in `rel_dirs`."""
+        files, subdirs = [], []
+        for rel_dir in rel_dirs:
+            try:
+                with os.scandir(os.path.join(self.repo_path, rel_dir)) as entries:
+                    for entry in entries:
+                        if entry.name.startswith("."):
+                            continue
+                        rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                        try:
+                            (subdirs if entry.is_dir(follow_symlinks=False) else files).append(rel)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        ignored = self._git_ignored(files + [d + "/" for d in subdirs])
+        return (
+            [f for f in files if f not in ignored],
+            [d for d in subdirs if d + "/" not in ignored],
+        )
+
+    def _refresh(self, snapshot: _Snapshot, force: bool = False) -> int:
+        """
+        Re-list the directories whose mtime changed since the snapshot saw them.
+
+        Returns:
+            int: Number of directories re-listed.
+        """
+        now = time.monotonic()
+        if not force and now - snapshot.checked_at < REFRESH_INTERVAL:
+            return 0
+        snapshot.checked_at = now
+
+        current = self._stat_dirs(snapshot.dirs)
+        changed = {d for d, mtime in snapshot.dirs.items() if current.get(d) != mtime}
+        if not changed:
+            return 0
+
+        # Drop what the changed (or deleted) directories held, then list them again level by
+        # level (one ignore check per level)
+        snapshot.paths = {p for p in snapshot.paths if _parent(p) not in changed}
+        level = [d for d in changed if d in current]
+        for d in changed:
+            snapshot.dirs.pop(d, None)
+        while level:
+            files, subdirs = self._list_dirs(level)
+            snapshot.paths.update(files)
+            snapshot.dirs.update(self._stat_dirs(level))
+            # Known subdirectories are checked on their own; new ones are walked entirely
+            level = [d for d in subdirs if d not in snapshot.dirs]
+        snapshot.invalidate()
+        logger.info(f"File name index of {self.repo_path}: re-listed {len(changed)} changed directories.")
+        return len(changed)
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    def _write(self, snapshot: _Snapshot, revision: str):
+        """Write the snapshot to a temporary database and swap it in atomically."""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        tmp_path = self.db_path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(
+                """
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE files (path TEXT NOT NULL);
+                CREATE TABLE dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL);
+                """
+            )
+            conn.executemany("INSERT INTO files (path) VALUES (?)", ((p,) for p in sorted(snapshot.paths)))
+            conn.executemany("INSERT INTO dirs (path, mtime_ns) VALUES (?, ?)", snapshot.dirs.items())
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("format", INDEX_FORMAT_VERSION),
+                    ("revision", revision),
+                    ("built_at", str(int(time.time()))),
+                ],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.db_path)
+
+    def _read(self) -> Optional[_Snapshot]:
+        """Load the database into a snapshot, or None if it is missing or of another format."""
+        try:
+            with get_pool().connection(self.db_path) as conn:
+                meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+                if meta.get("format") != INDEX_FORMAT_VERSION:
+                    return None
+                paths = {r[0] for r in conn.execute("SELECT path FROM files")}
+                dirs = dict(conn.execute("SELECT path, mtime_ns FROM dirs").fetchall())
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"File name index unreadable at {self.db_path}: {e}")
+            return None
+        return _Snapshot(paths, dirs)
+
+    def build(self, revision: str = "", files: Optional[List[str]] = None) -> dict:
+        """
+        (Re)build the index from scratch.
+
+        Args:
+            revision: Revision recorded in the index metadata.
+            files: The repository's file list, if the caller already has it (see list_repo_files).
+
+        Returns:
+            dict: Build statistics (files, dirs, seconds).
+        """
+        start = time.perf_counter()
+        if files is None:
+            files = list_repo_files(self.repo_path)
+        snapshot = _Snapshot(set(files), self._stat_dirs(_with_ancestors(_parent(f) for f in files)))
+        self._write(snapshot, revision)
+
+        stats = {"files": len(snapshot.paths), "dirs": len(snapshot.dirs), "seconds": round(time.perf_counter() - start, 2)}
+        logger.info(f"Built file name index for {self.repo_path}: {stats}")
+        return stats
+
+    def update(self, rel_paths: List[str], revision: str) -> dict:
+        """
+        Apply the files a VCS reported as changed (added or deleted), then re-list any other
+        directory whose mtime moved, and write the index back.
+
+        Returns:
+            dict: Update statistics (files, relisted_dirs, seconds).
+        """
+        start = time.perf_counter()
+        snapshot = self._read()
+        if snapshot is None:
+            return self.build(revision)
+
+        for rel_path in rel_paths:
+            if any(part.startswith(".") for part in rel_path.split("/")):
+                continue
+            if os.path.isfile(os.path.join(self.repo_path, rel_path)):
+                snapshot.paths.add(rel_path)
+            else:
+                snapshot.paths.discard(rel_path)
+        relisted = self._refresh(snapshot, force=True)
+        # Directories of files added through the VCS report may not be known yet
+        snapshot.dirs.update(self._stat_dirs(_with_ancestors(_parent(p) for p in rel_paths) - snapshot.dirs.keys()))
+        self._write(snapshot, revision)
+
+        stats = {"files": len(snapshot.paths), "relisted_dirs": relisted, "seconds": round(time.perf_counter() - start, 2)}
+        logger.info(f"Updated file name index for {self.repo_path}: {stats}")
+        return stats
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def _snapshot(self) -> Optional[_Snapshot]:
+        """The process-wide snapshot of this index, reloaded when the database is rewritten."""
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._loaded_lock:
+            entry = self._loaded.get(self.repo_path)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+        snapshot = self._read()
+        if snapshot is None:
+            return None
+        with self._loaded_lock:
+            self._loaded[self.repo_path] = (signature, snapshot)
+        return snapshot
+
+    def find(self, pattern: str) -> Optional[List[str]]:
+        """
+        Relative paths (POSIX separators, sorted) matching the glob `pattern`, case-insensitively.
+
+        Returns:
+            The matching paths, or None when there is no usable index (callers fall back to a walk).
+        """
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return None
+        regex, full_path = glob_to_regex(pattern)
+        with snapshot.lock:
+            self._refresh(snapshot)
+            return snapshot.match(regex, full_path)
@@ -0,0 +1,351 @@
+"""
+History Index - commit metadata of a git repository for get_git_log_tool.
+
+Stored per repository in `.bug_sleuth_agent/history_index.db`: one row per commit reachable from
+HEAD (hash, author, dates, subject) and one row per (path, commit) that touched the path
+(`git log --name-only --no-renames`, so a rename touches both names). Path, author and time
+window queries are index seeks instead of a `git log -- <path>` history walk.
+
+The index records the HEAD it was built at. When HEAD moves forward, only `<old>..HEAD` is read
+and appended; when it moves to a commit that does not contain the old HEAD (branch switch,
+rebase), `bug-sleuth index` rebuilds it. Tools extend the index on demand (never rebuild it),
+so unlike the other indexes it is written while the agent runs: every write is one transaction,
+and queries use ordinary connections rather than the pooled read-only ones.
+
+Building also writes git's own commit-graph with changed-path Bloom filters, which speeds up the
+`git log -- <path>` queries the index cannot answer.
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+import subprocess
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .vcs import get_git_head, get_index_dir
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DB_NAME = "history_index.db"
+SCHEMA_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS commits (
+    seq INTEGER PRIMARY KEY,            -- Insertion order; breaks commit_time ties (newest has the highest)
+    hash TEXT NOT NULL UNIQUE,
+    author TEXT NOT NULL,
+    email TEXT NOT NULL,
+    author_time INTEGER NOT NULL,
+    author_tz TEXT NOT NULL,
+    commit_time INTEGER NOT NULL,
+    subject TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_commits_time ON commits(commit_time);
+CREATE TABLE IF NOT EXISTS paths (
+    path_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS changes (
+    path_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (path_id, seq)
+) WITHOUT ROWID;
+"""
+
+# Commits inserted per executemany while reading `git log`.
+INSERT_BATCH_SIZE = 5000
+
+_LOG_FORMAT = "%x1e%H%x1f%an%x1f%ae%x1f%ad%x1f%ct%x1f%s%x1f"
+
+
+class LoggedCommit(NamedTuple):
+    hash: str
+    author: str
+    email: str
+    author_time: int
+    author_tz: str
+    commit_time: int
+    subject: str
+    paths: List[str]
+
+
+def _parse_record(record: bytes) -> Optional[LoggedCommit]:
+    # Non-UTF-8 names (e.g. GBK paths committed from Windows) are stored with U+FFFD: SQLite
+    # cannot encode the lone surrogates of surrogateescape
+    parts = record.decode("utf-8", errors="replace").split("\x1f", 6)
+    if len(parts) != 7:
+        return None
+    commit_hash, author, email, date, commit_time, subject, rest = parts
+    stamp = date.split()
+    names = [n for n in rest.split("\0") if n.strip("\n")]
+    if names:
+        names[0] = names[0].lstrip("\n")
+    return LoggedCommit(
+        commit_hash, author, email,
+        int(stamp[0]) if stamp else 0, stamp[1] if len(stamp) > 1 else "+0000",
+        int(commit_time or 0), subject, names,
+    )
+
+
+def iter_git_log(repo_path: str, revision_range: str) -> Iterator[LoggedCommit]:
+    """Stream `git log --name-only --reverse` for `revision_range`, oldest first."""
+    proc = subprocess.Popen(
+        [
+            "git", "log", "--reverse", "--no-renames", "--name-only", "-z", "--date=raw",
+            f"--format={_LOG_FORMAT}", revision_range, "--",
+        ],
+        cwd=repo_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        buffer = b""
+        for chunk in iter(lambda: proc.stdout.read(1 << 20), b""):
+            buffer += chunk
+            records = buffer.split(b"\x1e")
+            buffer = records.pop()
+            for record in records:
+                if record:
+                    commit = _parse_record(record)
+                    if commit is not None:
+                        yield commit
+        if buffer:
+            commit = _parse_record(buffer)
+            if commit is not None:
+                yield commit
+    finally:
+        proc.stdout.close()
+        proc.wait()
+    if proc.returncode != 0:
+        raise OSError(f"git log {revision_range} failed in {repo_path} (rc={proc.returncode})")
+
+
+def write_commit_graph(repo_path: str) -> bool:
+    """Write git's commit-graph with changed-path Bloom filters (git 2.27+). Returns success."""
+    try:
+        completed = subprocess.run(
+            ["git", "commit-graph", "write", "--reachable", "--changed-paths"],
+            cwd=repo_path,
+            capture_output=True,
+        )
+    except OSError as e:
+        logger.warning(f"git commit-graph failed in {repo_path}: {e}")
+        return False
+    if completed.returncode != 0:
+        logger.warning(f"git commit-graph write failed in {repo_path}: {completed.stderr[:200]!r}")
+        return False
+    return True
+
+
+def _is_ancestor(repo_path: str, ancestor: str, descendant: str) -> bool:
+    completed = subprocess.run(
+        ["git", "merge-base", "--is-ancestor", ancestor, descendant], cwd=repo_path, capture_output=True
+    )
+    return completed.returncode == 0
+
+
+class HistoryIndex:
+    """Read/write access to a repository's commit history database."""
+
+    # One writer per database within the process (tool calls may refresh concurrently)
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, repo_path: str):
+        self.repo_path = os.path.abspath(repo_path)
+        self.db_path = os.path.join(get_index_dir(self.repo_path), HISTORY_DB_NAME)
+        with HistoryIndex._locks_guard:
+            self._lock = HistoryIndex._locks.setdefault(self.db_path, threading.Lock())
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.db_path)
+
+    def connect(self) -> sqlite3.Connection:
+        """Open (and create if needed) the database with the current schema."""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _get_meta(self, conn: sqlite3.Connection) -> Dict[str, str]:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def indexed_head(self) -> Optional[str]:
+        """HEAD the index was last extended to, or None if there is no usable index."""
+        if not self.exists():
+            return None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                meta = self._get_meta(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+        if meta.get("schema_version") != SCHEMA_VERSION:
+            return None
+        return meta.get("head")
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    def _append(self, conn: sqlite3.Connection, revision_range: str) -> int:
+        """Insert the commits of `revision_range` (oldest first, so `seq` follows history order)."""
+        next_seq = (conn.execute("SELECT MAX(seq) FROM commits").fetchone()[0] or 0) + 1
+        path_ids: Dict[str, int] = {}
+        rows: List[tuple] = []
+        changes: List[Tuple[int, int]] = []
+        added = 0
+
+        def path_id(path: str) -> int:
+            pid = path_ids.get(path)
+            if pid is None:
+                conn.execute("INSERT OR IGNORE INTO paths (path) VALUES (?)", (path,))
+                pid = conn.execute("SELECT path_id FROM paths WHERE path = ?", (path,)).fetchone()[0]
+                path_ids[path] = pid
+            return pid
+
+        def flush():
+            conn.executemany(
+                "INSERT OR IGNORE INTO commits (seq, hash, author, email, author_time, author_tz, commit_time, subject) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany("INSERT OR IGNORE INTO changes (path_id, seq) VALUES (?, ?)", changes)
+            rows.clear()
+            changes.clear()
+
+        for c in iter_git_log(self.repo_path, revision_range):
+            rows.append((next_seq, c.hash, c.author, c.email, c.author_time, c.author_tz, c.commit_time, c.subject))
+            changes.extend((path_id(p), next_seq) for p in set(c.paths))
+            next_seq += 1
+            added += 1
+            if len(rows) >= INSERT_BATCH_SIZE:
+                flush()
+        flush()
+        return added
+
+    def _write(self, head: str, previous: Optional[str]) -> dict:
+        """Full build (previous None) or append `previous..head`, in a single transaction."""
+        start = time.perf_counter()
+        conn = self.connect()
+        try:
+            with conn:
+                if previous is None:
+                    mode = "full"
+                    for table in ("changes", "commits", "paths", "meta"):
+                        conn.execute(f"DELETE FROM {table}")
+                    added = self._append(conn, head)
+                else:
+                    mode = "incremental"
+                    added = self._append(conn, f"{previous}..{head}")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("schema_version", SCHEMA_VERSION), ("head", head)],
+                )
+            total = conn.execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+        finally:
+            conn.close()
+        return {"mode": mode, "added": added, "commits": total, "seconds": round(time.perf_counter() - start, 2)}
+
+    def update(self, full: bool = False, allow_rebuild: bool = True) -> Optional[dict]:
+        """
+        Bring the index to the current HEAD: append the new commits, or rebuild when HEAD no longer
+        contains the indexed head. Also refreshes git's commit-graph on full builds.
+
+        Args:
+            full: Rebuild even if the index could be extended.
+            allow_rebuild: If False, return None instead of starting a full build.
+
+        Returns:
+            dict: Statistics (mode, added, commits, seconds), or None if the repository has no HEAD
+            (or a rebuild would be needed and is not allowed).
+        """
+        head = get_git_head(self.repo_path)
+        if head is None:
+            return None
+        with self._lock:
+            previous = None if full else self.indexed_head()
+            if previous == head:
+                return {"mode": "unchanged", "added": 0, "seconds": 0.0}
+            if previous is not None and not _is_ancestor(self.repo_path, previous, head):
+                logger.info(f"History of {self.repo_path} was rewritten ({previous[:10]} is not in HEAD).")
+                previous = None
+            if previous is None and not allow_rebuild:
+                return None
+            stats = self._write(head, previous)
+        if stats["mode"] == "full":
+            stats["commit_graph"] = write_commit_graph(self.repo_path)
+        logger.info(f"Updated history index for {self.repo_path}: {stats}")
+        return stats
+
+    def refresh(self) -> bool:
+        """
+        Extend an existing index to HEAD (cheap when HEAD moved forward a few commits).
+        Never builds or rebuilds the index. Returns whether the index matches HEAD.
+        """
+        if self.indexed_head() is None:
+            return False
+        try:
+            return self.update(allow_rebuild=False) is not None
+        except (OSError, sqlite3.Error, subprocess.SubprocessError) as e:
+            logger.warning(f"Could not refresh history index of {self.repo_path}: {e}")
+            return False
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def query(
+        self,
+        path: Optional[str] = None,
+        author: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        limit: int = 5,
+    ) -> List[LoggedCommit]:
+        """
+        Newest-first commits matching every given filter, ordered by committer time like `git log`
+        (`seq` alone would put commits of a branch merged after the last refresh above newer ones).
+
+        Args:
+            path: Repository-relative file or directory ('' or None for the whole repository).
+            author: Case-insensitive substring of the author name or email.
+            since / until: Committer time window (Unix seconds, inclusive), as `git log --since/--until`.
+        """
+        where: List[str] = []
+        params: List[object] = []
+        if path:
+            path = path.strip("/")
+            # The file itself, or anything under it as a directory ('0' sorts right after '/')
+            where.append(
+                "c.seq IN (SELECT ch.seq FROM changes ch JOIN paths p ON p.path_id = ch.path_id "
+                "WHERE p.path = ? OR (p.path >= ? AND p.path < ?))"
+            )
+            params += [path, path + "/", path + "0"]
+        if author:
+            pattern = "%" + author.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where.append("(c.author LIKE ? ESCAPE '\\' OR c.email LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern]
+        if since is not None:
+            where.append("c.commit_time >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("c.commit_time <= ?")
+            params.append(until)
+
+        sql = "SELECT c.hash, c.author, c.email, c.author_time, c.author_tz, c.commit_time, c.subject FROM commits c"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY c.commit_time DESC, c.seq DESC LIMIT ?"
+        params.append(limit)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [LoggedCommit(*row, []) for row in rows]
@@ -0,0 +1,613 @@
+"""
+Symbol extraction for the symbol index.
+
+Languages are registered in `LANGUAGES` (see `register_language`): each maps file extensions to
+either a tree-sitter grammar package plus a symbol visitor, or a plain extractor function. A
+language whose grammar package is not installed is skipped (with a warning) instead of failing
+the index run.
+
+Tree-sitter languages may also define `RefRules`, which turn the same parse tree into identifier
+references (the `refs` table behind `find_references_tool`). Each reference records the innermost
+enclosing definition, so call sites can be grouped by caller.
+
+Symbol `type` values are what `search_symbol_tool` accepts as `type_filter`:
+    C#      class, struct, interface, record, enum, delegate, method, constructor, property,
+            field, event, enum_member
+    C/C++   namespace, class, struct, union, enum, enum_member, function, method, field,
+            variable, typedef, macro
+    Lua     function, table
+    Python  class, function, method, variable, field
+    JSON/XML config tables: key
+"""
+import os
+import logging
+import importlib.util
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Symbol(NamedTuple):
+    name: str
+    type: str
+    start_line: int  # 1-based, inclusive
+    end_line: int    # 1-based, inclusive
+    parent: str      # Name of the enclosing type ('' for top level)
+
+
+class Reference(NamedTuple):
+    name: str
+    line: int        # 1-based
+    enclosing: str   # Innermost enclosing definition, e.g. 'BattleManager.Explode' ('' at top level)
+
+
+class FileSymbols(NamedTuple):
+    symbols: List[Symbol]
+    refs: List[Reference]
+
+
+# visit(node, parent, out) appends the node's symbols to `out` and returns the parent name for its
+# children, or None to skip the subtree.
+Visitor = Callable[[object, str, List[Symbol]], Optional[str]]
+
+
+class RefRules(NamedTuple):
+    # Identifier-like node types that count as references
+    node_types: FrozenSet[str]
+    # Node type -> field holding the identifier it defines ('' = any direct child). Identifiers
+    # in these positions are definitions, not references.
+    definitions: Dict[str, str]
+    # Node types that wrap a defined name (node type -> field), looked through when checking the above
+    wrappers: Dict[str, str]
+    # Names never recorded (e.g. `self`)
+    ignore: FrozenSet[str] = frozenset()
+
+
+class LanguageSpec(NamedTuple):
+    extensions: Tuple[str, ...]
+    # Python package providing the tree-sitter grammar (`language()`); None if not tree-sitter based
+    grammar: Optional[str] = None
+    visit: Optional[Visitor] = None
+    refs: Optional[RefRules] = None
+    # Extractor for languages that are not parsed with tree-sitter
+    extract: Optional[Callable[[bytes], List[Symbol]]] = None
+
+
+# Symbol types that can enclose a reference
+SCOPE_TYPES = {
+    "method", "function", "constructor", "property", "event",
+    "class", "struct", "interface", "record", "union", "enum", "namespace",
+}
+
+_parsers: Dict[str, object] = {}
+_grammar_available: Dict[str, bool] = {}
+
+
+def _text(node) -> str:
+    return node.text.decode("utf-8", errors="replace")
+
+
+def _lines(node) -> Tuple[int, int]:
+    """1-based inclusive line range (nodes ending with their newline, e.g. #define, end at column 0)."""
+    (start_row, _), (end_row, end_col) = node.start_point, node.end_point
+    if end_col == 0 and end_row > start_row:
+        end_row -= 1
+    return start_row + 1, end_row + 1
+
+
+def _walk(root, visit: Visitor) -> List[Symbol]:
+    """Iterative pre-order DFS driving a language visitor."""
+    symbols: List[Symbol] = []
+    stack = [(root, "")]
+    while stack:
+        node, parent = stack.pop()
+        child_parent = visit(node, parent, symbols)
+        if child_parent is None:
+            continue
+        for child in reversed(node.named_children):
+            stack.append((child, child_parent))
+    return symbols
+
+
+def _is_definition(node, rules: RefRules) -> bool:
+    """Whether an identifier node is the name introduced by a declaration."""
+    child, parent = node, node.parent
+    while parent is not None and parent.type in rules.wrappers:
+        if child not in parent.children_by_field_name(rules.wrappers[parent.type]):
+            break
+        child, parent = parent, parent.parent
+    if parent is None or parent.type not in rules.definitions:
+        return False
+    field = rules.definitions[parent.type]
+    return not field or child in parent.children_by_field_name(field)
+
+
+def _enclosing_names(symbols: List[Symbol], lines: List[int]) -> List[str]:
+    """
+    Innermost scope symbol containing each of the (sorted) `lines`.
+    Scopes nest, so a single sweep with a stack of open scopes suffices.
+    """
+    scopes = sorted(
+        (s for s in symbols if s.type in SCOPE_TYPES),
+        key=lambda s: (s.start_line, -s.end_line),
+    )
+    result = []
+    stack: List[Symbol] = []
+    i = 0
+    for line in lines:
+        while i < len(scopes) and scopes[i].start_line <= line:
+            scope = scopes[i]
+            i += 1
+            while stack and stack[-1].end_line < scope.start_line:
+                stack.pop()
+            stack.append(scope)
+        while stack and stack[-1].end_line < line:
+            stack.pop()
+        if stack:
+            top = stack[-1]
+            result.append(f"{top.parent}.{top.name}" if top.parent else top.name)
+        else:
+            result.append("")
+    return result
+
+
+def _collect_refs(root, rules: RefRules, symbols: List[Symbol]) -> List[Reference]:
+    """Identifier references in a parse tree, one per (name, line)."""
+    # Declarations whose name is not caught by `definitions` (e.g. `M.foo = function`)
+    declared = {(s.name, s.start_line) for s in symbols}
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.type in rules.node_types:
+            name = _text(node)
+            key = (name, node.start_point[0] + 1)
+            if (
+                key not in seen and key not in declared and name not in rules.ignore
+                and not _is_definition(node, rules)
+            ):
+                seen.add(key)
+            continue
+        stack.extend(node.named_children)
+
+    ordered = sorted(seen, key=lambda k: k[1])
+    enclosing = _enclosing_names(symbols, [line for _, line in ordered])
+    return [Reference(name, line, scope) for (name, line), scope in zip(ordered, enclosing)]
+
+
+def _get_parser(language: str):
+    parser = _parsers.get(language)
+    if parser is None:
+        from tree_sitter import Language, Parser
+        spec = LANGUAGES.get(language)
+        if spec is None or spec.grammar is None:
+            raise ValueError(f"Unsupported language: {language}")
+        grammar = importlib.import_module(spec.grammar)
+        parser = Parser(Language(grammar.language()))
+        _parsers[language] = parser
+    return parser
+
+
+def _parse(language: str, source: bytes):
+    return _get_parser(language).parse(source).root_node
+
+
+# --- C# ---------------------------------------------------------------------------------------
+
+# Node type -> symbol type
+CSHARP_SYMBOL_NODES = {
+    "class_declaration": "class",
+    "struct_declaration": "struct",
+    "interface_declaration": "interface",
+    "record_declaration": "record",
+    "enum_declaration": "enum",
+    "delegate_declaration": "delegate",
+    "method_declaration": "method",
+    "constructor_declaration": "constructor",
+    "destructor_declaration": "method",
+    "operator_declaration": "method",
+    "property_declaration": "property",
+    "indexer_declaration": "property",
+    "field_declaration": "field",
+    "event_field_declaration": "event",
+    "event_declaration": "event",
+    "enum_member_declaration": "enum_member",
+}
+
+# Symbol types that open a new scope for their children
+CONTAINER_TYPES = {"class", "struct", "interface", "record", "enum"}
+
+
+def _declared_names(node) -> List[str]:
+    """Names introduced by a declaration node (fields may declare several variables)."""
+    name_node = node.child_by_field_name("name")
+    if name_node is not None:
+        return [_text(name_node)]
+
+    names = []
+    for child in node.named_children:
+        if child.type == "variable_declaration":
+            for declarator in child.named_children:
+                if declarator.type == "variable_declarator":
+                    ident = declarator.child_by_field_name("name")
+                    if ident is None:
+                        ident = next((c for c in declarator.named_children if c.type == "identifier"), None)
+                    if ident is not None:
+                        names.append(_text(ident))
+    return names
+
+
+def _visit_csharp(node, parent: str, out: List[Symbol]) -> Optional[str]:
+    symbol_type = CSHARP_SYMBOL_NODES.get(node.type)
+    if not symbol_type:
+        return parent
+    start, end = _lines(node)
+    names = _declared_names(node)
+    for name in names:
+        out.append(Symbol(name, symbol_type, start, end, parent))
+    if symbol_type not in CONTAINER_TYPES:
+        # Members do not contain further declarations worth indexing (local functions aside)
+        return None
+    return names[0] if names else parent
+
+
+CSHARP_REFS = RefRules(
+    node_types=frozenset({"identifier"}),
+    definitions={
+        **{node_type: "name" for node_type in CSHARP_SYMBOL_NODES},
+        "namespace_declaration": "name",
+        "variable_declarator": "name",
+        "parameter": "name",
+        "type_parameter": "name",
+    },
+    wrappers={},
+)
+
+
+# --- C / C++ ----------------------------------------------------------------------------------
+
+CPP_TYPE_NODES = {
+    "class_specifier": "class",
+    "struct_specifier": "struct",
+    "union_specifier": "union",
+    "enum_specifier": "enum",
+}
+
+# Declarator wrappers between a declaration and the declared name
+_CPP_DECLARATOR_WRAPPERS = {
+    "pointer_declarator", "reference_declarator", "array_declarator", "init_declarator",
+    "parenthesized_declarator", "attributed_declarator",
+}
+
+
+def _cpp_declarator_name(declarator) -> Tuple[Optional[str], str, bool]:
+    """
+    Resolve a declarator to (name, qualifying scope, is_function).
+    `Foo::Bar::run` -> ("run", "Bar", True) for a function declarator.
+    """
+    is_function = False
+    while declarator is not None:
+        if declarator.type in _CPP_DECLARATOR_WRAPPERS:
+            declarator = declarator.child_by_field_name("declarator")
+        elif declarator.type == "function_declarator":
+            is_function = True
+            declarator = declarator.child_by_field_name("declarator")
+        else:
+            break
+    if declarator is None:
+        return None, "", is_function
+
+    scope = ""
+    while declarator.type == "qualified_identifier":
+        scope_node = declarator.child_by_field_name("scope")
+        if scope_node is not None:
+            scope = _text(scope_node)
+        name_node = declarator.child_by_field_name("name")
+        if name_node is None:
+            break
+        declarator = name_node
+    if declarator.type == "template_function":
+        declarator = declarator.child_by_field_name("name") or declarator
+    return _text(declarator), scope, is_function
+
+
+def _visit_cpp(node, parent: str, out: List[Symbol]) -> Optional[str]:
+    kind = node.type
+    start, end = _lines(node)
+
+    if kind == "namespace_definition":
+        name_node = node.child_by_field_name("name")
+        if name_node is None:
+            return parent
+        name = _text(name_node)
+        out.append(Symbol(name, "namespace", start, end, parent))
+        return name
+
+    if kind in CPP_TYPE_NODES:
+        name_node = node.child_by_field_name("name")
+        if node.child_by_field_name("body") is None or name_node is None:
+            # Forward declaration, type reference or anonymous type
+            return parent
+        name = _text(name_node)
+        out.append(Symbol(name, CPP_TYPE_NODES[kind], start, end, parent))
+        return name
+
+    if kind == "enumerator":
+        name_node = node.child_by_field_name("name")
+        if name_node is not None:
+            out.append(Symbol(_text(name_node), "enum_member", start, end, parent))
+        return None
+
+    if kind == "function_definition":
+        name, scope, _ = _cpp_declarator_name(node.child_by_field_name("declarator"))
+        if name:
+            in_class = node.parent is not None and node.parent.type == "field_declaration_list"
+            symbol_type = "method" if in_class or scope else "function"
+            out.append(Symbol(name, symbol_type, start, end, scope.rsplit("::", 1)[-1] or parent))
+        # Function bodies hold no declarations worth indexing
+        return None
+
+    if kind in ("field_declaration", "declaration"):
+        in_class = kind == "field_declaration" or (
+            node.parent is not None and node.parent.type == "field_declaration_list"
+        )
+        for declarator in node.children_by_field_name("declarator"):
+            name, scope, is_function = _cpp_declarator_name(declarator)
+            if not name:
+                continue
+            if is_function:
+                symbol_type = "method" if in_class or scope else "function"
+            else:
+                symbol_type = "field" if in_class else "variable"
+            out.append(Symbol(name, symbol_type, start, end, scope.rsplit("::", 1)[-1] or parent))
+        # The type may itself define an enum/struct (e.g. `enum State { ... } state;`)
+        return parent
+
+    if kind == "type_definition":
+        for declarator in node.children_by_field_name("declarator"):
+            name, _, _ = _cpp_declarator_name(declarator)
+            if name:
+                out.append(Symbol(name, "typedef", start, end, parent))
+        return parent
+
+    if kind == "alias_declaration":
+        name_node = node.child_by_field_name("name")
+        if name_node is not None:
+            out.append(Symbol(_text(name_node), "typedef", start, end, parent))
+        return None
+
+    if kind in ("preproc_def", "preproc_function_def"):
+        name_node = node.child_by_field_name("name")
+        if name_node is not None:
+            out.append(Symbol(_text(name_node), "macro", start, end, parent))
+        return None
+
+    if kind in ("compound_statement", "lambda_expression"):
+        return None
+    return parent
+
+
+CPP_REFS = RefRules(
+    node_types=frozenset({"identifier", "field_identifier", "type_identifier"}),
+    definitions={
+        "function_declarator": "declarator",
+        "field_declaration": "declarator",
+        "declaration": "declarator",
+        "parameter_declaration": "declarator",
+        "optional_parameter_declaration": "declarator",
+        "type_definition": "declarator",
+        "namespace_definition": "name",
+        "class_specifier": "name",
+        "struct_specifier": "name",
+        "union_specifier": "name",
+        "enum_specifier": "name",
+        "enumerator": "name",
+        "alias_declaration": "name",
+        "preproc_def": "name",
+        "preproc_function_def": "name",
+        "preproc_params": "",
+    },
+    wrappers={
+        **{node_type: "declarator" for node_type in _CPP_DECLARATOR_WRAPPERS},
+        "qualified_identifier": "name",
+        "destructor_name": "",
+    },
+)
+
+
+# --- Lua --------------------------------------------------------------------------------------
+
+def _lua_name(name_node) -> Tuple[str, str]:
+    """(name, owning table) for `foo`, `M.foo` and `M:foo` style names."""
+    if name_node.type == "dot_index_expression":
+        return _text(name_node.child_by_field_name("field")), _text(name_node.child_by_field_name("table"))
+    if name_node.type == "method_index_expression":
+        return _text(name_node.child_by_field_name("method")), _text(name_node.child_by_field_name("table"))
+    return _text(name_node), ""
+
+
+def _visit_lua(node, parent: str, out: List[Symbol]) -> Optional[str]:
+    kind = node.type
+    start, end = _lines(node)
+
+    if kind == "function_declaration":
+        name_node = node.child_by_field_name("name")
+        if name_node is not None:
+            name, table = _lua_name(name_node)
+            out.append(Symbol(name, "function", start, end, table or parent))
+        return None
+
+    if kind == "assignment_statement":
+        # `M.foo = function() end`, `local M = {}`
+        variables = next((c for c in node.named_children if c.type == "variable_list"), None)
+        values = next((c for c in node.named_children if c.type == "expression_list"), None)
+        if variables is None or values is None:
+            return None
+        names = variables.children_by_field_name("name")
+        table_name = None
+        for name_node, value in zip(names, values.children_by_field_name("value")):
+            name, table = _lua_name(name_node)
+            if value.type == "function_definition":
+                out.append(Symbol(name, "function", start, end, table or parent))
+            elif value.type == "table_constructor":
+                out.append(Symbol(name, "table", start, end, table or parent))
+                table_name = name
+        # Functions defined inside a table constructor belong to that table
+        return table_name
+
+    if kind == "field":
+        # `{ foo = function() end }`
+        name_node = node.child_by_field_name("name")
+        value = node.child_by_field_name("value")
+        if name_node is not None and value is not None and value.type == "function_definition":
+            out.append(Symbol(_text(name_node), "function", start, end, parent))
+            return None
+        return parent if value is not None and value.type == "table_constructor" else None
+
+    if kind in ("function_definition", "function_call"):
+        return None
+    return parent
+
+
+LUA_REFS = RefRules(
+    node_types=frozenset({"identifier"}),
+    definitions={
+        "function_declaration": "name",
+        "parameters": "name",
+        "for_numeric_clause": "name",
+        "for_generic_clause": "",
+    },
+    wrappers={
+        "dot_index_expression": "field",
+        "method_index_expression": "method",
+        "variable_list": "name",
+    },
+    ignore=frozenset({"self"}),
+)
+
+
+# --- Python -----------------------------------------------------------------------------------
+
+def _visit_python(node, parent: str, out: List[Symbol]) -> Optional[str]:
+    kind = node.type
+    start, end = _lines(node)
+
+    if kind == "class_definition":
+        name = _text(node.child_by_field_name("name"))
+        out.append(Symbol(name, "class", start, end, parent))
+        return name
+
+    if kind == "function_definition":
+        out.append(Symbol(_text(node.child_by_field_name("name")), "method" if parent else "function", start, end, parent))
+        return None
+
+    if kind == "expression_statement":
+        # Module constants and class attributes: `MAX_HP = 100`
+        for child in node.named_children:
+            if child.type == "assignment":
+                left = child.child_by_field_name("left")
+                if left is not None and left.type == "identifier":
+                    out.append(Symbol(_text(left), "field" if parent else "variable", start, end, parent))
+        return None
+
+    return parent
+
+
+PYTHON_REFS = RefRules(
+    node_types=frozenset({"identifier"}),
+    definitions={
+        "class_definition": "name",
+        "function_definition": "name",
+        "parameters": "",
+        "lambda_parameters": "",
+        "default_parameter": "name",
+        "typed_parameter": "",
+        "typed_default_parameter": "name",
+        "list_splat_pattern": "",
+        "dictionary_splat_pattern": "",
+        "keyword_argument": "name",
+    },
+    wrappers={},
+    ignore=frozenset({"self", "cls"}),
+)
+
+
+# --- Config tables ----------------------------------------------------------------------------
+
+def _extract_json(source: bytes) -> List[Symbol]:
+    from .config_parsers import extract_json_keys
+    return extract_json_keys(source)
+
+
+def _extract_xml(source: bytes) -> List[Symbol]:
+    from .config_parsers import extract_xml_keys
+    return extract_xml_keys(source)
+
+
+# --- Registry ---------------------------------------------------------------------------------
+
+LANGUAGES: Dict[str, LanguageSpec] = {}
+LANGUAGE_BY_EXTENSION: Dict[str, str] = {}
+
+
+def register_language(language: str, spec: LanguageSpec):
+    """Add (or replace) a language. Extensions are matched case-insensitively."""
+    LANGUAGES[language] = spec
+    for ext in spec.extensions:
+        LANGUAGE_BY_EXTENSION[ext.lower()] = language
+
+
+register_language("csharp", LanguageSpec((".cs",), "tree_sitter_c_sharp", _visit_csharp, CSHARP_REFS))
+register_language("cpp", LanguageSpec(
+    (".cpp", ".cc", ".cxx", ".c++", ".hpp", ".hh", ".hxx", ".h", ".inl"), "tree_sitter_cpp", _visit_cpp, CPP_REFS
+))
+register_language("c", LanguageSpec((".c",), "tree_sitter_c", _visit_cpp, CPP_REFS))
+register_language("lua", LanguageSpec((".lua",), "tree_sitter_lua", _visit_lua, LUA_REFS))
+register_language("python", LanguageSpec((".py",), "tree_sitter_python", _visit_python, PYTHON_REFS))
+register_language("json", LanguageSpec((".json",), extract=_extract_json))
+register_language("xml", LanguageSpec((".xml",), extract=_extract_xml))
+
+
+def _is_available(language: str) -> bool:
+    """Whether the language's grammar package is installed (warns once if not)."""
+    available = _grammar_available.get(language)
+    if available is None:
+        grammar = LANGUAGES[language].grammar
+        available = grammar is None or importlib.util.find_spec(grammar) is not None
+        if not available:
+            logger.warning(f"Grammar package '{grammar}' is not installed; {language} files will not be indexed.")
+        _grammar_available[language] = available
+    return available
+
+
+def get_language(rel_path: str) -> Optional[str]:
+    """Language id for a file path, or None if it is not indexed."""
+    language = LANGUAGE_BY_EXTENSION.get(os.path.splitext(rel_path)[1].lower())
+    if language is None or not _is_available(language):
+        return None
+    return language
+
+
+def extract_file(rel_path: str, source: bytes, with_refs: bool = True) -> FileSymbols:
+    """
+    Parse a file once and return the symbols it declares and, for languages with RefRules,
+    the identifiers it references. Unsupported file types return empty lists.
+    """
+    language = get_language(rel_path)
+    if language is None:
+        return FileSymbols([], [])
+    spec = LANGUAGES[language]
+    if spec.grammar is None:
+        return FileSymbols(spec.extract(source), [])
+    root = _parse(language, source)
+    symbols = _walk(root, spec.visit)
+    refs = _collect_refs(root, spec.refs, symbols) if with_refs and spec.refs else []
+    return FileSymbols(symbols, refs)
+
+
+def extract_symbols(rel_path: str, source: bytes) -> List[Symbol]:
+    """
+    Parse a source file and return the symbols it declares.
+    Unsupported file types return an empty list.
+    """
+    return extract_file(rel_path, source, with_refs=False).symbols
@@ -0,0 +1,404 @@
+"""
+SVN Log Mirror - local copy of an SVN repository's revision metadata for get_svn_log_tool.
+
+Asset repositories often sit behind a slow WAN link, where every `svn log` is a server round
+trip. The mirror stores revision, author, date, message and changed paths of every revision of
+the repository in `.bug_sleuth_agent/svn_log.db` of the working copy. It is filled by
+`bug-sleuth index` or by a background thread the log tool starts, and later syncs only ask the
+server for revisions newer than the mirror (`svn log -v -r <last + 1>:HEAD`).
+
+A working copy cannot show anything newer than its own revision (read locally with `svn info`),
+so once the mirror reaches that revision, log queries for it never touch the network.
+
+Paths are repository-root relative ("/trunk/Assets/Hero.cs") and matched exactly or as a
+directory prefix. Like `svn log <path>`, a path query follows the copy that created the item or one
+of its parent directories (a branch, a rename) back into the copy source's history.
+"""
+import os
+import sqlite3
+import logging
+import threading
+import subprocess
+import xml.etree.ElementTree as ET
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote
+
+from .vcs import get_index_dir
+
+logger = logging.getLogger(__name__)
+
+SVN_LOG_DB_NAME = "svn_log.db"
+SCHEMA_VERSION = "2"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS revisions (
+    revision INTEGER PRIMARY KEY,
+    author TEXT NOT NULL,
+    date TEXT NOT NULL,                 -- ISO 8601 UTC, as svn prints it
+    message TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paths (
+    path_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS changes (
+    path_id INTEGER NOT NULL,
+    revision INTEGER NOT NULL,
+    action TEXT NOT NULL,               -- A / M / D / R
+    copyfrom_path TEXT,                 -- Copy source of an A / R, else NULL
+    copyfrom_rev INTEGER,
+    PRIMARY KEY (path_id, revision)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_changes_revision ON changes(revision);
+"""
+
+# Revisions written per transaction while syncing (a sync interrupted by the WAN keeps its progress).
+SYNC_BATCH_SIZE = 1000
+
+_CREATION_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+class SvnInfo(NamedTuple):
+    wc_root: str          # Working copy root directory
+    root_url: str         # Repository root URL
+    path: str             # Repository-relative path of the queried item ("/trunk/Assets")
+    revision: int         # Revision of the queried item in the working copy
+
+
+class LoggedRevision(NamedTuple):
+    revision: int
+    author: str
+    date: str
+    message: str
+    paths: List[Tuple[str, str]]   # (action, path)
+
+
+class _Copy(NamedTuple):
+    path: str                 # Copied item: the queried path or one of its parents
+    revision: int
+    copyfrom_path: Optional[str]
+    copyfrom_rev: Optional[int]
+
+
+def _parents(path: str) -> List[str]:
+    """`path` and each of its parent directories, up to (not including) the root."""
+    result = []
+    while path not in ("", "/"):
+        result.append(path)
+        path = path.rsplit("/", 1)[0]
+    return result
+
+
+def read_svn_info(path: str) -> Optional[SvnInfo]:
+    """`svn info` of a working copy item (local, no server access), or None if it is not versioned."""
+    try:
+        completed = subprocess.run(
+            ["svn", "info", "--xml", path], capture_output=True, creationflags=_CREATION_FLAGS
+        )
+    except OSError:
+        return None
+    if completed.returncode != 0:
+        return None
+    try:
+        entry = ET.fromstring(completed.stdout).find("entry")
+    except ET.ParseError:
+        return None
+    if entry is None:
+        return None
+    root_url = entry.findtext("repository/root") or ""
+    wc_root = entry.findtext("wc-info/wcroot-abspath") or ""
+    relative = entry.findtext("relative-url") or ""
+    if not root_url or not wc_root or not relative.startswith("^"):
+        return None
+    return SvnInfo(os.path.normpath(wc_root), root_url, unquote(relative[1:]) or "/", int(entry.get("revision", "0")))
+
+
+class SvnLogMirror:
+    """Read/write access to the revision metadata mirror of one working copy's repository."""
+
+    # One sync per database within the process
+    _locks: Dict[str, threading.Lock] = {}
+    _syncing: Dict[str, threading.Thread] = {}
+    _guard = threading.Lock()
+
+    def __init__(self, wc_root: str, root_url: str):
+        self.wc_root = os.path.abspath(wc_root)
+        self.root_url = root_url
+        self.db_path = os.path.join(get_index_dir(self.wc_root), SVN_LOG_DB_NAME)
+        with SvnLogMirror._guard:
+            self._lock = SvnLogMirror._locks.setdefault(self.db_path, threading.Lock())
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.db_path)
+
+    def connect(self) -> sqlite3.Connection:
+        """Open (and create if needed) the database with the current schema."""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def last_revision(self) -> int:
+        """Newest mirrored revision (0 if nothing is mirrored, or the mirror is of another repository)."""
+        if not self.exists():
+            return 0
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return 0
+        if meta.get("schema_version") != SCHEMA_VERSION or meta.get("root_url") != self.root_url:
+            return 0
+        return int(meta.get("last_revision") or 0)
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def _insert(
+        self,
+        conn: sqlite3.Connection,
+        entries: List[LoggedRevision],
+        copies: Dict[Tuple[int, str], Tuple[str, int]],
+        path_ids: Dict[str, int],
+    ):
+        conn.executemany(
+            "INSERT OR REPLACE INTO revisions (revision, author, date, message) VALUES (?, ?, ?, ?)",
+            [(e.revision, e.author, e.date, e.message) for e in entries],
+        )
+        changes = []
+        for e in entries:
+            for action, path in e.paths:
+                pid = path_ids.get(path)
+                if pid is None:
+                    conn.execute("INSERT OR IGNORE INTO paths (path) VALUES (?)", (path,))
+                    pid = conn.execute("SELECT path_id FROM paths WHERE path = ?", (path,)).fetchone()[0]
+                    path_ids[path] = pid
+                changes.append((pid, e.revision, action, *copies.get((e.revision, path), (None, None))))
+        conn.executemany(
+            "INSERT OR REPLACE INTO changes (path_id, revision, action, copyfrom_path, copyfrom_rev) "
+            "VALUES (?, ?, ?, ?, ?)",
+            changes,
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("schema_version", SCHEMA_VERSION), ("root_url", self.root_url), ("last_revision", str(entries[-1].revision))],
+        )
+
+    def sync(self, until: str = "HEAD") -> dict:
+        """
+        Fetch the revisions after the newest mirrored one up to `until` (server access).
+
+        Returns:
+            dict: Statistics (added, last_revision).
+        Raises:
+            OSError: If svn cannot be run or fails before returning any revision.
+        """
+        with self._lock:
+            start = self.last_revision()
+            if start == 0 and self.exists():
+                # Different repository or schema: start over
+                os.remove(self.db_path)
+            args = ["svn", "log", "--xml", "-v", "--non-interactive", "-r", f"{start + 1}:{until}", self.root_url]
+            proc = subprocess.Popen(
+                args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, creationflags=_CREATION_FLAGS
+            )
+            stderr_chunks: List[bytes] = []
+            stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+            stderr_reader.start()
+
+            added, batch, copies, path_ids = 0, [], {}, {}
+            conn = self.connect()
+            try:
+                for _, element in ET.iterparse(proc.stdout, events=("end",)):
+                    if element.tag != "logentry":
+                        continue
+                    revision = int(element.get("revision", "0"))
+                    changed = element.findall("paths/path")
+                    batch.append(LoggedRevision(
+                        revision,
+                        element.findtext("author") or "",
+                        element.findtext("date") or "",
+                        element.findtext("msg") or "",
+                        [(p.get("action", "M"), p.text or "") for p in changed],
+                    ))
+                    for p in changed:
+                        if p.get("copyfrom-path") and p.get("copyfrom-rev"):
+                            copies[(revision, p.text or "")] = (p.get("copyfrom-path"), int(p.get("copyfrom-rev")))
+                    element.clear()
+                    if len(batch) >= SYNC_BATCH_SIZE:
+                        with conn:
+                            self._insert(conn, batch, copies, path_ids)
+                        added += len(batch)
+                        batch, copies = [], {}
+                if batch:
+                    with conn:
+                        self._insert(conn, batch, copies, path_ids)
+                    added += len(batch)
+            except ET.ParseError:
+                pass  # Reported through the exit code below (svn prints no XML on errors)
+            finally:
+                conn.close()
+                proc.stdout.close()
+                proc.wait()
+                stderr_reader.join()
+
+        error = b"".join(c for c in stderr_chunks if c).decode("utf-8", errors="replace").strip()
+        # "No such revision" just means the mirror is already at HEAD
+        if proc.returncode != 0 and added == 0 and "E160006" not in error:
+            raise OSError(error or f"svn log failed (rc={proc.returncode})")
+        stats = {"added": added, "last_revision": self.last_revision()}
+        logger.info(f"Synced svn log mirror of {self.root_url}: {stats}")
+        return stats
+
+    def sync_in_background(self) -> bool:
+        """Start a sync thread unless one is already running for this mirror. Returns whether one was started."""
+        with SvnLogMirror._guard:
+            running = SvnLogMirror._syncing.get(self.db_path)
+            if running is not None and running.is_alive():
+                return False
+
+            def run():
+                try:
+                    self.sync()
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"Background sync of the svn log mirror of {self.root_url} failed: {e}")
+
+            thread = threading.Thread(target=run, name=f"svn-log-sync {self.root_url}", daemon=True)
+            SvnLogMirror._syncing[self.db_path] = thread
+            thread.start()
+            return True
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def _creation(self, conn: sqlite3.Connection, path: str, max_revision: Optional[int]) -> Optional[_Copy]:
+        """Newest add/replace of `path` or a parent directory up to `max_revision`: where its history starts."""
+        parents = _parents(path)
+        if not parents:
+            return None
+        sql = (
+            "SELECT p.path, ch.revision, ch.copyfrom_path, ch.copyfrom_rev FROM changes ch "
+            "JOIN paths p ON p.path_id = ch.path_id "
+            f"WHERE p.path IN ({', '.join('?' * len(parents))}) AND ch.action IN ('A', 'R')"
+        )
+        params: List[object] = list(parents)
+        if max_revision is not None:
+            sql += " AND ch.revision <= ?"
+            params.append(max_revision)
+        row = conn.execute(sql + " ORDER BY ch.revision DESC LIMIT 1", params).fetchone()
+        return _Copy(*row) if row else None
+
+    def query(
+        self,
+        path: str = "/",
+        author: Optional[str] = None,
+        search: Optional[str] = None,
+        max_revision: Optional[int] = None,
+        limit: int = 5,
+        with_paths: bool = False,
+    ) -> List[LoggedRevision]:
+        """
+        Newest-first revisions matching every given filter.
+
+        Args:
+            path: Repository-relative file or directory ("/" for the whole repository). Copies of
+                it or of a parent are followed into the source's history, as `svn log` does.
+            author: Exact author name.
+            search: Case-insensitive text (glob wildcards * and ? allowed) in the author, message
+                or a changed path, like `svn log --search`.
+            max_revision: Newest revision to return (the working copy's revision).
+            with_paths: Fill in the changed paths of each revision.
+        """
+        filters: List[str] = []
+        filter_params: List[object] = []
+        if author:
+            filters.append("r.author = ?")
+            filter_params.append(author)
+        if search:
+            pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "%").replace("?", "_") + "%"
+            filters.append(
+                "(r.author LIKE ? ESCAPE '\\' OR r.message LIKE ? ESCAPE '\\' OR r.revision IN "
+                "(SELECT ch.revision FROM changes ch JOIN paths p ON p.path_id = ch.path_id WHERE p.path LIKE ? ESCAPE '\\'))"
+            )
+            filter_params += [pattern, pattern, pattern]
+
+        path = "/" + path.strip("/")
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            rows: List[tuple] = []
+            # One segment per location in the item's history, newest first: a copy ends the
+            # segment and the next one continues at the copy source
+            segment_path: Optional[str] = path
+            segment_max = max_revision
+            while segment_path is not None and len(rows) < limit:
+                where = list(filters)
+                params = list(filter_params)
+                creation = None
+                if segment_path != "/":
+                    # The item itself, or anything under it as a directory ('0' sorts right after '/')
+                    touched = (
+                        "r.revision IN (SELECT ch.revision FROM changes ch JOIN paths p ON p.path_id = ch.path_id "
+                        "WHERE p.path = ? OR (p.path >= ? AND p.path < ?))"
+                    )
+                    params += [segment_path, segment_path + "/", segment_path + "0"]
+                    creation = self._creation(conn, segment_path, segment_max)
+                    if creation is not None:
+                        # The revision that created it (e.g. by copying a parent) belongs to it too
+                        touched = f"({touched} OR r.revision = ?) AND r.revision >= ?"
+                        params += [creation.revision, creation.revision]
+                    where.append(touched)
+                if segment_max is not None:
+                    where.append("r.revision <= ?")
+                    params.append(segment_max)
+
+                sql = "SELECT r.revision, r.author, r.date, r.message FROM revisions r"
+                if where:
+                    sql += " WHERE " + " AND ".join(where)
+                sql += " ORDER BY r.revision DESC LIMIT ?"
+                rows += conn.execute(sql, params + [limit - len(rows)]).fetchall()
+
+                if creation is not None and creation.copyfrom_path:
+                    # /branches/b/Assets/Hero.cs, copied with /branches/b from /trunk@249, is
+                    # /trunk/Assets/Hero.cs up to r249
+                    segment_path = creation.copyfrom_path + segment_path[len(creation.path):]
+                    segment_max = creation.copyfrom_rev
+                else:
+                    segment_path = None
+            result = []
+            for revision, row_author, date, message in rows:
+                changed = []
+                if with_paths:
+                    changed = conn.execute(
+                        "SELECT ch.action, p.path FROM changes ch JOIN paths p ON p.path_id = ch.path_id "
+                        "WHERE ch.revision = ? ORDER BY p.path",
+                        (revision,),
+                    ).fetchall()
+                result.append(LoggedRevision(revision, row_author, date, message, changed))
+        finally:
+            conn.close()
+        return result
+
+    def revisions(self, first: int, last: int) -> List[LoggedRevision]:
+        """Revisions `first`..`last` (inclusive), oldest first, with their changed paths."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            rows = conn.execute(
+                "SELECT revision, author, date, message FROM revisions WHERE revision BETWEEN ? AND ? ORDER BY revision",
+                (first, last),
+            ).fetchall()
+            changed: Dict[int, List[Tuple[str, str]]] = {}
+            for revision, action, path in conn.execute(
+                "SELECT ch.revision, ch.action, p.path FROM changes ch JOIN paths p ON p.path_id = ch.path_id "
+                "WHERE ch.revision BETWEEN ? AND ?",
+                (first, last),
+            ):
+                changed.setdefault(revision, []).append((action, path))
+        finally:
+            conn.close()
+        return [LoggedRevision(r, a, d, m, sorted(changed.get(r, []), key=lambda c: c[1])) for r, a, d, m in rows]
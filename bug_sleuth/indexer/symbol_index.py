@@ -0,0 +1,407 @@
+"""
+Symbol Index - the `symbols` table behind `search_symbol_tool` and the `refs` table behind
+`find_references_tool`.
+
+Stored per repository in `.bug_sleuth_agent/code_index.db`. File paths are relative to the
+repository root with POSIX separators.
+
+Name lookups never scan the table: exact and prefix matches use a NOCASE index on `name`, and
+substring matches go through `symbols_fts`, an FTS5 trigram index kept in sync by triggers.
+Databases written before `symbols_fts` existed are migrated on the next `connect()`; until then
+(or where SQLite lacks FTS5) substring lookups fall back to `LIKE '%name%'`.
+
+`refs` holds one row per (identifier, line) with the innermost enclosing definition, written from
+the same parse as the symbols; reference lookups are exact-name index seeks.
+"""
+import os
+import sqlite3
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .db_pool import get_pool
+from .parsers import Reference, Symbol, extract_file, get_language
+from .vcs import get_index_dir
+
+logger = logging.getLogger(__name__)
+
+SYMBOL_DB_NAME = "code_index.db"
+# Bumped when already-indexed files must be re-parsed
+# (2: Lua/C/C++/Python/JSON/XML symbols, 3: refs table)
+SCHEMA_VERSION = "3"
+
+# Files per task sent to a parser process. Large enough to amortize pickling/IPC,
+# small enough that progress updates stay frequent.
+PARSE_BATCH_SIZE = 200
+# Below this many files the pool start-up cost outweighs the parallel speed-up.
+MIN_FILES_FOR_POOL = 2 * PARSE_BATCH_SIZE
+
+# on_progress(files_done, files_total, bytes_done, elapsed_seconds)
+ProgressCallback = Callable[[int, int, int, float], None]
+ParsedFile = Tuple[str, Optional[List[Symbol]], List[Reference], int]
+
+
+def _parse_batch(repo_path: str, rel_paths: List[str]) -> List[ParsedFile]:
+    """
+    Worker entry point: parse a batch of files.
+    Returns (rel_path, symbols or None if the file is gone, references, size in bytes) per file.
+    """
+    results = []
+    for rel_path in rel_paths:
+        abs_path = os.path.join(repo_path, rel_path)
+        try:
+            with open(abs_path, "rb") as f:
+                source = f.read()
+        except OSError:
+            results.append((rel_path, None, [], 0))
+            continue
+        try:
+            symbols, refs = extract_file(rel_path, source)
+        except Exception as e:
+            logger.warning(f"Failed to parse {abs_path}: {e}")
+            symbols, refs = [], []
+        results.append((rel_path, symbols, refs, len(source)))
+    return results
+
+
+def _iter_parsed_batches(repo_path: str, rel_paths: List[str], workers: Optional[int]) -> Iterator[List[ParsedFile]]:
+    """Yield parsed batches as they complete, using a process pool for large inputs."""
+    batches = [rel_paths[i:i + PARSE_BATCH_SIZE] for i in range(0, len(rel_paths), PARSE_BATCH_SIZE)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1 or len(rel_paths) < MIN_FILES_FOR_POOL:
+        for batch in batches:
+            yield _parse_batch(repo_path, batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        futures = [pool.submit(_parse_batch, repo_path, batch) for batch in batches]
+        for future in as_completed(futures):
+            yield future.result()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    parent TEXT NOT NULL DEFAULT '',
+    language TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_symbols_name_nocase ON symbols(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_symbols_file ON symbols(file_path);
+CREATE TABLE IF NOT EXISTS refs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    enclosing TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_refs_name ON refs(name);
+CREATE INDEX IF NOT EXISTS idx_refs_file ON refs(file_path);
+"""
+
+# External-content FTS5 table over symbols.name; the triggers keep it in step with the base table.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS symbols_fts USING fts5(
+    name, content='symbols', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS symbols_fts_ai AFTER INSERT ON symbols BEGIN
+    INSERT INTO symbols_fts(rowid, name) VALUES (new.id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS symbols_fts_ad AFTER DELETE ON symbols BEGIN
+    INSERT INTO symbols_fts(symbols_fts, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+"""
+
+DROP_FTS = """
+DROP TRIGGER IF EXISTS symbols_fts_ai;
+DROP TRIGGER IF EXISTS symbols_fts_ad;
+DROP TABLE IF EXISTS symbols_fts;
+"""
+
+# The trigram tokenizer cannot match queries shorter than one trigram.
+MIN_FTS_QUERY_LENGTH = 3
+
+# Match tiers returned by search_symbols(), best first.
+MATCH_EXACT, MATCH_PREFIX, MATCH_SUBSTRING = 0, 1, 2
+MATCH_KINDS = {MATCH_EXACT: "exact", MATCH_PREFIX: "prefix", MATCH_SUBSTRING: "substring"}
+
+_SYMBOL_COLUMNS = "s.name, s.type, s.file_path, s.start_line, s.end_line, s.parent, s.language"
+
+
+def has_fts(conn: sqlite3.Connection) -> bool:
+    """True if the database has the symbols_fts table (older databases may not)."""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'symbols_fts'").fetchone()
+    return row is not None
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_symbols(
+    conn: sqlite3.Connection,
+    name: str,
+    type_filter: Optional[str] = None,
+    limit: int = 20,
+) -> List[dict]:
+    """
+    Case-insensitive symbol lookup ranked exact > prefix > substring (shorter names first within
+    a tier). Later tiers are only queried while `limit` is not yet reached.
+
+    Returns:
+        list[dict]: name, type, file, start_line, end_line, parent, language and
+            match ("exact"/"prefix"/"substring").
+    """
+    type_clause = " AND s.type = ?" if type_filter else ""
+    type_params = [type_filter] if type_filter else []
+    prefix = _escape_like(name) + "%"
+
+    tiers = [
+        (MATCH_EXACT,
+         f"SELECT {_SYMBOL_COLUMNS} FROM symbols s WHERE s.name = ? COLLATE NOCASE{type_clause} "
+         "ORDER BY s.file_path, s.start_line LIMIT ?",
+         [name, *type_params]),
+        (MATCH_PREFIX,
+         f"SELECT {_SYMBOL_COLUMNS} FROM symbols s WHERE s.name LIKE ? ESCAPE '\\' "
+         f"AND s.name <> ? COLLATE NOCASE{type_clause} "
+         "ORDER BY length(s.name), s.name, s.file_path LIMIT ?",
+         [prefix, name, *type_params]),
+    ]
+    if len(name) >= MIN_FTS_QUERY_LENGTH and has_fts(conn):
+        phrase = '"' + name.replace('"', '""') + '"'
+        tiers.append((
+            MATCH_SUBSTRING,
+            f"SELECT {_SYMBOL_COLUMNS} FROM symbols_fts JOIN symbols s ON s.id = symbols_fts.rowid "
+            f"WHERE symbols_fts MATCH ? AND s.name NOT LIKE ? ESCAPE '\\'{type_clause} "
+            "ORDER BY length(s.name), s.name, s.file_path LIMIT ?",
+            [phrase, prefix, *type_params],
+        ))
+    else:
+        tiers.append((
+            MATCH_SUBSTRING,
+            f"SELECT {_SYMBOL_COLUMNS} FROM symbols s "
+            f"WHERE s.name LIKE ? ESCAPE '\\' AND s.name NOT LIKE ? ESCAPE '\\'{type_clause} "
+            "ORDER BY length(s.name), s.name, s.file_path LIMIT ?",
+            ["%" + prefix, prefix, *type_params],
+        ))
+
+    results: List[dict] = []
+    for tier, query, params in tiers:
+        remaining = limit - len(results)
+        if remaining <= 0:
+            break
+        for row in conn.execute(query, [*params, remaining]):
+            results.append({
+                "name": row[0],
+                "type": row[1],
+                "file": row[2],
+                "start_line": row[3],
+                "end_line": row[4],
+                "parent": row[5],
+                "language": row[6],
+                "match": MATCH_KINDS[tier],
+            })
+    return results
+
+
+def find_references(conn: sqlite3.Connection, name: str, limit: int = 200) -> List[dict]:
+    """
+    Places that reference the identifier `name` (exact, case-sensitive), ordered by file and line.
+
+    Returns:
+        list[dict]: file, line and enclosing ('Class.Method', '' at top level).
+            Empty if the database predates the refs table.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'refs'").fetchone() is None:
+        return []
+    rows = conn.execute(
+        "SELECT file_path, line, enclosing FROM refs WHERE name = ? ORDER BY file_path, line LIMIT ?",
+        (name, limit),
+    )
+    return [{"file": row[0], "line": row[1], "enclosing": row[2]} for row in rows]
+
+
+class SymbolIndex:
+    """Read/write access to a repository's symbol database."""
+
+    def __init__(self, repo_path: str):
+        self.repo_path = os.path.abspath(repo_path)
+        self.db_path = os.path.join(get_index_dir(self.repo_path), SYMBOL_DB_NAME)
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.db_path)
+
+    def connect(self) -> sqlite3.Connection:
+        """Open (and create if needed) the database with the current schema."""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Bring databases written by older indexers up to the current schema."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(symbols)")}
+        if "parent" not in columns:
+            conn.execute("ALTER TABLE symbols ADD COLUMN parent TEXT NOT NULL DEFAULT ''")
+        if "language" not in columns:
+            conn.execute("ALTER TABLE symbols ADD COLUMN language TEXT NOT NULL DEFAULT ''")
+            # Older indexers only understood C#
+            conn.execute("UPDATE symbols SET language = 'csharp'")
+        # Superseded by idx_symbols_name_nocase
+        conn.execute("DROP INDEX IF EXISTS idx_symbols_name")
+        conn.commit()
+        if not has_fts(conn):
+            SymbolIndex._create_fts(conn)
+
+    @staticmethod
+    def _create_fts(conn: sqlite3.Connection):
+        """Create symbols_fts and populate it from the existing rows."""
+        try:
+            with conn:
+                conn.executescript(FTS_SCHEMA)
+                conn.execute("INSERT INTO symbols_fts(symbols_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer)
+            logger.warning(f"FTS5 trigram index unavailable, substring lookups will scan: {e}")
+
+    def search(self, name: str, type_filter: Optional[str] = None, limit: int = 20) -> List[dict]:
+        """Ranked name lookup (see search_symbols) on a pooled read-only connection."""
+        with get_pool().connection(self.db_path) as conn:
+            return search_symbols(conn, name, type_filter, limit)
+
+    def find_references(self, name: str, limit: int = 200) -> List[dict]:
+        """Reference lookup (see find_references) on a pooled read-only connection."""
+        with get_pool().connection(self.db_path) as conn:
+            return find_references(conn, name, limit)
+
+    def get_meta(self) -> Dict[str, str]:
+        if not self.exists():
+            return {}
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            try:
+                return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            # Databases created by older tooling may lack the meta table
+            return {}
+
+    @staticmethod
+    def set_meta(conn: sqlite3.Connection, values: Dict[str, str]):
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", list(values.items()))
+
+    def index_files(
+        self,
+        conn: sqlite3.Connection,
+        rel_paths: Iterable[str],
+        workers: Optional[int] = None,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> dict:
+        """
+        (Re)index the given files: existing rows for each path are replaced, and paths that no
+        longer exist are removed. Runs inside the caller's transaction.
+
+        Parsing is fanned out over a process pool (one worker per core by default) in batches of
+        PARSE_BATCH_SIZE files; each finished batch is written with a single executemany.
+
+        Returns:
+            dict: Counts of parsed/removed files and inserted symbols/references, plus throughput figures.
+        """
+        rel_paths = list(rel_paths)
+        start = time.perf_counter()
+        stats = {"parsed": 0, "removed": 0, "symbols": 0, "refs": 0, "bytes": 0}
+
+        # Paths no indexer understands only need their (stale) rows dropped
+        conn.executemany("DELETE FROM symbols WHERE file_path = ?", [(p,) for p in rel_paths])
+        conn.executemany("DELETE FROM refs WHERE file_path = ?", [(p,) for p in rel_paths])
+        to_parse = [p for p in rel_paths if get_language(p)]
+        total = len(to_parse)
+
+        done = 0
+        for results in _iter_parsed_batches(self.repo_path, to_parse, workers):
+            rows = []
+            ref_rows = []
+            for rel_path, symbols, refs, size in results:
+                if symbols is None:
+                    stats["removed"] += 1
+                    continue
+                stats["parsed"] += 1
+                stats["bytes"] += size
+                language = get_language(rel_path)
+                rows.extend(
+                    (s.name, s.type, rel_path, s.start_line, s.end_line, s.parent, language) for s in symbols
+                )
+                ref_rows.extend((r.name, rel_path, r.line, r.enclosing) for r in refs)
+            conn.executemany(
+                "INSERT INTO symbols (name, type, file_path, start_line, end_line, parent, language) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany("INSERT INTO refs (name, file_path, line, enclosing) VALUES (?, ?, ?, ?)", ref_rows)
+            stats["symbols"] += len(rows)
+            stats["refs"] += len(ref_rows)
+            done += len(results)
+            if on_progress:
+                on_progress(done, total, stats["bytes"], time.perf_counter() - start)
+
+        elapsed = time.perf_counter() - start
+        stats["files_per_sec"] = round(stats["parsed"] / elapsed, 1) if elapsed > 0 else 0.0
+        stats["mb_per_sec"] = round(stats["bytes"] / (1024 * 1024) / elapsed, 2) if elapsed > 0 else 0.0
+        return stats
+
+    def rebuild(
+        self,
+        rel_paths: List[str],
+        meta: Dict[str, str],
+        workers: Optional[int] = None,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> dict:
+        """
+        Drop all symbols and index `rel_paths` from scratch.
+        symbols_fts is dropped for the bulk load and rebuilt once at the end, which is much
+        cheaper than maintaining it row by row through the triggers.
+        """
+        start = time.perf_counter()
+        conn = self.connect()
+        try:
+            conn.executescript(DROP_FTS)
+            with conn:
+                conn.execute("DELETE FROM symbols")
+                conn.execute("DELETE FROM refs")
+                stats = self.index_files(
+                    conn, [p for p in rel_paths if get_language(p)], workers, on_progress
+                )
+                self.set_meta(conn, {"schema_version": SCHEMA_VERSION, **meta})
+            self._create_fts(conn)
+        finally:
+            conn.close()
+        stats["seconds"] = round(time.perf_counter() - start, 2)
+        return stats
+
+    def update(
+        self,
+        rel_paths: List[str],
+        meta: Dict[str, str],
+        workers: Optional[int] = None,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> dict:
+        """Re-index only the given (changed or deleted) files."""
+        start = time.perf_counter()
+        conn = self.connect()
+        try:
+            with conn:
+                stats = self.index_files(conn, rel_paths, workers, on_progress)
+                self.set_meta(conn, meta)
+        finally:
+            conn.close()
+        stats["seconds"] = round(time.perf_counter() - start, 2)
+        return stats
@@ -0,0 +1,503 @@
+"""
+Trigram Index - narrows content searches to candidate files.
+
+Every indexed file is split into (ASCII-lowercased) byte trigrams and a posting list of file ids
+is stored per trigram in `.bug_sleuth_agent/trigram_index.db`. A query is reduced to the literal
+substrings it must contain; intersecting their trigram posting lists yields the (small) set of
+files that ripgrep then has to scan, instead of the whole repository.
+
+The index is a filter only: every candidate is still verified by ripgrep, so false positives are
+harmless. Callers must fall back to a full scan when `candidates()` returns None.
+
+The index describes the tree as it was when `bug-sleuth index` last ran. Files edited, added or
+reverted in the working tree since then (`git status` entries, or any file outside git, modified
+after indexing or unknown to the index) are always returned as candidates as well, so they are
+searched on disk instead of being missed.
+"""
+import os
+import json
+import sqlite3
+import fnmatch
+import logging
+import time
+from array import array
+from typing import Dict, List, Optional, Set
+
+from .vcs import get_git_head, get_index_dir, get_local_changes, list_repo_files
+
+logger = logging.getLogger(__name__)
+
+TRIGRAM_DB_NAME = "trigram_index.db"
+INDEX_FORMAT_VERSION = "2"
+
+# Files larger than this are not tokenized; they are always returned as candidates instead.
+MAX_INDEXED_FILE_SIZE = 2 * 1024 * 1024
+# Bytes sniffed for NUL to classify a file as binary (same idea as ripgrep's binary detection).
+BINARY_SNIFF_BYTES = 8192
+
+_UTF16_BOMS = (b"\xff\xfe", b"\xfe\xff")
+
+# files.indexed values: tokenized, always scanned (too large / UTF-16), never searched (binary).
+# Binary files are recorded so that the working-tree check does not mistake them for new files.
+FILE_TEXT = 1
+FILE_UNINDEXED = 0
+FILE_BINARY = 2
+
+
+def _trigrams(data: bytes) -> Set[bytes]:
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def _trigram_key(tri: bytes) -> int:
+    return int.from_bytes(tri, "big")
+
+
+_HEX_ESCAPE_WIDTH = {"x": 2, "u": 4, "U": 8}
+
+
+def _escape_end(pattern: str, i: int) -> int:
+    """Index just past the alphanumeric escape starting at pattern[i] ("\\")."""
+    n = len(pattern)
+    kind = pattern[i + 1]
+    j = i + 2
+    if kind in _HEX_ESCAPE_WIDTH or kind in "pP":
+        if j < n and pattern[j] == "{":
+            # \x{1F600}, \u{41}, \p{Han}
+            close = pattern.find("}", j)
+            return close + 1 if close != -1 else n
+        if kind in "pP":
+            # One-letter class: \pL
+            return min(j + 1, n)
+        end = min(j + _HEX_ESCAPE_WIDTH[kind], n)
+        while j < end and pattern[j] in "0123456789abcdefABCDEF":
+            j += 1
+        return j
+    if kind.isdigit():
+        # Octal (\0101) or backreference (\1)
+        while j < n and pattern[j].isdigit():
+            j += 1
+    return j
+
+
+def required_literals(pattern: str) -> Optional[List[str]]:
+    """
+    Extract the literal substrings that any match of a ripgrep regex must contain.
+
+    The extraction is conservative: constructs that are hard to reason about (alternation, groups)
+    make this return None, meaning "cannot narrow, scan everything".
+
+    Examples:
+        "InitPlayer"          -> ["InitPlayer"]
+        "ERR_10\\d+"          -> ["ERR_10"]
+        "class\\s+Battle.*Mgr" -> ["class", "Battle", "Mgr"]
+        "Foo|Bar"             -> None
+    """
+    literals: List[str] = []
+    current: List[str] = []
+
+    def flush():
+        if current:
+            literals.append("".join(current))
+            current.clear()
+
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "\\":
+            if i + 1 >= n:
+                break
+            nxt = pattern[i + 1]
+            if nxt.isalnum():
+                # Character classes (\w, \d, \s), anchors (\b) or escapes (\n, \x41): not literal.
+                # The whole escape is skipped so its payload does not leak into the next literal.
+                flush()
+                i = _escape_end(pattern, i)
+            else:
+                current.append(nxt)
+                i += 2
+            continue
+        if c in "|()":
+            return None
+        if c == "[":
+            flush()
+            # Skip the bracket expression, honouring escapes and a leading ']'
+            j = i + 1
+            if j < n and pattern[j] == "^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 2 if pattern[j] == "\\" else 1
+            i = j + 1
+            continue
+        if c in "?*{":
+            # Preceding atom may be absent
+            if current:
+                current.pop()
+            flush()
+            if c == "{":
+                close = pattern.find("}", i)
+                i = close + 1 if close != -1 else n
+                continue
+            i += 1
+            continue
+        if c in "+.^$":
+            flush()
+            i += 1
+            continue
+        if not c.isascii() and c.lower() != c.upper():
+            # Index is lowercased byte-wise (ASCII only); cased non-ASCII letters cannot be matched safely
+            flush()
+            i += 1
+            continue
+        current.append(c)
+        i += 1
+    flush()
+    return literals
+
+
+def query_trigrams(pattern: str) -> Optional[Set[int]]:
+    """Trigram keys required by the pattern, or None if the pattern cannot be narrowed."""
+    literals = required_literals(pattern)
+    if literals is None:
+        return None
+    keys: Set[int] = set()
+    for literal in literals:
+        data = literal.encode("utf-8")
+        if len(data) >= 3:
+            keys.update(_trigram_key(t) for t in _trigrams(data))
+    return keys or None
+
+
+def _matches_file_pattern(rel_path: str, file_pattern: Optional[str]) -> bool:
+    """Approximates ripgrep --glob: patterns without '/' match the basename."""
+    if not file_pattern:
+        return True
+    target = rel_path if "/" in file_pattern else rel_path.rsplit("/", 1)[-1]
+    return fnmatch.fnmatch(target, file_pattern)
+
+
+class TrigramIndex:
+    """On-disk trigram index for a single repository."""
+
+    def __init__(self, repo_path: str):
+        self.repo_path = os.path.abspath(repo_path)
+        self.db_path = os.path.join(get_index_dir(self.repo_path), TRIGRAM_DB_NAME)
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.db_path)
+
+    def _connect_ro(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def _read_meta(self, conn: sqlite3.Connection) -> Dict[str, str]:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def is_stale(self) -> bool:
+        """
+        True if the index is missing, has an unknown format, or was built for another revision.
+        Non-git directories have no revision marker; their edits are picked up by `candidates()`.
+        """
+        if not self.exists():
+            return True
+        try:
+            with self._connect_ro() as conn:
+                meta = self._read_meta(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Trigram index unreadable at {self.db_path}: {e}")
+            return True
+        if meta.get("format") != INDEX_FORMAT_VERSION:
+            return True
+        return meta.get("revision", "") != (get_git_head(self.repo_path) or "")
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    def _load_file(self, rel_path: str):
+        """
+        Read a file for tokenizing.
+
+        Returns:
+            (kind, data): kind is "text" (data holds the bytes), "unindexed" (too large or UTF-16,
+            must always be scanned), "binary" (never searched) or None (unreadable/deleted).
+        """
+        abs_path = os.path.join(self.repo_path, rel_path)
+        try:
+            if os.path.getsize(abs_path) > MAX_INDEXED_FILE_SIZE:
+                return "unindexed", None
+            with open(abs_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None, None
+
+        head = data[:BINARY_SNIFF_BYTES]
+        if head.startswith(_UTF16_BOMS):
+            # ripgrep transcodes UTF-16; byte trigrams would not match, so always scan it
+            return "unindexed", None
+        if b"\0" in head:
+            return "binary", None
+        return "text", data
+
+    def build(self, revision: Optional[str] = None) -> dict:
+        """
+        (Re)build the index from scratch. The database is written to a temporary file and
+        swapped in atomically so concurrent readers never see a half-built index.
+
+        Returns:
+            dict: Build statistics (files, indexed, skipped_binary, trigrams, seconds).
+        """
+        start = time.perf_counter()
+        indexed_at = time.time()
+        if revision is None:
+            revision = get_git_head(self.repo_path) or ""
+        local_changes = (get_local_changes(self.repo_path) or []) if revision else []
+        files = list_repo_files(self.repo_path)
+
+        postings: Dict[bytes, array] = {}
+        file_rows = []
+        skipped_binary = 0
+
+        for rel_path in files:
+            kind, data = self._load_file(rel_path)
+            if kind is None:
+                continue
+            file_id = len(file_rows) + 1
+            if kind == "binary":
+                skipped_binary += 1
+                file_rows.append((file_id, rel_path, FILE_BINARY))
+                continue
+
+            file_rows.append((file_id, rel_path, FILE_UNINDEXED if data is None else FILE_TEXT))
+            if data is None:
+                continue
+            for tri in _trigrams(data):
+                ids = postings.get(tri)
+                if ids is None:
+                    postings[tri] = ids = array("I")
+                ids.append(file_id)
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        tmp_path = self.db_path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(
+                """
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE files (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    indexed INTEGER NOT NULL,
+                    deleted INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX idx_files_path ON files(path);
+                CREATE TABLE postings (trigram INTEGER PRIMARY KEY, file_ids BLOB NOT NULL);
+                """
+            )
+            conn.executemany("INSERT INTO files (id, path, indexed) VALUES (?, ?, ?)", file_rows)
+            conn.executemany(
+                "INSERT INTO postings (trigram, file_ids) VALUES (?, ?)",
+                ((_trigram_key(t), ids.tobytes()) for t, ids in postings.items()),
+            )
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("format", INDEX_FORMAT_VERSION),
+                    ("revision", revision),
+                    ("built_at", str(int(time.time()))),
+                    ("indexed_at", repr(indexed_at)),
+                    ("local_changes", json.dumps(local_changes)),
+                ],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.db_path)
+
+        stats = {
+            "files": len(file_rows) - skipped_binary,
+            "indexed": sum(1 for r in file_rows if r[2] == FILE_TEXT),
+            "skipped_binary": skipped_binary,
+            "trigrams": len(postings),
+            "seconds": round(time.perf_counter() - start, 2),
+        }
+        logger.info(f"Built trigram index for {self.repo_path}: {stats}")
+        return stats
+
+    def update(self, rel_paths: List[str], revision: str) -> dict:
+        """
+        Incrementally re-index the given files (modified, added or deleted).
+
+        Old entries are tombstoned (files.deleted = 1) and re-added under a new file id, so
+        posting lists only ever grow; a periodic full `build()` compacts them again.
+
+        Returns:
+            dict: Update statistics (updated, deleted, seconds).
+        """
+        start = time.perf_counter()
+        indexed_at = time.time()
+        local_changes = (get_local_changes(self.repo_path) or []) if revision else []
+        updated = deleted = 0
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_files_path ON files(path)")
+            new_postings: Dict[int, array] = {}
+            for rel_path in rel_paths:
+                if any(part.startswith('.') for part in rel_path.split('/')):
+                    continue
+                conn.execute("UPDATE files SET deleted = 1 WHERE path = ? AND deleted = 0", (rel_path,))
+
+                kind, data = self._load_file(rel_path)
+                if kind is None:
+                    deleted += 1
+                    continue
+
+                indexed = {"text": FILE_TEXT, "binary": FILE_BINARY}.get(kind, FILE_UNINDEXED)
+                cursor = conn.execute("INSERT INTO files (path, indexed) VALUES (?, ?)", (rel_path, indexed))
+                if kind == "binary":
+                    continue
+                updated += 1
+                if data is None:
+                    continue
+                for tri in _trigrams(data):
+                    key = _trigram_key(tri)
+                    ids = new_postings.get(key)
+                    if ids is None:
+                        new_postings[key] = ids = array("I")
+                    ids.append(cursor.lastrowid)
+
+            for key, ids in new_postings.items():
+                row = conn.execute("SELECT file_ids FROM postings WHERE trigram = ?", (key,)).fetchone()
+                blob = (row[0] if row else b"") + ids.tobytes()
+                conn.execute("INSERT OR REPLACE INTO postings (trigram, file_ids) VALUES (?, ?)", (key, blob))
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("revision", revision),
+                    ("indexed_at", repr(indexed_at)),
+                    ("local_changes", json.dumps(local_changes)),
+                ],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        stats = {"updated": updated, "deleted": deleted, "seconds": round(time.perf_counter() - start, 2)}
+        logger.info(f"Updated trigram index for {self.repo_path}: {stats}")
+        return stats
+
+    def indexed_revision(self) -> Optional[str]:
+        """Revision recorded at the last build/update, or None if there is no usable index."""
+        if not self.exists():
+            return None
+        try:
+            with self._connect_ro() as conn:
+                meta = self._read_meta(conn)
+        except sqlite3.Error:
+            return None
+        if meta.get("format") != INDEX_FORMAT_VERSION:
+            return None
+        return meta.get("revision", "")
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def _working_tree_changes(self, conn: sqlite3.Connection) -> Optional[Set[str]]:
+        """
+        Paths whose content on disk may differ from what was indexed: files modified after the
+        index was written or unknown to it. In git only the `git status` entries of now and of
+        indexing time (an edit reverted since is clean again) are checked; elsewhere every file.
+        None if git status failed.
+        """
+        meta = self._read_meta(conn)
+        known = {r[0] for r in conn.execute("SELECT path FROM files WHERE deleted = 0")}
+        if meta.get("revision"):
+            paths = get_local_changes(self.repo_path)
+            if paths is None:
+                return None
+            paths += json.loads(meta.get("local_changes") or "[]")
+        else:
+            paths = known.union(list_repo_files(self.repo_path))
+
+        indexed_at = float(meta.get("indexed_at") or 0)
+        changed: Set[str] = set()
+        for rel_path in paths:
+            if rel_path not in known:
+                changed.add(rel_path)
+                continue
+            try:
+                if os.stat(os.path.join(self.repo_path, rel_path)).st_mtime >= indexed_at:
+                    changed.add(rel_path)
+            except OSError:
+                changed.add(rel_path)  # Deleted since indexing
+        return changed
+
+    def candidates(self, query: str, file_pattern: Optional[str] = None) -> Optional[List[str]]:
+        """
+        Absolute paths of the files that may contain a match for `query`, including every file
+        changed in the working tree since the index was written.
+
+        Returns:
+            A (possibly empty) list of paths, or None when the index cannot help
+            (missing/stale index, working tree state unknown, or a query without a literal
+            of 3+ bytes).
+        """
+        keys = query_trigrams(query)
+        if keys is None or self.is_stale():
+            return None
+
+        try:
+            with self._connect_ro() as conn:
+                changed = self._working_tree_changes(conn)
+                if changed is None:
+                    return None
+                placeholders = ",".join("?" * len(keys))
+                rows = conn.execute(
+                    f"SELECT file_ids FROM postings WHERE trigram IN ({placeholders})",
+                    list(keys),
+                ).fetchall()
+
+                ids: Set[int] = set()
+                if len(rows) == len(keys):
+                    # Intersect smallest posting lists first
+                    lists = sorted((r[0] for r in rows), key=len)
+                    ids = set(array("I", lists[0]))
+                    for blob in lists[1:]:
+                        if not ids:
+                            break
+                        ids.intersection_update(array("I", blob))
+
+                # Files that were too large (or UTF-16) to tokenize must always be scanned
+                ids.update(r[0] for r in conn.execute("SELECT id FROM files WHERE indexed = ?", (FILE_UNINDEXED,)))
+
+                paths = []
+                if ids:
+                    id_list = sorted(ids)
+                    for chunk_start in range(0, len(id_list), 500):
+                        chunk = id_list[chunk_start:chunk_start + 500]
+                        placeholders = ",".join("?" * len(chunk))
+                        paths.extend(
+                            r[0] for r in conn.execute(
+                                f"SELECT path FROM files WHERE deleted = 0 AND indexed != ? AND id IN ({placeholders})",
+                                [FILE_BINARY, *chunk],
+                            )
+                        )
+        except sqlite3.Error as e:
+            logger.warning(f"Trigram index query failed for {self.repo_path}: {e}")
+            return None
+
+        # Changed files are searched on disk; deleted ones drop out
+        changed = {p for p in changed if not any(part.startswith('.') for part in p.split('/'))}
+        removed = {p for p in changed if not os.path.isfile(os.path.join(self.repo_path, p))}
+        return [
+            os.path.normpath(os.path.join(self.repo_path, p))
+            for p in sorted((set(paths) | changed) - removed)
+            if _matches_file_pattern(p, file_pattern)
+        ]
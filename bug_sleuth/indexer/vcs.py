@@ -0,0 +1,266 @@
+import os
+import subprocess
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Directory (inside each repository) where all agent-side indexes live.
+INDEX_DIR_NAME = ".bug_sleuth_agent"
+
+
+def get_index_dir(repo_path: str) -> str:
+    """Returns the per-repository index directory (not created)."""
+    return os.path.join(repo_path, INDEX_DIR_NAME)
+
+
+def _find_git_dir(repo_path: str) -> Optional[Path]:
+    """
+    Locate the git directory for a working tree.
+    Handles both regular repositories and worktrees/submodules ('.git' file with 'gitdir:').
+    """
+    dot_git = Path(repo_path) / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    if dot_git.is_file():
+        try:
+            content = dot_git.read_text(encoding="utf-8").strip()
+            if content.startswith("gitdir:"):
+                git_dir = Path(content[len("gitdir:"):].strip())
+                if not git_dir.is_absolute():
+                    git_dir = (Path(repo_path) / git_dir).resolve()
+                return git_dir
+        except OSError:
+            pass
+    return None
+
+
+def get_git_head(repo_path: str) -> Optional[str]:
+    """
+    Resolve HEAD to a commit hash by reading the git metadata files directly.
+    This avoids spawning a git process, so it is cheap enough to call on every tool invocation.
+
+    Returns:
+        The commit hash, or None if the path is not a git working tree.
+    """
+    git_dir = _find_git_dir(repo_path)
+    if git_dir is None:
+        return None
+
+    try:
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+
+    if not head.startswith("ref:"):
+        # Detached HEAD
+        return head
+
+    ref = head[len("ref:"):].strip()
+
+    # Worktrees keep refs in the common dir
+    common_dir = git_dir
+    commondir_file = git_dir / "commondir"
+    if commondir_file.is_file():
+        try:
+            common_dir = (git_dir / commondir_file.read_text(encoding="utf-8").strip()).resolve()
+        except OSError:
+            pass
+
+    for base in (git_dir, common_dir):
+        ref_file = base / ref
+        if ref_file.is_file():
+            try:
+                return ref_file.read_text(encoding="utf-8").strip()
+            except OSError:
+                continue
+
+    # Fallback: packed-refs
+    packed = common_dir / "packed-refs"
+    if packed.is_file():
+        try:
+            with open(packed, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("#") or line.startswith("^"):
+                        continue
+                    parts = line.strip().split(" ", 1)
+                    if len(parts) == 2 and parts[1] == ref:
+                        return parts[0]
+        except OSError:
+            pass
+
+    # Unborn branch (no commits yet)
+    return None
+
+
+def _find_svn_dir(repo_path: str) -> Optional[Path]:
+    """The `.svn` directory of the working copy containing repo_path (SVN 1.7+ keeps one at the root)."""
+    path = Path(repo_path).resolve()
+    for candidate in (path, *path.parents):
+        if (candidate / ".svn").is_dir():
+            return candidate / ".svn"
+    return None
+
+
+def get_working_copy_marker(repo_path: str, vcs: str = "git") -> Optional[str]:
+    """
+    A cheap token that changes whenever the working copy is moved to another revision.
+
+    Git: HEAD hash plus the mtime of `.git/index` (rewritten by checkout, pull, reset, add ...).
+    SVN: the mtime of `.svn/wc.db` (rewritten by update, switch, commit, revert ...). Neither
+    spawns a process. Plain edits of tracked files are not covered.
+
+    Returns:
+        The marker, or None if repo_path is not a working copy of that VCS.
+    """
+    try:
+        if vcs.lower() == "svn":
+            svn_dir = _find_svn_dir(repo_path)
+            if svn_dir is None:
+                return None
+            return f"wc:{(svn_dir / 'wc.db').stat().st_mtime_ns}"
+
+        git_dir = _find_git_dir(repo_path)
+        if git_dir is None:
+            return None
+        index = git_dir / "index"
+        index_mtime = index.stat().st_mtime_ns if index.is_file() else 0
+        return f"{get_git_head(repo_path) or ''}:{index_mtime}"
+    except OSError:
+        return None
+
+
+def list_repo_files(repo_path: str) -> List[str]:
+    """
+    List the files that a content search would visit, relative to repo_path (POSIX separators).
+
+    Git repositories use `git ls-files` (tracked + untracked-but-not-ignored), other directories
+    are walked. Hidden entries (including the agent's own index directory) are skipped in both
+    cases, which matches what ripgrep searches by default.
+    """
+    if _find_git_dir(repo_path) is not None:
+        try:
+            completed = subprocess.run(
+                ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+                cwd=repo_path,
+                capture_output=True,
+            )
+            if completed.returncode == 0:
+                files = completed.stdout.decode("utf-8", errors="surrogateescape").split("\0")
+                # Deduplicate (unmerged entries are listed once per stage)
+                return sorted({
+                    f for f in files
+                    if f and not any(part.startswith('.') for part in f.split('/'))
+                })
+            logger.warning(f"git ls-files failed in {repo_path}: {completed.stderr[:200]!r}")
+        except OSError as e:
+            logger.warning(f"git not available for {repo_path}: {e}")
+
+    files = []
+    for root, dirs, filenames in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        rel_root = os.path.relpath(root, repo_path)
+        for name in filenames:
+            if name.startswith('.'):
+                continue
+            rel = name if rel_root == "." else os.path.join(rel_root, name)
+            files.append(rel.replace(os.sep, "/"))
+    files.sort()
+    return files
+
+
+def _run(args: List[str], cwd: str) -> Optional[str]:
+    """Run a VCS command without a shell. Returns stdout, or None on failure."""
+    try:
+        completed = subprocess.run(args, cwd=cwd, capture_output=True)
+    except OSError as e:
+        logger.warning(f"Failed to run {args[0]} in {cwd}: {e}")
+        return None
+    if completed.returncode != 0:
+        logger.warning(f"{' '.join(args[:3])} failed in {cwd}: {completed.stderr[:200]!r}")
+        return None
+    return completed.stdout.decode("utf-8", errors="surrogateescape")
+
+
+def get_svn_revision(repo_path: str) -> Optional[str]:
+    """Working copy revision of an SVN checkout (local metadata only, no server round-trip)."""
+    output = _run(["svn", "info", "--show-item", "revision", repo_path], cwd=repo_path)
+    return output.strip() if output else None
+
+
+def get_repo_revision(repo_path: str, vcs: str = "git") -> Optional[str]:
+    """Current revision of a repository: HEAD hash for git, working copy revision for SVN."""
+    if vcs.lower() == "svn":
+        return get_svn_revision(repo_path)
+    return get_git_head(repo_path)
+
+
+def get_local_changes(repo_path: str, vcs: str = "git") -> Optional[List[str]]:
+    """
+    Paths with uncommitted modifications in the working copy (including untracked files for git).
+
+    Returns:
+        A list of relative paths (POSIX separators), or None if the VCS could not be queried.
+    """
+    changed = set()
+    if vcs.lower() == "svn":
+        status = _run(["svn", "status", "-q"], cwd=repo_path)
+        if status is None:
+            return None
+        for line in status.splitlines():
+            # "M       path/to/file"
+            if len(line) > 8:
+                changed.add(line[8:].strip().replace("\\", "/"))
+    else:
+        status = _run(
+            ["git", "status", "--porcelain", "-z", "--no-renames", "--untracked-files=all"],
+            cwd=repo_path,
+        )
+        if status is None:
+            return None
+        for entry in status.split("\0"):
+            # Porcelain v1 entries are "XY path"
+            if len(entry) > 3:
+                changed.add(entry[3:])
+    # The agent's own index directory shows up as untracked; it is never indexed
+    return sorted(p for p in changed if not p.startswith(INDEX_DIR_NAME + "/"))
+
+
+def get_committed_changes(
+    repo_path: str,
+    vcs: str,
+    since_revision: str,
+    current_revision: str,
+) -> Optional[List[str]]:
+    """
+    Paths (relative, POSIX separators) touched by commits between two revisions.
+    Callers check existence on disk to tell modified from deleted files.
+
+    Returns:
+        A list of paths, or None if the changes cannot be determined (caller should re-index fully).
+    """
+    if since_revision == current_revision:
+        return []
+
+    changed = set()
+    if vcs.lower() == "svn":
+        summary = _run(
+            ["svn", "diff", "--summarize", "-r", f"{since_revision}:{current_revision}", "."],
+            cwd=repo_path,
+        )
+        if summary is None:
+            return None
+        for line in summary.splitlines():
+            # "M       path/to/file"
+            if len(line) > 8:
+                changed.add(line[8:].strip().replace("\\", "/"))
+    else:
+        committed = _run(
+            ["git", "diff", "--name-only", "--no-renames", "-z", since_revision, current_revision],
+            cwd=repo_path,
+        )
+        if committed is None:
+            return None
+        changed.update(p for p in committed.split("\0") if p)
+    return sorted(changed)
@@ -350,6 +350,13 @@ try:
         
         return {"filename": request.filename, "path": file_path_uri}
 
+    # Search cache counters for monitoring
+    @app.get("/metrics/search-cache")
+    async def get_search_cache_stats():
+        """Hit/miss counters of the process-wide search result cache."""
+        from bug_sleuth.shared_libraries.result_cache import get_search_cache
+        return get_search_cache().stats()
+
     # 4. Register UI Endpoint (Restoring original UI)
     @app.get("/reporter", response_class=HTMLResponse)
     async def get_reporter_ui():
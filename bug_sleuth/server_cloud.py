@@ -99,6 +99,13 @@ try:
         a2a=False
     )
     
+    # Search cache counters for monitoring
+    @app.get("/metrics/search-cache")
+    async def get_search_cache_stats():
+        """Hit/miss counters of the process-wide search result cache."""
+        from bug_sleuth.shared_libraries.result_cache import get_search_cache
+        return get_search_cache().stats()
+
     # 3. Register UI Endpoint
     # Mounts the 'reporter' UI which is a simple HTML file.
     @app.get("/reporter", response_class=HTMLResponse)
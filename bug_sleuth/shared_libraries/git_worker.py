@@ -0,0 +1,326 @@
+"""
+Per-repository git workers that keep `git cat-file` processes alive between tool calls.
+
+Spawning git (through a shell, on Windows build agents especially) and opening the repository
+costs far more than the object reads the git tools need. A GitWorker owns one long-lived
+`git cat-file --batch` process (object contents) and one `--batch-check` process (object id,
+type and size; also resolves revision expressions like `HEAD~3` or `main`) per repository.
+
+Requests are pipelined: callers write their request line and get a future, and one reader thread
+per process resolves the futures in order (cat-file answers strictly in request order), so
+concurrent coroutines share a process without waiting for each other's round trips. A process
+that dies is restarted on the next request.
+
+Commands that cat-file cannot answer (path-limited log, diff, blame) run git directly from an
+argument list, without a shell.
+
+Lives outside the agent package so every importer shares one set of processes.
+"""
+import heapq
+import atexit
+import asyncio
+import logging
+import threading
+import subprocess
+import concurrent.futures
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Repositories with live worker processes; the least recently used one is closed beyond this.
+MAX_WORKERS = 8
+# Seconds a direct git command may run.
+GIT_COMMAND_TIMEOUT = 60
+# Minimum length of abbreviated hashes (git's default).
+MIN_ABBREV = 7
+
+# Avoid a console window per git process on Windows
+_CREATION_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+class GitObject(NamedTuple):
+    oid: str
+    type: str
+    size: int
+    data: Optional[bytes]  # None for --batch-check lookups
+
+
+class Commit(NamedTuple):
+    oid: str
+    tree: str
+    parents: List[str]
+    author: str
+    author_email: str
+    author_time: int
+    author_tz: str       # e.g. "+0800"
+    commit_time: int
+    message: str
+
+
+class _BatchProcess:
+    """One `git cat-file --batch` or `--batch-check` process with pipelined requests."""
+
+    def __init__(self, repo_root: str, with_contents: bool):
+        self.repo_root = repo_root
+        self.with_contents = with_contents
+        # Held while writing a request; the pending lock is never held during I/O, so the reader
+        # can always drain stdout while a writer is blocked on a full stdin pipe
+        self._write_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._pending: Deque[concurrent.futures.Future] = deque()
+
+    def _start(self):
+        mode = "--batch" if self.with_contents else "--batch-check"
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", mode],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self.repo_root,
+            creationflags=_CREATION_FLAGS,
+        )
+        logger.debug(f"Started git cat-file {mode} in {self.repo_root}")
+        self._pending = deque()
+        threading.Thread(target=self._read_loop, args=(self._proc, self._pending), daemon=True).start()
+
+    def _read_loop(self, proc: subprocess.Popen, pending: Deque[concurrent.futures.Future]):
+        stdout = proc.stdout
+        try:
+            while True:
+                header = stdout.readline()
+                if not header:
+                    break
+                result = None
+                fields = header.decode("utf-8", errors="replace").split()
+                # "<oid> <type> <size>", or "<name> missing" / "<name> ambiguous"
+                if len(fields) == 3 and fields[2].isdigit():
+                    size = int(fields[2])
+                    data = None
+                    if self.with_contents:
+                        data = stdout.read(size)
+                        stdout.read(1)  # Trailing newline
+                    result = GitObject(fields[0], fields[1], size, data)
+                with self._pending_lock:
+                    future = pending.popleft() if pending else None
+                if future is not None:
+                    future.set_result(result)
+        except (OSError, ValueError):
+            pass
+        # The process is gone: fail whatever is still waiting
+        with self._pending_lock:
+            while pending:
+                pending.popleft().set_exception(OSError("git cat-file exited"))
+
+    def request(self, name: str) -> concurrent.futures.Future:
+        if "\n" in name:
+            raise ValueError("Object names cannot contain newlines.")
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._write_lock:
+            for attempt in range(2):
+                if self._proc is None or self._proc.poll() is not None:
+                    self._start()
+                pending = self._pending
+                with self._pending_lock:
+                    pending.append(future)
+                try:
+                    self._proc.stdin.write(name.encode("utf-8", errors="surrogateescape") + b"\n")
+                    self._proc.stdin.flush()
+                    return future
+                except OSError:
+                    # Broken pipe: the process died between requests, start a new one once
+                    with self._pending_lock:
+                        if future in pending:
+                            pending.remove(future)
+                    self._kill()
+                    if attempt:
+                        raise
+        return future
+
+    def _kill(self):
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+            except OSError:
+                pass
+            self._proc = None
+
+    def close(self):
+        with self._write_lock:
+            if self._proc is not None:
+                try:
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=2)
+                except (OSError, subprocess.TimeoutExpired):
+                    self._kill()
+                self._proc = None
+
+
+def _parse_commit(oid: str, data: bytes) -> Commit:
+    header, _, body = data.partition(b"\n\n")
+    fields: Dict[str, str] = {}
+    parents: List[str] = []
+    for line in header.split(b"\n"):
+        key, _, value = line.partition(b" ")
+        key = key.decode("ascii", errors="replace")
+        if key == "parent":
+            parents.append(value.decode("ascii"))
+        elif key and key not in fields:
+            fields[key] = value.decode("utf-8", errors="replace")
+
+    encoding = fields.get("encoding", "utf-8")
+    try:
+        message = body.decode(encoding, errors="replace")
+    except LookupError:
+        message = body.decode("utf-8", errors="replace")
+
+    # "Name <email> 1697000000 +0800"
+    ident, _, stamp = fields.get("author", "").rpartition(">")
+    name, _, email = ident.partition("<")
+    stamp_parts = stamp.split()
+    committer_stamp = fields.get("committer", "").rpartition(">")[2].split()
+    return Commit(
+        oid=oid,
+        tree=fields.get("tree", ""),
+        parents=parents,
+        author=name.strip(),
+        author_email=email.strip(),
+        author_time=int(stamp_parts[0]) if stamp_parts else 0,
+        author_tz=stamp_parts[1] if len(stamp_parts) > 1 else "+0000",
+        commit_time=int(committer_stamp[0]) if committer_stamp else 0,
+        message=message,
+    )
+
+
+def format_git_date(timestamp: int, tz: str) -> str:
+    """The `git log` default date format, e.g. "Thu Oct 17 17:45:53 2026 +0800"."""
+    try:
+        sign = -1 if tz.startswith("-") else 1
+        offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])) * sign
+    except ValueError:
+        offset, tz = timedelta(0), "+0000"
+    moment = datetime.fromtimestamp(timestamp, timezone(offset))
+    return f"{moment:%a %b} {moment.day} {moment:%H:%M:%S %Y} {tz}"
+
+
+def commit_subject(message: str) -> str:
+    """First paragraph of a commit message on one line (git's %s)."""
+    return " ".join(message.strip().split("\n\n", 1)[0].split("\n")).strip()
+
+
+class GitWorker:
+    """Object reads for one repository through persistent cat-file processes."""
+
+    def __init__(self, repo_root: str):
+        self.repo_root = repo_root
+        self._batch = _BatchProcess(repo_root, with_contents=True)
+        self._check = _BatchProcess(repo_root, with_contents=False)
+
+    async def object_info(self, name: str) -> Optional[GitObject]:
+        """Id, type and size of an object or revision expression (None if it does not exist)."""
+        return await asyncio.wrap_future(self._check.request(name))
+
+    async def read_object(self, name: str) -> Optional[GitObject]:
+        """Object with its contents (None if it does not exist)."""
+        return await asyncio.wrap_future(self._batch.request(name))
+
+    async def resolve(self, revision: str) -> Optional[str]:
+        """Full object id of a revision expression (e.g. 'HEAD~1', 'main', an abbreviated hash)."""
+        info = await self.object_info(revision)
+        return info.oid if info is not None else None
+
+    async def read_commit(self, revision: str) -> Optional[Commit]:
+        obj = await self.read_object(f"{revision}^{{commit}}")
+        if obj is None:
+            return None
+        return _parse_commit(obj.oid, obj.data)
+
+    async def abbreviate(self, oid: str) -> str:
+        """Shortest unambiguous prefix of `oid`, at least MIN_ABBREV characters."""
+        for length in range(MIN_ABBREV, len(oid)):
+            info = await self.object_info(oid[:length])
+            if info is not None and info.oid == oid:
+                return oid[:length]
+        return oid
+
+    async def log(self, start: str = "HEAD", limit: int = 5) -> List[Commit]:
+        """
+        The `limit` newest commits reachable from `start`, newest first by committer date (the
+        order `git log` uses without options).
+        """
+        head = await self.read_commit(start)
+        if head is None:
+            return []
+        commits: List[Commit] = []
+        seen = {head.oid}
+        queue = [(-head.commit_time, 0, head)]
+        counter = 1
+        while queue and len(commits) < limit:
+            _, _, commit = heapq.heappop(queue)
+            commits.append(commit)
+            parents = [p for p in commit.parents if p not in seen]
+            seen.update(parents)
+            # Parents are requested together, so their reads are pipelined
+            for parent in await asyncio.gather(*(self.read_commit(p) for p in parents)):
+                if parent is not None:
+                    heapq.heappush(queue, (-parent.commit_time, counter, parent))
+                    counter += 1
+        return commits
+
+    async def run(self, args: List[str], timeout: float = GIT_COMMAND_TIMEOUT) -> subprocess.CompletedProcess:
+        """Run `git <args>` in the repository without a shell."""
+        return await asyncio.to_thread(
+            subprocess.run,
+            ["git", *args],
+            cwd=self.repo_root,
+            capture_output=True,
+            timeout=timeout,
+            creationflags=_CREATION_FLAGS,
+        )
+
+    def close(self):
+        self._batch.close()
+        self._check.close()
+
+
+def find_git_root(path: str) -> Optional[str]:
+    """Root of the git working tree containing `path` (a file or directory)."""
+    candidate = Path(path).resolve()
+    if not candidate.is_dir():
+        candidate = candidate.parent
+    for directory in (candidate, *candidate.parents):
+        if (directory / ".git").exists():
+            return str(directory)
+    return None
+
+
+_workers: "OrderedDict[str, GitWorker]" = OrderedDict()
+_workers_lock = threading.Lock()
+
+
+def get_git_worker(path: str) -> Optional[GitWorker]:
+    """Shared worker for the repository containing `path`, or None if it is not in a git work tree."""
+    root = find_git_root(path)
+    if root is None:
+        return None
+    with _workers_lock:
+        worker = _workers.get(root)
+        if worker is None:
+            worker = GitWorker(root)
+            _workers[root] = worker
+            while len(_workers) > MAX_WORKERS:
+                _, evicted = _workers.popitem(last=False)
+                evicted.close()
+        _workers.move_to_end(root)
+        return worker
+
+
+@atexit.register
+def close_all_workers():
+    with _workers_lock:
+        for worker in _workers.values():
+            worker.close()
+        _workers.clear()
@@ -0,0 +1,183 @@
+"""
+Process-wide result cache for the search tools.
+
+An investigation often repeats the exact same search_code_tool / search_res_tool call, and each
+repeat used to cost a full ripgrep scan. Results are cached per (tool, normalized arguments,
+working-copy marker of every searched repository) in one LRU shared by all sessions of the
+server process, bounded by the approximate size of the cached results.
+
+The repository markers (see `get_working_copy_marker`) change on checkout / pull / svn update,
+so a moved working copy never serves old results: the first lookup that sees a new marker drops
+every entry of that repository. Entries also expire after `CACHE_TTL` seconds, which bounds how
+long plain local edits (not visible in the marker) can go unnoticed.
+
+Lives outside the agent package so the server and the agent (which ADK may import under another
+module name) share one instance.
+"""
+import copy
+import json
+import time
+import inspect
+import logging
+import functools
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from bug_sleuth.indexer.vcs import get_working_copy_marker
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the (JSON) size of all cached results.
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Results larger than this are not cached (they would evict many small ones).
+CACHE_MAX_ENTRY_BYTES = 4 * 1024 * 1024
+# Seconds an entry stays valid even when no repository marker changed.
+CACHE_TTL = 15 * 60
+
+_Key = Tuple[Any, ...]
+_Repos = Tuple[Tuple[str, Optional[str]], ...]
+
+
+class ResultCache:
+    """Thread-safe LRU of tool results with size-based eviction and revision invalidation."""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (result, size, stored_at, repos)
+        self._entries: "OrderedDict[_Key, Tuple[dict, int, float, _Repos]]" = OrderedDict()
+        self._markers: Dict[str, Optional[str]] = {}
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    def _drop(self, key: _Key):
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _observe(self, repos: _Repos):
+        """Drop the entries of every repository whose marker changed since it was last seen."""
+        moved = set()
+        for path, marker in repos:
+            if path in self._markers and self._markers[path] != marker:
+                moved.add(path)
+            self._markers[path] = marker
+        if not moved:
+            return
+        stale = [k for k, entry in self._entries.items() if any(p in moved for p, _ in entry[3])]
+        for key in stale:
+            self._drop(key)
+        self._counters["invalidations"] += len(stale)
+        logger.info(f"Search cache: {', '.join(sorted(moved))} changed revision, dropped {len(stale)} entries.")
+
+    def get(self, key: _Key, repos: _Repos) -> Optional[dict]:
+        with self._lock:
+            self._observe(repos)
+            entry = self._entries.get((key, repos))
+            if entry is not None and time.monotonic() - entry[2] > self.ttl:
+                self._drop((key, repos))
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end((key, repos))
+            self._counters["hits"] += 1
+            result = entry[0]
+        return copy.deepcopy(result)
+
+    def put(self, key: _Key, repos: _Repos, result: dict):
+        size = len(json.dumps(result, ensure_ascii=False, default=str))
+        if size > min(CACHE_MAX_ENTRY_BYTES, self.max_bytes):
+            return
+        with self._lock:
+            self._observe(repos)
+            full_key = (key, repos)
+            if full_key in self._entries:
+                self._drop(full_key)
+            self._entries[full_key] = (copy.deepcopy(result), size, time.monotonic(), repos)
+            self._bytes += size
+            self._counters["stores"] += 1
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._markers.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Counters for monitoring: hits, misses, hit_rate, stores, evictions, invalidations, entries, bytes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+_search_cache = ResultCache()
+
+
+def get_search_cache() -> ResultCache:
+    """The process-wide cache shared by all search tools and sessions."""
+    return _search_cache
+
+
+def _repo_markers(tool_context) -> _Repos:
+    registry = tool_context.state.get(StateKeys.REPO_REGISTRY, []) if tool_context is not None else []
+    repos = []
+    for repo in registry:
+        if path := repo.get("path"):
+            path = str(Path(path).resolve())
+            repos.append((path, get_working_copy_marker(path, repo.get("vcs", "git"))))
+    return tuple(repos)
+
+
+def cached_search(ignore_case: Iterable[str] = ()):
+    """
+    Decorator caching a search tool's successful results in the process-wide cache.
+
+    The key is the tool name, its arguments (stripped; lowercased for the names in
+    `ignore_case`) and the working-copy markers of the registered repositories. Results with
+    status != "success" or flagged "timed_out" (partial) are not cached.
+    """
+    ignore_case = set(ignore_case)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            tool_context = bound.arguments.get("tool_context")
+            arguments = []
+            for name, value in bound.arguments.items():
+                if name == "tool_context":
+                    continue
+                if isinstance(value, str):
+                    value = value.strip()
+                    if name in ignore_case:
+                        value = value.lower()
+                arguments.append((name, value))
+            key = (func.__name__, tuple(arguments))
+            repos = _repo_markers(tool_context)
+
+            cache = get_search_cache()
+            cached = cache.get(key, repos)
+            if cached is not None:
+                return cached
+
+            result = await func(*args, **kwargs)
+            if isinstance(result, dict) and result.get("status") == "success" and not result.get("timed_out"):
+                cache.put(key, repos, result)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -115,6 +115,7 @@ class VisualLlmAgent(LlmAgent):
                         icons = {
                             "run_bash_command": "🖥️",
                             "read_file_tool": "📄",
+                            "read_file_ranges_tool": "📄",
                             "read_code_tool": "💻",
                             "search_code_tool": "🔍",
                             "list_dir_tool": "📂",
@@ -0,0 +1,130 @@
+"""Fixtures shared by the unit tests: the anyio backend, a git runner, and a stand-in svn client
+with a working copy it serves."""
+import os
+import sys
+import subprocess
+import pytest
+
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools import svn
+
+
+@pytest.fixture
+def anyio_backend():
+    # The tools run subprocesses through asyncio.to_thread
+    return "asyncio"
+
+
+@pytest.fixture
+def git():
+    """
+    `git(repo, *args, date=None, name=..., email=...)` runs git in `repo` as the given identity and
+    returns its stdout. `date` (ISO 8601) sets both the author and the committer date.
+    """
+    def run(repo, *args, date=None, name="张三", email="dev@studio.cn"):
+        env = None
+        if date:
+            env = {**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date}
+        return subprocess.run(
+            ["git", "-c", f"user.email={email}", "-c", f"user.name={name}", *args],
+            cwd=repo, check=True, capture_output=True, env=env,
+        ).stdout.decode("utf-8")
+    return run
+
+# Stand-in for the svn client: `svn log --xml` over FAKE_SVN_HEAD (500) revisions, where every
+# 100th is by lisi. Implements -l, -r A:B (either direction), -v and --search/--search-and (like
+# svn 1.8+, -l counts the entries searched, not the matches), and `svn info` for a working copy at
+# FAKE_SVN_WC. With FAKE_SVN_BRANCH=<rev>, that revision copies /trunk to /branches/b, which the
+# later revisions and the working copy are on.
+FAKE_SVN = r'''
+import os, sys, fnmatch
+from xml.sax.saxutils import escape
+args = sys.argv[1:]
+with open(os.environ["FAKE_SVN_CALLS"], "a") as f:
+    f.write(" ".join(args) + "\n")
+head = int(os.environ.get("FAKE_SVN_HEAD", "500"))
+branch = int(os.environ.get("FAKE_SVN_BRANCH", "0"))
+if args[0] == "info":
+    wc = os.environ.get("FAKE_SVN_WC")
+    target = os.path.abspath(args[-1])
+    if not wc or not target.startswith(wc):
+        sys.stderr.write("svn: E155007: not a working copy\n")
+        sys.exit(1)
+    rel = os.path.relpath(target, wc).replace(os.sep, "/")
+    rel = "" if rel == "." else "/" + rel
+    sys.stdout.write(
+        f'<info><entry kind="dir" path="{target}" revision="{os.environ.get("FAKE_SVN_WC_REV", head)}">'
+        f'<relative-url>^/{"branches/b" if branch else "trunk"}{rel}</relative-url><repository><root>file:///repo</root></repository>'
+        f'<wc-info><wcroot-abspath>{wc}</wcroot-abspath></wc-info></entry></info>'
+    )
+    sys.exit(0)
+if os.environ.get("FAKE_SVN_OLD") and any(a.startswith("--search") for a in args):
+    sys.stderr.write("svn: invalid option: --search\n")
+    sys.exit(1)
+limit, first, last, verbose, any_of, all_of = 0, head, 1, False, [], []
+i = 1
+while i < len(args):
+    a = args[i]
+    if a == "-l":
+        limit = int(args[i + 1]); i += 1
+    elif a == "-r":
+        first, last = (head if r == "HEAD" else int(r) for r in args[i + 1].split(":")); i += 1
+    elif a == "-v":
+        verbose = True
+    elif a == "--search":
+        any_of.append(args[i + 1]); i += 1
+    elif a == "--search-and":
+        all_of.append(args[i + 1]); i += 1
+    i += 1
+if first > head:
+    sys.stderr.write("svn: E160006: No such revision\n")
+    sys.exit(1)
+out = ['<?xml version="1.0" encoding="UTF-8"?>', "<log>"]
+examined = 0
+for rev in range(first, last - 1, -1) if first >= last else range(first, last + 1):
+    if limit and examined >= limit:
+        break
+    examined += 1
+    author = "lisi" if rev % 100 == 0 else "zhangsan"
+    msg = "fix for lisi" if rev == 450 else f"change {rev}"
+    path = f"/{'branches/b' if branch and rev > branch else 'trunk'}/Assets/File{rev % 7}.cs"
+    change = f'<path action="M" kind="file">{path}</path>'
+    if rev == branch:
+        path = "/branches/b"
+        change = f'<path action="A" kind="dir" copyfrom-path="/trunk" copyfrom-rev="{rev - 1}">{path}</path>'
+    fields = [author, msg, path]
+    match = lambda p: any(fnmatch.fnmatchcase(x.lower(), f"*{p.lower()}*") for x in fields)
+    if any_of and not any(match(p) for p in any_of):
+        continue
+    if all_of and not all(match(p) for p in all_of):
+        continue
+    paths = f"<paths>{change}</paths>" if verbose else ""
+    out.append(f'<logentry revision="{rev}"><author>{author}</author><date>2026-01-01T00:00:00.000000Z</date>{paths}<msg>{escape(msg)}</msg></logentry>')
+out.append("</log>")
+sys.stdout.write("\n".join(out))
+'''
+
+
+@pytest.fixture
+def fake_svn(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "svn"
+    script.write_text(f"#!{sys.executable}\n{FAKE_SVN}", encoding="utf-8")
+    script.chmod(0o755)
+    calls = tmp_path / "calls.txt"
+    calls.write_text("")
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_SVN_CALLS", str(calls))
+    monkeypatch.setenv("PROJECT_ROOT", str(tmp_path))
+    monkeypatch.setattr(svn, "_search_supported", None)
+    return lambda: [c for c in calls.read_text().splitlines() if c.startswith("log")]
+
+
+@pytest.fixture
+def working_copy(tmp_path, fake_svn, monkeypatch):
+    wc = tmp_path / "wc"
+    (wc / "Assets").mkdir(parents=True)
+    (wc / "Assets" / "File3.cs").write_text("class File3 {}\n", encoding="utf-8")
+    monkeypatch.setenv("FAKE_SVN_WC", str(wc))
+    monkeypatch.setenv("FAKE_SVN_HEAD", "300")
+    return wc
@@ -0,0 +1,90 @@
+import pytest
+
+from bug_sleuth.indexer.asset_index import AssetIndex, scan_asset_file, unreal_package_name
+from bug_sleuth.indexer.vcs import list_repo_files
+
+TEX_GUID = "0" * 31 + "1"
+MAT_GUID = "0" * 31 + "2"
+PREFAB_GUID = "0" * 31 + "3"
+BUILTIN_GUID = "0000000000000000f000000000000000"
+
+
+def _meta(guid):
+    return f"fileFormatVersion: 2\nguid: {guid}\nTextureImporter:\n"
+
+
+@pytest.fixture
+def unity_repo(tmp_path):
+    """A minimal text-serialized Unity project: texture <- material <- prefab <- scene."""
+    assets = tmp_path / "Assets"
+    (assets / "Textures").mkdir(parents=True)
+    (assets / "Textures" / "T_Hero.png").write_bytes(b"\x89PNG")
+    (assets / "Textures" / "T_Hero.png.meta").write_text(_meta(TEX_GUID), encoding="utf-8")
+    (assets / "Hero.mat").write_text(
+        f"%YAML 1.1\n--- !u!21 &2100000\nMaterial:\n  m_Shader: {{fileID: 46, guid: {BUILTIN_GUID}, type: 0}}\n"
+        f"  m_Texture: {{fileID: 2800000, guid: {TEX_GUID}, type: 3}}\n",
+        encoding="utf-8",
+    )
+    (assets / "Hero.mat.meta").write_text(_meta(MAT_GUID), encoding="utf-8")
+    (assets / "Hero.prefab").write_text(
+        f"%YAML 1.1\n--- !u!23 &1\nMeshRenderer:\n  m_Materials:\n  - {{fileID: 2100000, guid: {MAT_GUID}, type: 2}}\n",
+        encoding="utf-8",
+    )
+    (assets / "Hero.prefab.meta").write_text(_meta(PREFAB_GUID), encoding="utf-8")
+    (assets / "Main.unity").write_text(
+        f"%YAML 1.1\n--- !u!1001 &5\nPrefabInstance:\n  m_SourcePrefab: {{fileID: 100100000, guid: {PREFAB_GUID}, type: 3}}\n",
+        encoding="utf-8",
+    )
+    return tmp_path
+
+
+def test_unreal_package_names():
+    assert unreal_package_name("Game/Content/Characters/Hero/T_Hero_D.uasset") == "/Game/Characters/Hero/T_Hero_D"
+    assert unreal_package_name("Game/Plugins/FX/Content/P_Fire.uasset") == "/FX/P_Fire"
+    assert unreal_package_name("Tools/Thing.uasset") is None
+
+    data = b"\0\0/Game/Characters/Hero/M_Hero\0/Game/Characters/Hero/T_Hero_D.T_Hero_D\0/Script/Engine\0"
+    assets, refs = scan_asset_file("Game/Content/Characters/Hero/T_Hero_D.uasset", data)
+    assert assets == [("/Game/Characters/Hero/T_Hero_D", "Game/Content/Characters/Hero/T_Hero_D.uasset")]
+    # Own package and engine script packages are not dependencies
+    assert refs == {"/Game/Characters/Hero/M_Hero"}
+
+
+def test_binary_unity_assets_are_skipped():
+    assert scan_asset_file("Assets/Hero.prefab", b"\0\0\0\x16binary") == ([], set())
+
+
+def test_dependents_and_dependencies(unity_repo):
+    index = AssetIndex(str(unity_repo))
+    stats = index.rebuild(list_repo_files(str(unity_repo)))
+
+    assert stats["assets"] == 3
+    assert index.resolve("T_Hero.png") == [(TEX_GUID, "Assets/Textures/T_Hero.png")]
+    assert index.resolve(str(unity_repo / "Assets" / "Hero.prefab")) == [(PREFAB_GUID, "Assets/Hero.prefab")]
+    assert index.resolve(TEX_GUID.upper()) == [(TEX_GUID, "Assets/Textures/T_Hero.png")]
+    # A scene has no .meta here, but it is still found as a referencing file
+    assert index.resolve("Main.unity") == [(None, "Assets/Main.unity")]
+
+    assert index.dependents(TEX_GUID) == [("Assets/Hero.mat", MAT_GUID)]
+    assert index.dependents(PREFAB_GUID) == [("Assets/Main.unity", None)]
+    # Built-in resources stay unresolved
+    assert index.dependencies("Assets/Hero.mat") == [(TEX_GUID, "Assets/Textures/T_Hero.png"), (BUILTIN_GUID, None)]
+
+
+def test_update_rescans_changed_files(unity_repo):
+    index = AssetIndex(str(unity_repo))
+    index.rebuild(list_repo_files(str(unity_repo)))
+
+    (unity_repo / "Assets" / "Hero.prefab").write_text("%YAML 1.1\n--- !u!1 &1\nGameObject: {}\n", encoding="utf-8")
+    (unity_repo / "Assets" / "Textures" / "T_Hero.png.meta").unlink()
+    index.update(["Assets/Hero.prefab", "Assets/Textures/T_Hero.png.meta"])
+
+    assert index.dependents(MAT_GUID) == []
+    assert index.resolve(TEX_GUID) == []
+
+
+def test_repository_without_assets_gets_no_index(tmp_path):
+    (tmp_path / "main.py").write_text("print(1)\n", encoding="utf-8")
+    index = AssetIndex(str(tmp_path))
+    assert index.rebuild(list_repo_files(str(tmp_path))) is None
+    assert not index.exists()
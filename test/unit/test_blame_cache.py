@@ -0,0 +1,108 @@
+import io
+import os
+import subprocess
+import sys
+import types
+import pytest
+
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools import blame_cache
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.blame_cache import BlameLine, format_svn_blame, iter_svn_blame_xml
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.git import get_git_blame_tool
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+DATE = "2026-01-01T10:00:00+08:00"
+
+
+@pytest.fixture
+def repo(tmp_path, git):
+    blame_cache._cache.clear()
+    git(tmp_path, "init", "-q")
+    (tmp_path / "Hero.cs").write_text("class Hero\n{\n}\n", encoding="utf-8")
+    git(tmp_path, "add", "Hero.cs")
+    git(tmp_path, "commit", "-qm", "Add hero", date=DATE)
+    (tmp_path / "Hero.cs").write_text("class Hero\n{\n    int hp;\n}\n", encoding="utf-8")
+    git(tmp_path, "commit", "-qam", "Add hp", date=DATE, name="Li Si")
+    return tmp_path
+
+
+@pytest.mark.anyio
+async def test_git_blame_is_cached_per_file(repo, monkeypatch):
+    context = types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(repo)}]})
+    hero = str(repo / "Hero.cs")
+
+    result = await get_git_blame_tool(path=hero, start_line=2, end_line=3, tool_context=context)
+    assert result["status"] == "success"
+    lines = result["output"].splitlines()
+    assert len(lines) == 2
+    assert "(张三    2026-01-01 10:00:00 +0800 2) {" in lines[0]
+    assert "(Li Si 2026-01-01 10:00:00 +0800 3)     int hp;" in lines[1]
+
+    # Other ranges of the same file come from the cache
+    calls = []
+    real_run = subprocess.run
+    monkeypatch.setattr(subprocess, "run", lambda *a, **kw: calls.append(a) or real_run(*a, **kw))
+    result = await get_git_blame_tool(path=hero, start_line=1, end_line=100, tool_context=context)
+    assert len(result["output"].splitlines()) == 4 and calls == []
+
+    # A local edit invalidates the entry
+    (repo / "Hero.cs").write_text("class Hero\n{\n    int hp;\n    int mp;\n}\n", encoding="utf-8")
+    result = await get_git_blame_tool(path=hero, start_line=4, end_line=4, tool_context=context)
+    assert "Not Committed Yet" in result["output"] and len(calls) == 1
+
+    past_end = await get_git_blame_tool(path=hero, start_line=50, end_line=60, tool_context=context)
+    assert past_end["status"] == "error"
+
+
+def test_svn_blame_xml_is_parsed_while_streaming():
+    xml = b"""<?xml version="1.0" encoding="UTF-8"?>
+<blame>
+<target path="Hero.cs">
+<entry line-number="1"><commit revision="12"><author>zhangsan</author><date>2026-01-01T02:00:00.000000Z</date></commit></entry>
+<entry line-number="2"><commit revision="15"><author>lisi</author><date>2026-01-02T02:00:00.000000Z</date></commit></entry>
+<entry line-number="3"></entry>
+</target>
+</blame>
+"""
+    entries = list(iter_svn_blame_xml(io.BytesIO(xml)))
+    assert entries == [
+        (1, "12", "zhangsan", "2026-01-01T02:00:00.000000Z"),
+        (2, "15", "lisi", "2026-01-02T02:00:00.000000Z"),
+        (3, "", "", ""),
+    ]
+
+    lines = [BlameLine("12", "zhangsan", "", "class Hero"), BlameLine("15", "lisi", "", "{"), BlameLine("", "", "", "}")]
+    assert format_svn_blame(lines, 2, 10) == "    15       lisi {\n     -          - }"
+
+
+# Stand-in for `svn cat` / `svn blame --xml` of a three-line file with CRLF endings and a form feed
+# inside a line; blame writes more to stderr than a pipe buffer holds before any output.
+FAKE_SVN_BLAME = r'''
+import sys
+if sys.argv[1] == "cat":
+    sys.stdout.buffer.write(b"class Hero\r\n{ // page\x0cbreak\r\n}\r\n")
+    sys.exit(0)
+sys.stderr.write("svn: warning: W170013: Unable to connect\n" * 20000)
+sys.stderr.flush()
+sys.stdout.write("<blame><target>" + "".join(
+    f'<entry line-number="{n}"><commit revision="{n + 10}"><author>zhangsan</author>'
+    f'<date>2026-01-01T02:00:00.000000Z</date></commit></entry>' for n in (1, 2, 3)
+) + "</target></blame>")
+'''
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Fake svn client is a shebang script")
+def test_svn_blame_pairs_lines_like_svn(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "svn"
+    script.write_text(f"#!{sys.executable}\n{FAKE_SVN_BLAME}", encoding="utf-8")
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    lines = blame_cache._svn_blame_sync(str(tmp_path / "Hero.cs"), "13")
+
+    assert [(line.revision, line.text) for line in lines] == [
+        ("11", "class Hero"),
+        ("12", "{ // page\x0cbreak"),
+        ("13", "}"),
+    ]
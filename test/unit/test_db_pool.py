@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import pytest
+
+from bug_sleuth.indexer.db_pool import ReadOnlyConnectionPool
+
+
+def _make_db(path, value):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS t (v TEXT)")
+    conn.execute("DELETE FROM t")
+    conn.execute("INSERT INTO t VALUES (?)", (value,))
+    conn.commit()
+    conn.close()
+
+
+def test_connections_are_reused_and_read_only(tmp_path):
+    db = str(tmp_path / "a.db")
+    _make_db(db, "one")
+    pool = ReadOnlyConnectionPool()
+
+    with pool.connection(db) as first:
+        assert first.execute("SELECT v FROM t").fetchone() == ("one",)
+        with pytest.raises(sqlite3.OperationalError):
+            first.execute("INSERT INTO t VALUES ('x')")
+    with pool.connection(db) as second:
+        assert second is first
+    pool.close_all()
+
+
+def test_pool_reopens_after_database_changes(tmp_path):
+    db = str(tmp_path / "a.db")
+    _make_db(db, "one")
+    pool = ReadOnlyConnectionPool()
+    with pool.connection(db) as first:
+        pass
+
+    _make_db(db, "two-and-longer")
+    os.utime(db, ns=(0, os.stat(db).st_mtime_ns + 1_000_000))
+    with pool.connection(db) as second:
+        assert second is not first
+        assert second.execute("SELECT v FROM t").fetchone() == ("two-and-longer",)
+    pool.close_all()
+
+
+def test_missing_database_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        with ReadOnlyConnectionPool().connection(str(tmp_path / "missing.db")):
+            pass
+
+
+def test_reads_respect_an_in_place_writer(tmp_path):
+    db = str(tmp_path / "a.db")
+    _make_db(db, "one")
+    pool = ReadOnlyConnectionPool()
+    writer = sqlite3.connect(db)
+    writer.execute("BEGIN EXCLUSIVE")
+    writer.execute("UPDATE t SET v = 'two'")
+
+    # `bug-sleuth index` rewriting the database: readers must not see its pages mid-write
+    with pool.connection(db) as conn:
+        conn.execute("PRAGMA busy_timeout = 0")
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            conn.execute("SELECT v FROM t").fetchone()
+    writer.commit()
+    writer.close()
+    with pool.connection(db) as conn:
+        assert conn.execute("SELECT v FROM t").fetchone() == ("two",)
+    pool.close_all()
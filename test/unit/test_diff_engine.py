@@ -0,0 +1,132 @@
+import types
+import pytest
+
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.diff_engine import classify, parse_unified_diff, render_diff
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.git import get_git_diff_tool
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+SVN_DIFF = """Index: Assets/Scripts/Hero.cs
+===================================================================
+--- Assets/Scripts/Hero.cs\t(revision 11)
++++ Assets/Scripts/Hero.cs\t(revision 12)
+@@ -1,3 +1,4 @@
+ class Hero
+ {
++    int hp;
+ }
+@@ -10,2 +11,2 @@
+-    void Run() {}
++        void Run() {}
+Index: Assets/Art/icon.png
+===================================================================
+Cannot display: file marked as a binary type.
+svn:mime-type = application/octet-stream
+Index: Assets/Scripts/Skill.cs
+===================================================================
+--- Assets/Scripts/Skill.cs\t(nonexistent)
++++ Assets/Scripts/Skill.cs\t(revision 12)
+@@ -0,0 +1,2 @@
++class Skill
++{ }
+
+Property changes on: Assets/Scripts/Skill.cs
+___________________________________________________________________
+Added: svn:eol-style
+## -0,0 +1 ##
++native
+"""
+
+
+def test_svn_diff_is_split_per_file():
+    diffs = {d.path: d for d in parse_unified_diff(SVN_DIFF.splitlines())}
+
+    hero = diffs["Assets/Scripts/Hero.cs"]
+    assert (hero.added, hero.deleted) == (2, 1)
+    assert [(h.new_start, h.new_count, h.whitespace_only) for h in hero.hunks] == [(1, 4, False), (11, 2, True)]
+    assert diffs["Assets/Art/icon.png"].binary
+    # The property section is not part of Skill.cs's text diff
+    assert diffs["Assets/Scripts/Skill.cs"].hunks[0].text.splitlines()[-1] == "+{ }"
+
+    rendered = render_diff(list(diffs.values()))
+    files = {f["path"]: f for f in rendered["files"]}
+    assert files["Assets/Scripts/Hero.cs"]["hunks"] == ["1-4", "11-12"]
+    assert files["Assets/Scripts/Hero.cs"]["whitespace_only_hunks"] == 1
+    assert files["Assets/Art/icon.png"]["note"] == "binary file"
+    assert "+    int hp;" in rendered["diff"] and "void Run" not in rendered["diff"]
+
+
+def _whitespace_flags(path, body):
+    diff = f"Index: {path}\n--- {path}\n+++ {path}\n@@ -1,2 +1,2 @@\n{body}"
+    return [h.whitespace_only for h in parse_unified_diff(diff.splitlines())[0].hunks]
+
+
+def test_whitespace_only_hunks():
+    assert _whitespace_flags("Hero.cs", "-int  hp = 1;\n-\n+int hp =  1;\n") == [True]
+    # Reordered lines are a real change
+    assert _whitespace_flags("Hero.cs", "-a();\n-b();\n+b();\n+a();\n") == [False]
+    # Whitespace between tokens is collapsed, not removed
+    assert _whitespace_flags("Hero.cs", "-int hp;\n+inthp;\n") == [False]
+    # Indentation is syntax in Python and YAML
+    assert _whitespace_flags("hero.py", "-        return hp\n+    return hp\n") == [False]
+    assert _whitespace_flags("hero.yaml", "-  hp: 1\n+hp: 1\n") == [False]
+    assert _whitespace_flags("Hero.cs", "-        return hp;\n+    return hp;\n") == [True]
+
+
+def test_classify():
+    assert classify("Assets/Scripts/Hero.cs") == "source"
+    assert classify("Assets/Scripts/Hero.Designer.cs") == "generated"
+    assert classify("Assets/Prefabs/Hero.prefab") == "generated"
+    assert classify("Proto/gen/Msg.cs") == "generated"
+    assert classify("Config/hero.json") == "text"
+    assert classify("Assets/icon.png", binary=True) == "binary"
+
+
+@pytest.mark.anyio
+async def test_large_generated_file_does_not_hide_source_changes(tmp_path, git):
+    git(tmp_path, "init", "-q")
+    scripts = tmp_path / "Assets" / "Scripts"
+    scripts.mkdir(parents=True)
+    (scripts / "Hero.cs").write_text("class Hero\n{\n}\n", encoding="utf-8")
+    (tmp_path / "Assets" / "Hero.prefab").write_text("", encoding="utf-8")
+    git(tmp_path, "add", "-A")
+    git(tmp_path, "commit", "-qm", "Add hero")
+
+    # Sorted first by path, the prefab alone used to fill the 10k characters
+    (tmp_path / "Assets" / "Hero.prefab").write_text("".join(f"  m_Value{i}: {i}\n" for i in range(3000)), encoding="utf-8")
+    (scripts / "Hero.cs").write_text("class Hero\n{\n    int hp;\n}\n", encoding="utf-8")
+    git(tmp_path, "commit", "-qam", "Give hero hp")
+
+    context = types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(tmp_path)}]})
+    result = await get_git_diff_tool(target="HEAD", tool_context=context)
+
+    assert result["status"] == "success"
+    assert "Give hero hp" in result["commit"]
+    files = {f["path"]: f for f in result["files"]}
+    assert files["Assets/Scripts/Hero.cs"] == {
+        "path": "Assets/Scripts/Hero.cs", "kind": "source", "added": 1, "deleted": 0, "hunks": ["1-4"],
+    }
+    assert files["Assets/Hero.prefab"]["added"] == 3000 and "over budget" in files["Assets/Hero.prefab"]["note"]
+    assert "+    int hp;" in result["diff"] and "m_Value" not in result["diff"]
+
+    # Asked for alone, the generated file's hunks are shown up to the budget
+    alone = await get_git_diff_tool(target="HEAD", path=str(tmp_path / "Assets" / "Hero.prefab"), tool_context=context)
+    assert [f["path"] for f in alone["files"]] == ["Assets/Hero.prefab"]
+    assert "+  m_Value0: 0" in alone["diff"] and len(alone["diff"]) <= 10000
+
+
+@pytest.mark.anyio
+async def test_form_feed_in_changed_line_stays_one_line(tmp_path, git):
+    git(tmp_path, "init", "-q")
+    (tmp_path / "Hero.cs").write_text("class Hero\n{\n}\n", encoding="utf-8")
+    git(tmp_path, "add", "-A")
+    git(tmp_path, "commit", "-qm", "Add hero")
+    (tmp_path / "Hero.cs").write_text("class Hero\n{\n    // page\x0cbreak\u2028here\n}\n", encoding="utf-8")
+    git(tmp_path, "commit", "-qam", "Comment")
+
+    context = types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(tmp_path)}]})
+    result = await get_git_diff_tool(target="HEAD", tool_context=context)
+
+    assert result["files"] == [
+        {"path": "Hero.cs", "kind": "source", "added": 1, "deleted": 0, "hunks": ["1-4"]},
+    ]
+    assert "+    // page\x0cbreak\u2028here" in result["diff"]
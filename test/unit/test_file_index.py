@@ -0,0 +1,83 @@
+import os
+import pytest
+
+from bug_sleuth.indexer import file_index
+from bug_sleuth.indexer.file_index import FileNameIndex, glob_to_regex
+
+
+@pytest.fixture
+def asset_repo(tmp_path):
+    """A plain (non-git) directory with a few assets."""
+    (tmp_path / "Prefabs" / "Weapons").mkdir(parents=True)
+    (tmp_path / "Prefabs" / "Weapons" / "AK47.prefab").write_text("x", encoding="utf-8")
+    (tmp_path / "Prefabs" / "Weapons" / "AK47.prefab.meta").write_text("x", encoding="utf-8")
+    (tmp_path / "Textures").mkdir()
+    (tmp_path / "Textures" / "T_AK47_D.png").write_bytes(b"\x89PNG")
+    (tmp_path / "Textures" / "T_Hero.png").write_bytes(b"\x89PNG")
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / ".hidden" / "AK47.prefab").write_text("x", encoding="utf-8")
+    return tmp_path
+
+
+def _matches(pattern, names):
+    regex, full_path = glob_to_regex(pattern)
+    return [n for n in names if regex.search(n.lower())]
+
+
+def test_glob_to_regex():
+    names = ["a/b/AK47.prefab", "a/T_AK47_D.png", "a/b/c/Hero.uasset"]
+    basenames = [n.rsplit("/", 1)[-1] for n in names]
+
+    assert _matches("*ak47*", basenames) == ["AK47.prefab", "T_AK47_D.png"]
+    assert _matches("*.{png,uasset}", basenames) == ["T_AK47_D.png", "Hero.uasset"]
+    assert _matches("[!t]*", basenames) == ["AK47.prefab", "Hero.uasset"]
+    assert _matches("?ero.*", basenames) == ["Hero.uasset"]
+    # Patterns with '/' match the whole path; '*' stays within one directory, '**' spans them
+    assert glob_to_regex("a/*.png")[1] is True
+    assert _matches("a/*.png", names) == ["a/T_AK47_D.png"]
+    assert _matches("a/**/*.uasset", names) == ["a/b/c/Hero.uasset"]
+    assert _matches("**/ak47.prefab", names) == ["a/b/AK47.prefab"]
+
+
+def test_missing_index_returns_none(asset_repo):
+    assert FileNameIndex(str(asset_repo)).find("*AK47*") is None
+
+
+def test_find_matches_basenames_case_insensitively(asset_repo):
+    index = FileNameIndex(str(asset_repo))
+    stats = index.build()
+
+    assert stats["files"] == 4
+    assert index.find("*ak47*") == ["Prefabs/Weapons/AK47.prefab", "Prefabs/Weapons/AK47.prefab.meta", "Textures/T_AK47_D.png"]
+    assert index.find("*.png") == ["Textures/T_AK47_D.png", "Textures/T_Hero.png"]
+    assert index.find("Textures/*Hero*") == ["Textures/T_Hero.png"]
+    assert index.find("*NotThere*") == []
+
+
+def test_refresh_picks_up_added_and_removed_files(asset_repo, monkeypatch):
+    index = FileNameIndex(str(asset_repo))
+    index.build()
+    assert index.find("*.png") == ["Textures/T_AK47_D.png", "Textures/T_Hero.png"]
+
+    monkeypatch.setattr(file_index, "REFRESH_INTERVAL", 0)
+    os.remove(asset_repo / "Textures" / "T_Hero.png")
+    (asset_repo / "Textures" / "UI" / "Icons").mkdir(parents=True)
+    (asset_repo / "Textures" / "UI" / "Icons" / "Coin.png").write_bytes(b"\x89PNG")
+    # Make the mtime change visible even on filesystems with coarse timestamps
+    os.utime(asset_repo / "Textures", ns=(0, 0))
+
+    assert index.find("*.png") == ["Textures/T_AK47_D.png", "Textures/UI/Icons/Coin.png"]
+
+
+def test_update_applies_vcs_changes_and_persists(asset_repo):
+    index = FileNameIndex(str(asset_repo))
+    index.build("r1")
+
+    (asset_repo / "Textures" / "T_New.png").write_bytes(b"\x89PNG")
+    os.remove(asset_repo / "Prefabs" / "Weapons" / "AK47.prefab.meta")
+    stats = index.update(["Textures/T_New.png", "Prefabs/Weapons/AK47.prefab.meta"], "r2")
+
+    assert stats["files"] == 4
+    # A new FileNameIndex reloads the rewritten database
+    assert FileNameIndex(str(asset_repo)).find("*.png") == ["Textures/T_AK47_D.png", "Textures/T_Hero.png", "Textures/T_New.png"]
+    assert FileNameIndex(str(asset_repo)).find("*.meta") == []
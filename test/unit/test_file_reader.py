@@ -0,0 +1,212 @@
+import os
+import subprocess
+import types
+import pytest
+
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools import dir_listing
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.code_outline import build_outline
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.file_reader import (
+    merge_line_ranges,
+    read_code_tool,
+    read_file_ranges_tool,
+    read_file_tool,
+)
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.line_index import build_line_offsets, read_line_range
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.text_encoding import decode_text, sniff_encoding
+from bug_sleuth.indexer.parsers import extract_symbols
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+
+def _context(repo):
+    return types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(repo)}]})
+
+
+def test_line_offsets():
+    assert list(build_line_offsets(b"")) == []
+    assert list(build_line_offsets(b"a\nbb\nc")) == [0, 2, 5]
+    # A trailing newline does not start another line
+    assert list(build_line_offsets(b"a\nbb\n")) == [0, 2]
+    assert list(build_line_offsets(b"\n\n")) == [0, 1]
+
+
+def test_read_line_range(tmp_path):
+    path = tmp_path / "Log.txt"
+    path.write_bytes(b"one\r\ntwo\r\nthree\r\nfour\r\n")
+
+    assert read_line_range(str(path), 2, 3) == (b"two\r\nthree", 2, 3, 4)
+    assert read_line_range(str(path), 3, None) == (b"three\r\nfour", 3, 4, 4)
+    assert read_line_range(str(path), 3, 100).last == 4
+    assert read_line_range(str(path), 9, None).last < 9
+
+    # The cached offsets are rebuilt once the file changes
+    path.write_bytes(b"only line")
+    os.utime(path, ns=(0, 0))
+    assert read_line_range(str(path)) == (b"only line", 1, 1, 1)
+
+
+@pytest.mark.anyio
+async def test_read_file_tool_reads_only_the_range(tmp_path):
+    path = tmp_path / "Generated.cs"
+    path.write_text("".join(f"// line {i}\n" for i in range(1, 10001)), encoding="utf-8")
+
+    result = await read_file_tool(path=str(path), tool_context=_context(tmp_path), start_line=15, end_line=17)
+
+    assert result["status"] == "success"
+    assert result["output"] == f"File: {path}\n    15\t// line 15\n    16\t// line 16\n    17\t// line 17"
+    assert result["summary"] == f"Read 3 lines from {path} (lines 15-17)"
+
+    whole = await read_file_tool(path=str(path), tool_context=_context(tmp_path))
+    assert whole["summary"] == f"Read 10000 lines from {path} (lines 1-10000)"
+
+    bad = await read_file_tool(path=str(path), tool_context=_context(tmp_path), start_line=20, end_line=10)
+    assert bad["status"] == "error"
+
+
+def test_sniff_encoding():
+    assert sniff_encoding("配置表".encode("utf-8")) == "utf-8"
+    assert sniff_encoding("ID\t名称\n1001\t火焰剑\n".encode("gbk"), complete=True) == "gb18030"
+    assert sniff_encoding("ID\tName\n".encode("utf-16")) == "utf-16"
+    assert sniff_encoding("ID\tName\n".encode("utf-16-le")) == "utf-16-le"
+    assert sniff_encoding(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR") is None
+    # A multi-byte character cut off at the end of the sniffed head is not an error
+    assert sniff_encoding("名称".encode("utf-8")[:-1]) == "utf-8"
+
+
+@pytest.mark.anyio
+async def test_read_tools_decode_gbk_and_utf16(tmp_path):
+    gbk = tmp_path / "Item.txt"
+    gbk.write_bytes("ID\t名称\r\n1001\t火焰剑\r\n1002\t寒冰剑\r\n".encode("gbk"))
+    result = await read_file_tool(path=str(gbk), tool_context=_context(tmp_path), start_line=2, end_line=3)
+    assert result["output"] == f"File: {gbk}\n     2\t1001\t火焰剑\n     3\t1002\t寒冰剑"
+    assert "[encoding: gb18030]" in result["summary"]
+
+    # '上' is 0x0A 0x4E in UTF-16-LE: the raw byte is not a line break
+    wide = tmp_path / "Quest.txt"
+    wide.write_bytes("ID\t描述\r\n1\t上山\r\n".encode("utf-16"))
+    result = await read_file_tool(path=str(wide), tool_context=_context(tmp_path), start_line=2)
+    assert result["output"] == f"File: {wide}\n     2\t1\t上山"
+    assert result["summary"] == f"Read 1 lines from {wide} (lines 2-2) [encoding: utf-16]"
+
+    code = await read_code_tool(path=str(wide), tool_context=_context(tmp_path))
+    assert code["status"] == "success"
+    assert "   1 | ID\t描述" in code["output"]
+
+    binary = tmp_path / "icon.png"
+    binary.write_bytes(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR")
+    assert (await read_file_tool(path=str(binary), tool_context=_context(tmp_path)))["status"] == "error"
+
+
+def test_invalid_bytes_are_replaced():
+    text, lossy = decode_text(b"ok \xff\xfe\xfd", "utf-8")
+    assert lossy and text.startswith("ok ")
+
+
+def _manager_source(methods):
+    body = "".join(
+        f"    [Obsolete]\n    public void Handle{i}(int id)\n    {{\n" + "        Log(id);\n" * 40 + "    }\n\n"
+        for i in range(methods)
+    )
+    return f"using System;\n\npublic class BattleManager : Manager\n{{\n    private int _round;\n\n{body}}}\n"
+
+
+@pytest.mark.anyio
+async def test_read_code_tool_outlines_large_files(tmp_path):
+    path = tmp_path / "BattleManager.cs"
+    path.write_text(_manager_source(200), encoding="utf-8")
+
+    result = await read_code_tool(path=str(path), tool_context=_context(tmp_path))
+
+    assert result["status"] == "success"
+    lines = result["output"].split("\n")
+    assert "3-9007 class: public class BattleManager : Manager" in lines
+    # Attributes are skipped in favour of the declaration line
+    assert "  7-50 method: public void Handle0(int id)" in lines
+    assert result["summary"].startswith(f"Outline of {path}: 202 of 202 symbols")
+
+
+def test_outline_fits_token_budget():
+    source = _manager_source(50)
+    lines = source.split("\n")
+    symbols = extract_symbols("BattleManager.cs", source.encode("utf-8"))
+
+    outline, omitted = build_outline(symbols, lines, max_tokens=200)
+
+    assert sum(len(line) + 1 for line in outline) <= 200 * 4
+    # The class comes first, then as many methods as fit; the field is dropped before any method
+    assert outline[0].startswith("3-")
+    assert all("method" in line for line in outline[1:])
+    assert omitted == len(symbols) - len(outline)
+
+
+@pytest.mark.anyio
+async def test_directory_listing_skips_ignored_folders(tmp_path):
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    (tmp_path / ".gitignore").write_text("Library/\n*.log\n", encoding="utf-8")
+    (tmp_path / "Library" / "ArtifactDB").mkdir(parents=True)
+    (tmp_path / "Library" / "ArtifactDB" / "cache.bin").write_bytes(b"x" * 5000)
+    (tmp_path / "Assets" / "Scripts" / "Battle").mkdir(parents=True)
+    (tmp_path / "Assets" / "Scripts" / "Battle" / "BattleManager.cs").write_bytes(b"x" * 2048)
+    for i in range(dir_listing.MAX_ENTRIES_PER_DIR + 5):
+        (tmp_path / "Assets" / f"T_{i:03}.png").write_bytes(b"x" * 10)
+    (tmp_path / "Editor.log").write_text("noise", encoding="utf-8")
+
+    result = await read_file_tool(path=str(tmp_path), tool_context=_context(tmp_path))
+
+    assert result["status"] == "success"
+    output = result["output"]
+    assert "  Assets/  (56 files, 2.5 KB)" in output
+    assert "(ignored: Editor.log, Library/)" in output
+    assert "ArtifactDB" not in output
+    # Capped entries are counted, not dropped silently
+    assert "\n[Assets]\n  Scripts/  (1 files, 2.0 KB)\n  T_000.png  (10 B)" in output
+    assert "  ... 6 more files (60 B)" in output
+    # Totals cover the whole tree, not the last directory walked
+    assert result["summary"] == f"Listed {tmp_path}: 56 files in 3 directories, 2.5 KB in total"
+
+
+def test_merge_line_ranges():
+    assert merge_line_ranges([(50, 60), (1, 10), (8, 20), (21, 30)]) == [(1, 30), (50, 60)]
+    assert merge_line_ranges([(5, None), (1, 3), (40, 50)]) == [(1, 3), (5, None)]
+
+
+@pytest.mark.anyio
+async def test_read_file_ranges_tool(tmp_path):
+    a = tmp_path / "A.cs"
+    a.write_text("".join(f"a{i}\n" for i in range(1, 101)), encoding="utf-8")
+    b = tmp_path / "B.cs"
+    b.write_text("".join(f"b{i}\n" for i in range(1, 11)), encoding="utf-8")
+
+    result = await read_file_ranges_tool(
+        ranges=[
+            {"path": str(a), "start_line": 10, "end_line": 12},
+            {"path": "B.cs", "start_line": 2, "end_line": 3},
+            {"path": str(a), "start_line": 11, "end_line": 13},
+            {"path": "Missing.cs", "start_line": 1},
+            {"path": "/etc/passwd"},
+        ],
+        tool_context=_context(tmp_path),
+    )
+
+    assert result["status"] == "success"
+    blocks = result["output"].split("\n\n")
+    assert blocks[0] == f"File: {a} (lines 10-13)\n    10\ta10\n    11\ta11\n    12\ta12\n    13\ta13"
+    assert blocks[1] == f"File: {b} (lines 2-3)\n     2\tb2\n     3\tb3"
+    assert "Access Denied" in blocks[2] and "Missing.cs" in blocks[2]
+    assert result["summary"] == "Read 6 lines in 2 ranges from 2 files (overlapping ranges merged)"
+
+
+@pytest.mark.anyio
+async def test_read_file_ranges_tool_respects_char_budget(tmp_path):
+    a = tmp_path / "A.cs"
+    a.write_text("".join(f"line {i}\n" for i in range(1, 1001)), encoding="utf-8")
+
+    result = await read_file_ranges_tool(
+        ranges=[{"path": str(a), "start_line": 1, "end_line": 500}, {"path": str(a), "start_line": 900}],
+        tool_context=_context(tmp_path),
+        max_chars=200,
+    )
+
+    assert len(result["output"].split("\n\nNot read")[0]) <= 300
+    assert f"  {a}:" in result["output"]
+    assert f"  {a}:900-1000" in result["output"]
+    assert "2 ranges not read" in result["summary"]
@@ -0,0 +1,77 @@
+import asyncio
+import types
+import pytest
+
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.git import get_git_blame_tool, get_git_diff_tool, get_git_log_tool
+from bug_sleuth.shared_libraries.git_worker import GitWorker, get_git_worker
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+
+@pytest.fixture
+def repo(tmp_path, git):
+    git(tmp_path, "init", "-q")
+    (tmp_path / "Hero.cs").write_text("class Hero {}\n", encoding="utf-8")
+    git(tmp_path, "add", "Hero.cs")
+    git(tmp_path, "commit", "-qm", "Add hero", date="2026-01-01T10:00:00+08:00")
+    git(tmp_path, "checkout", "-qb", "feature")
+    (tmp_path / "Skill.cs").write_text("class Skill {}\n", encoding="utf-8")
+    git(tmp_path, "add", "Skill.cs")
+    git(tmp_path, "commit", "-qm", "Add skill\n\nLong description", date="2026-01-03T10:00:00+08:00")
+    git(tmp_path, "checkout", "-q", "-")
+    (tmp_path / "Hero.cs").write_text("class Hero { int hp; }\n", encoding="utf-8")
+    git(tmp_path, "commit", "-qam", "修复 hero hp", date="2026-01-02T10:00:00-05:00")
+    git(tmp_path, "merge", "-q", "--no-ff", "-m", "Merge feature", "feature", date="2026-01-04T10:00:00+08:00")
+    return tmp_path
+
+
+def _context(repo):
+    return types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(repo)}]})
+
+
+@pytest.mark.anyio
+async def test_log_matches_git_log(repo, git):
+    result = await get_git_log_tool(tool_context=_context(repo), limit=10)
+
+    expected = git(repo, "log", "-n", "10", "--pretty=format:%h|%an|%ad|%s").splitlines()
+    assert [f"{c['hash']}|{c['author']}|{c['date']}|{c['message']}" for c in result["commits"]] == expected
+
+
+@pytest.mark.anyio
+async def test_path_and_author_filters_use_git_log(repo):
+    result = await get_git_log_tool(path=str(repo / "Hero.cs"), tool_context=_context(repo), limit=10)
+    assert [c["message"] for c in result["commits"]] == ["修复 hero hp", "Add hero"]
+
+    result = await get_git_log_tool(tool_context=_context(repo), author="nobody")
+    assert result["commits"] == []
+
+
+@pytest.mark.anyio
+async def test_pipelined_requests_and_restart(repo):
+    worker = GitWorker(str(repo))
+    try:
+        names = ["HEAD", "HEAD~1", "HEAD:Hero.cs", "no-such-rev"] * 25
+        objects = await asyncio.gather(*(worker.read_object(n) for n in names))
+        assert [o.type if o else None for o in objects[:4]] == ["commit", "commit", "blob", None]
+        assert objects[2].data == b"class Hero { int hp; }\n"
+        assert objects == objects[:4] * 25
+
+        # A dead process is replaced on the next request
+        worker._batch._proc.kill()
+        worker._batch._proc.wait()
+        assert (await worker.read_object("HEAD:Hero.cs")).data == b"class Hero { int hp; }\n"
+    finally:
+        worker.close()
+
+    assert get_git_worker(str(repo / "Hero.cs")) is get_git_worker(str(repo))
+
+
+@pytest.mark.anyio
+async def test_diff_and_blame(repo):
+    bad = await get_git_diff_tool(target="--output=/tmp/x", tool_context=_context(repo))
+    assert bad["status"] == "error" and "Unknown revision" in bad["error"]
+
+    diff = await get_git_diff_tool(target="HEAD~1", base="HEAD~2", tool_context=_context(repo))
+    assert "+class Hero { int hp; }" in diff["diff"]
+
+    blame = await get_git_blame_tool(path=str(repo / "Hero.cs"), start_line=1, end_line=1, tool_context=_context(repo))
+    assert blame["status"] == "success" and "张三" in blame["output"]
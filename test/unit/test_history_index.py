@@ -0,0 +1,119 @@
+import os
+import types
+import pytest
+from datetime import datetime
+
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.git import get_git_log_tool
+from bug_sleuth.indexer.history_index import HistoryIndex
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+
+def _commit(repo, git, rel, text, message, date, **ident):
+    path = repo / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    git(repo, "add", rel)
+    git(repo, "commit", "-qm", message, date=date, **ident)
+
+
+@pytest.fixture
+def repo(tmp_path, git):
+    git(tmp_path, "init", "-q")
+    _commit(tmp_path, git, "Assets/Scripts/Hero.cs", "class Hero {}\n", "Add hero", "2026-01-01T10:00:00+08:00")
+    _commit(tmp_path, git, "Assets/Scripts/Skill.cs", "class Skill {}\n", "Add skill", "2026-01-02T10:00:00+08:00",
+            name="Li Si", email="lisi@studio.cn")
+    _commit(tmp_path, git, "Assets/Scripts2/Other.cs", "class Other {}\n", "Add other", "2026-01-03T10:00:00+08:00")
+    _commit(tmp_path, git, "Assets/Scripts/Hero.cs", "class Hero { int hp; }\n", "修复 hero hp", "2026-01-04T10:00:00+08:00")
+    return tmp_path
+
+
+def _messages(commits):
+    return [c.subject for c in commits]
+
+
+def test_build_and_query(repo):
+    index = HistoryIndex(str(repo))
+    stats = index.update()
+    assert stats["mode"] == "full" and stats["commits"] == 4
+
+    assert _messages(index.query(limit=10)) == ["修复 hero hp", "Add other", "Add skill", "Add hero"]
+    assert _messages(index.query("Assets/Scripts/Hero.cs", limit=10)) == ["修复 hero hp", "Add hero"]
+    # A directory matches its files, but not a sibling sharing its prefix
+    assert _messages(index.query("Assets/Scripts", limit=10)) == ["修复 hero hp", "Add skill", "Add hero"]
+    assert _messages(index.query(author="LISI", limit=10)) == ["Add skill"]
+    assert _messages(index.query(author="%", limit=10)) == []
+
+    since = int(datetime.fromisoformat("2026-01-02T00:00:00+08:00").timestamp())
+    until = int(datetime.fromisoformat("2026-01-03T12:00:00+08:00").timestamp())
+    assert _messages(index.query(since=since, until=until, limit=10)) == ["Add other", "Add skill"]
+
+
+def test_incremental_and_rewritten_history(repo, git):
+    index = HistoryIndex(str(repo))
+    index.update()
+
+    _commit(repo, git, "Assets/Scripts/Hero.cs", "class Hero { int mp; }\n", "Add mp", "2026-01-05T10:00:00+08:00")
+    assert index.refresh()
+    assert _messages(index.query("Assets/Scripts/Hero.cs", limit=1)) == ["Add mp"]
+
+    # HEAD no longer contains the indexed head: tools stop using the index until it is rebuilt
+    git(repo, "reset", "-q", "--hard", "HEAD~2")
+    assert not index.refresh()
+    stats = index.update()
+    assert stats["mode"] == "full" and stats["commits"] == 3
+    assert _messages(index.query(limit=10)) == ["Add other", "Add skill", "Add hero"]
+
+
+def test_branch_merged_after_refresh(repo, git):
+    git(repo, "checkout", "-q", "-b", "feature", "HEAD~2")
+    _commit(repo, git, "Assets/Scripts/Buff.cs", "class Buff {}\n", "Add buff", "2026-01-02T12:00:00+08:00")
+    git(repo, "checkout", "-q", "-")
+    index = HistoryIndex(str(repo))
+    index.update()
+
+    git(repo, "merge", "-q", "--no-ff", "-m", "Merge feature", "feature", date="2026-01-06T10:00:00+08:00")
+    assert index.refresh()
+    # The merged commit is appended last but is older than the mainline commits
+    expected = git(repo, "log", "--format=%s").splitlines()
+    assert _messages(index.query(limit=10)) == expected
+    assert expected[:4] == ["Merge feature", "修复 hero hp", "Add other", "Add buff"]
+
+
+def test_non_utf8_path(repo, git):
+    name = "角色.cs".encode("gbk")
+    with open(os.path.join(os.fsencode(repo), name), "w") as f:
+        f.write("class Role {}\n")
+    git(repo, "add", os.fsdecode(name))
+    git(repo, "commit", "-qm", "Add role", date="2026-01-05T10:00:00+08:00")
+
+    index = HistoryIndex(str(repo))
+    stats = index.update()
+    assert stats["mode"] == "full" and stats["commits"] == 5
+    assert _messages(index.query(limit=1)) == ["Add role"]
+
+
+@pytest.mark.anyio
+async def test_log_tool_uses_history_index(repo, git):
+    context = types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(repo)}]})
+    hero = str(repo / "Assets" / "Scripts" / "Hero.cs")
+
+    # Without an index the filters run through git log
+    fallback = await get_git_log_tool(path=hero, tool_context=context, limit=10, since="2026-01-02")
+    assert [c["message"] for c in fallback["commits"]] == ["修复 hero hp"]
+
+    HistoryIndex(str(repo)).update()
+    indexed = await get_git_log_tool(path=hero, tool_context=context, limit=10, since="2026-01-02")
+    assert indexed == fallback
+
+    expected = git(repo, "log", "-n", "10", "--pretty=format:%h|%an|%ad|%s").splitlines()
+    result = await get_git_log_tool(tool_context=context, limit=10)
+    assert [f"{c['hash']}|{c['author']}|{c['date']}|{c['message']}" for c in result["commits"]] == expected
+
+    # The author filter matches the same commits with and without the index
+    by_author = await get_git_log_tool(tool_context=context, limit=10, author="LISI", since="2026-01-01")
+    assert [c["message"] for c in by_author["commits"]] == ["Add skill"]
+    os.remove(HistoryIndex(str(repo)).db_path)
+    assert await get_git_log_tool(tool_context=context, limit=10, author="LISI", since="2026-01-01") == by_author
+
+    bad = await get_git_log_tool(tool_context=context, since="last week")
+    assert bad["status"] == "error"
@@ -0,0 +1,91 @@
+import subprocess
+import types
+import pytest
+
+from bug_sleuth.indexer.vcs import get_working_copy_marker
+from bug_sleuth.shared_libraries import result_cache
+from bug_sleuth.shared_libraries.result_cache import ResultCache, cached_search
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = ResultCache()
+    monkeypatch.setattr(result_cache, "_search_cache", cache)
+    return cache
+
+
+def test_lru_evicts_by_size():
+    cache = ResultCache(max_bytes=150)  # three 44-byte entries
+    repos = (("/repo", "r1"),)
+    for i in range(3):
+        cache.put(("q", i), repos, {"output": "x" * 30})
+    cache.get(("q", 0), repos)  # 0 becomes most recently used
+    cache.put(("q", 3), repos, {"output": "x" * 30})
+
+    assert cache.get(("q", 1), repos) is None
+    assert cache.get(("q", 0), repos) == {"output": "x" * 30}
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= 150
+
+
+def test_revision_change_invalidates_repo_entries():
+    cache = ResultCache()
+    cache.put("a", (("/repo", "r1"),), {"n": 1})
+    cache.put("b", (("/other", "x"),), {"n": 2})
+
+    assert cache.get("a", (("/repo", "r2"),)) is None
+    assert cache.stats()["invalidations"] == 1
+    # Entries of other repositories survive
+    assert cache.get("b", (("/other", "x"),)) == {"n": 2}
+
+
+def test_expired_entries_miss(monkeypatch):
+    cache = ResultCache(ttl=10)
+    clock = [1000.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: clock[0])
+    cache.put("a", (), {"n": 1})
+    clock[0] += 11
+    assert cache.get("a", ()) is None
+
+
+@pytest.mark.anyio
+async def test_cached_search_decorator(tmp_path, fresh_cache):
+    calls = []
+
+    @cached_search(ignore_case=("name",))
+    async def fake_tool(name: str, tool_context, flag: bool = False) -> dict:
+        calls.append(name)
+        if name == "partial":
+            return {"status": "success", "timed_out": True}
+        return {"status": "success", "output": name}
+
+    context = types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(tmp_path)}]})
+
+    first = await fake_tool(name="Hero", tool_context=context)
+    first["output"] = "mutated by caller"
+    second = await fake_tool(name=" hero ", tool_context=context)
+    assert second == {"status": "success", "output": "Hero"}
+    await fake_tool(name="Hero", tool_context=context, flag=True)
+    # Partial results are not cached
+    await fake_tool(name="partial", tool_context=context)
+    await fake_tool(name="partial", tool_context=context)
+
+    assert calls == ["Hero", "Hero", "partial", "partial"]
+    assert fresh_cache.stats()["hits"] == 1
+
+
+def test_git_working_copy_marker_moves_with_commits(tmp_path):
+    def git(*args):
+        subprocess.run(["git", "-c", "user.email=a@b", "-c", "user.name=a", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    assert get_working_copy_marker(str(tmp_path)) is None
+    git("init", "-q")
+    (tmp_path / "a.txt").write_text("1", encoding="utf-8")
+    git("add", "a.txt")
+    git("commit", "-qm", "one")
+    before = get_working_copy_marker(str(tmp_path))
+    (tmp_path / "a.txt").write_text("2", encoding="utf-8")
+    git("commit", "-qam", "two")
+    assert get_working_copy_marker(str(tmp_path)) != before
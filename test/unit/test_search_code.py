@@ -0,0 +1,88 @@
+import shutil
+import types
+import pytest
+
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools import fanout, search_code
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.search_code import search_code_tool
+from bug_sleuth.shared_libraries import result_cache
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+pytestmark = pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep not installed")
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    # Each test searches its own tree; keep results from leaking between tests
+    monkeypatch.setattr(result_cache, "_search_cache", result_cache.ResultCache())
+
+
+def _context(repo):
+    return types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(repo)}]})
+
+
+@pytest.mark.anyio
+async def test_broad_query_stops_at_budget_and_reports_totals(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_code, "MAX_MATCHES", 10)
+    for i in range(5):
+        (tmp_path / f"F{i}.cs").write_text("\n".join(f"void Init{j}() {{ }}" for j in range(20)), encoding="utf-8")
+
+    result = await search_code_tool(query="Init", tool_context=_context(tmp_path))
+
+    assert result["status"] == "success"
+    assert result["summary"] == "Found 100 matches for 'Init' in 5 files (showing 10)."
+    assert sum(len(f["matches"]) for f in result["files"]) == 10
+    assert all(f["path"].startswith(str(tmp_path)) for f in result["files"])
+
+
+@pytest.mark.anyio
+async def test_small_query_is_not_truncated(tmp_path):
+    (tmp_path / "Shop.cs").write_text('a\nb\nvar code = "ERR_1001";\nc\n// 错误 ERR_1001\n', encoding="utf-8")
+
+    result = await search_code_tool(query="ERR_1001", tool_context=_context(tmp_path))
+
+    assert result["summary"] == "Found 2 matches for 'ERR_1001'."
+    assert f"{tmp_path / 'Shop.cs'}:\n1-a\n2-b\n3:var code" in result["output"]
+    assert "Truncated" not in result["output"]
+    assert result["files"] == [{
+        "path": str(tmp_path / "Shop.cs"),
+        "range": [1, 5],
+        "matches": [
+            {"line": 3, "column": 13, "submatches": [[12, 20]]},
+            # Columns are characters, not UTF-8 bytes
+            {"line": 5, "column": 7, "submatches": [[6, 14]]},
+        ],
+    }]
+
+    missing = await search_code_tool(query="NotThere", tool_context=_context(tmp_path))
+    assert missing["output"] == "No matches found."
+
+
+@pytest.mark.anyio
+async def test_repos_share_budget_and_definitions_rank_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_code, "MAX_MATCHES", 10)
+    big, small = tmp_path / "Big", tmp_path / "Small"
+    big.mkdir()
+    small.mkdir()
+    for i in range(5):
+        (big / f"F{i}.cs").write_text("\n".join(f"Spawn(); // {j}" for j in range(20)), encoding="utf-8")
+    (small / "Use.cs").write_text("Spawn();\n", encoding="utf-8")
+    (small / "Def.cs").write_text("public class Spawn { }\n", encoding="utf-8")
+    context = types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(big)}, {"path": str(small)}]})
+
+    result = await search_code_tool(query="Spawn", tool_context=context)
+
+    paths = [f["path"] for f in result["files"]]
+    # The huge primary repo does not crowd out the second one, and the definition comes first
+    assert paths[0] == str(small / "Def.cs")
+    assert str(small / "Use.cs") in paths
+    assert sum(len(f["matches"]) for f in result["files"]) <= 10
+    assert result["summary"] == "Found 102 matches for 'Spawn' in 7 files (showing 10)."
+
+
+def test_select_ranked_guarantees_each_repo_a_share():
+    # repo 0 ranks best everywhere but may only take half of the budget in the first pass;
+    # the leftover goes to the best remaining items
+    ranked = [(0, 3, 0), (0, 3, 0), (0, 3, 0), (1, 2, 0), (1, 2, 0)]
+    assert fanout.select_ranked(ranked, 2, 10) == [(0, 3), (1, 3), (3, 2), (4, 2)]
+    # The char budget takes partial entries pro rata
+    assert fanout.select_ranked([(0, 4, 400), (1, 4, 400)], 2, 10, max_chars=600) == [(0, 4), (1, 2)]
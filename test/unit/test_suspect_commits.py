@@ -0,0 +1,117 @@
+import sys
+import types
+import pytest
+
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools import suspect_commits
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.suspect_commits import rank_suspect_commits_tool
+from bug_sleuth.indexer.builder import index_repository
+from bug_sleuth.indexer.svn_log_mirror import SvnLogMirror
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+HERO = """namespace Game
+{
+    public class Hero
+    {
+        public void Run()
+        {
+            speed = 1;
+        }
+
+        public void Explode()
+        {
+            hp = 0;
+        }
+    }
+}
+"""
+
+ENEMY = """namespace Game
+{
+    public class Enemy
+    {
+        public void Hit(Hero hero)
+        {
+            hero.Run();
+        }
+    }
+}
+"""
+
+
+def _commit(repo, git, message, **files):
+    for name, text in files.items():
+        (repo / name).write_text(text, encoding="utf-8")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-qm", message)
+    return git(repo, "rev-parse", "HEAD").strip()
+
+
+@pytest.mark.anyio
+async def test_commits_touching_the_suspect_rank_first(tmp_path, git):
+    git(tmp_path, "init", "-q")
+    good = _commit(tmp_path, git, "Initial", **{"Hero.cs": HERO, "Enemy.cs": ENEMY, "README.txt": "hello\n"})
+    _commit(tmp_path, git, "Faster run", **{"Hero.cs": HERO.replace("speed = 1", "speed = 2")})
+    _commit(tmp_path, git, "Explode keeps hp", **{"Hero.cs": HERO.replace("speed = 1", "speed = 2").replace("hp = 0", "hp = 1")})
+    _commit(tmp_path, git, "Docs", **{"README.txt": "hello world\n"})
+    _commit(tmp_path, git, "Enemies explode heroes", **{"Enemy.cs": ENEMY.replace("hero.Run();", "hero.Explode();")})
+    index_repository(str(tmp_path))
+
+    context = types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(tmp_path)}]})
+    result = await rank_suspect_commits_tool(good=good[:8], bad="HEAD", symbols=["Hero.Explode"], tool_context=context)
+
+    assert result["status"] == "success", result
+    assert [(c["message"], c["score"]) for c in result["suspects"]] == [
+        ("Explode keeps hp", 6),
+        ("Enemies explode heroes", 4),
+        ("Faster run", 2),
+    ]
+    assert result["suspects"][0]["reasons"][0] == "edits Explode (Hero.cs:10-13)"
+    assert "diff mentions Explode" in result["suspects"][1]["reasons"]
+    assert result["summary"].startswith("Scanned 4 commits")
+    assert {f["path"]: f["commits"] for f in result["touched_files"]} == {"Hero.cs": 2, "Enemy.cs": 1, "README.txt": 1}
+
+    by_file = await rank_suspect_commits_tool(good=good, bad="HEAD", files=["README.txt"], tool_context=context)
+    assert [c["message"] for c in by_file["suspects"]] == ["Docs"]
+
+    unknown = await rank_suspect_commits_tool(good="nope", bad="HEAD", files=["Hero.cs"], tool_context=context)
+    assert unknown["status"] == "error" and "nope" in unknown["error"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Fake svn client is a shebang script")
+@pytest.mark.anyio
+async def test_svn_range_is_read_from_the_mirror(working_copy, fake_svn):
+    context = types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(working_copy), "vcs": "svn"}]})
+    SvnLogMirror(str(working_copy), "file:///repo").sync()
+    calls = len(fake_svn())
+
+    result = await rank_suspect_commits_tool(
+        good="280", bad="300", files=["Assets/File3.cs"], tool_context=context,
+    )
+
+    assert result["status"] == "success", result
+    # File{rev % 7}.cs: r283, r290 and r297 touch File3.cs
+    assert [(c["revision"], c["score"]) for c in result["suspects"]] == [("297", 5), ("290", 5), ("283", 5)]
+    assert result["suspects"][0]["files"] == ["Assets/File3.cs"]
+    assert result["summary"].startswith("Scanned 20 commits")
+    assert len(fake_svn()) == calls
+
+    live = await rank_suspect_commits_tool(good="300", bad="HEAD", files=["File3.cs"], tool_context=context)
+    assert live["status"] == "error"
+
+    swapped = await rank_suspect_commits_tool(good="300", bad="280", files=["File3.cs"], tool_context=context)
+    assert swapped["status"] == "error" and "older" in swapped["error"]
+    assert len(fake_svn()) == calls
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Fake svn client is a shebang script")
+@pytest.mark.anyio
+async def test_svn_range_without_mirror_reads_only_the_newest_revisions(working_copy, fake_svn, monkeypatch):
+    context = types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(working_copy), "vcs": "svn"}]})
+    monkeypatch.setattr(suspect_commits, "MAX_RANGE_COMMITS", 10)
+
+    result = await rank_suspect_commits_tool(good="100", bad="300", files=["File3.cs"], tool_context=context)
+
+    assert result["status"] == "success", result
+    assert [c["revision"] for c in result["suspects"]] == ["297"]
+    assert "only the newest 10 revisions" in result["summary"]
+    assert fake_svn() == ["log --xml -v --non-interactive -r 291:300 file:///repo"]
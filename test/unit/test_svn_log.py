@@ -0,0 +1,135 @@
+import sys
+import types
+import pytest
+
+from bug_sleuth.bug_scene_app.bug_analyze_agent.tools.svn import get_svn_log_tool
+from bug_sleuth.indexer.svn_log_mirror import SvnLogMirror, read_svn_info
+from bug_sleuth.shared_libraries.state_keys import StateKeys
+
+
+def _context(tmp_path):
+    return types.SimpleNamespace(state={StateKeys.REPO_REGISTRY: [{"path": str(tmp_path)}]})
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Fake svn client is a shebang script")
+@pytest.mark.anyio
+async def test_author_filter_is_searched_by_svn(tmp_path, fake_svn):
+    result = await get_svn_log_tool(tool_context=_context(tmp_path), author="lisi", limit=3, verbose=True)
+
+    # "fix for lisi" (r450) matches --search but is not by lisi; r300 is past the first window
+    assert [c["revision"] for c in result["commits"]] == ["500", "400", "300"]
+    assert result["commits"][0]["paths"] == ["M /trunk/Assets/File3.cs"]
+    assert fake_svn() == [
+        "log --xml -l 1",
+        "log --xml -v --search lisi -r 500:301",
+        "log --xml -v --search lisi -r 300:101",
+    ]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Fake svn client is a shebang script")
+@pytest.mark.anyio
+async def test_search_pages_until_history_is_exhausted(tmp_path, fake_svn):
+    result = await get_svn_log_tool(tool_context=_context(tmp_path), search="change 10?", limit=20)
+
+    # Only r100-r109 match, all below the newest SVN_LOG_PAGE_SIZE revisions
+    assert [c["revision"] for c in result["commits"]] == [str(r) for r in range(109, 99, -1)]
+    assert fake_svn()[1:] == [
+        "log --xml --search change 10? -r 500:301",
+        "log --xml --search change 10? -r 300:101",
+        "log --xml --search change 10? -r 100:1",
+    ]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Fake svn client is a shebang script")
+@pytest.mark.anyio
+async def test_old_client_pages_through_history(tmp_path, fake_svn, monkeypatch):
+    monkeypatch.setenv("FAKE_SVN_OLD", "1")
+
+    result = await get_svn_log_tool(tool_context=_context(tmp_path), author="lisi", limit=4)
+
+    assert [c["revision"] for c in result["commits"]] == ["500", "400", "300", "200"]
+    assert "paths" not in result["commits"][0]
+    assert fake_svn() == [
+        "log --xml -l 1",
+        "log --xml --search lisi -r 500:301",
+        "log --xml -l 200",
+        "log --xml -l 200 -r 300:1",
+    ]
+
+    result = await get_svn_log_tool(tool_context=_context(tmp_path), search="file6", limit=2)
+    assert [c["revision"] for c in result["commits"]] == ["496", "489"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Fake svn client is a shebang script")
+@pytest.mark.anyio
+async def test_unfiltered_log_reads_one_page(tmp_path, fake_svn):
+    result = await get_svn_log_tool(tool_context=_context(tmp_path), limit=2)
+
+    assert [c["message"] for c in result["commits"]] == ["change 500", "change 499"]
+    assert fake_svn() == ["log --xml -l 2"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Fake svn client is a shebang script")
+def test_mirror_fetches_only_newer_revisions(working_copy, fake_svn, monkeypatch):
+    info = read_svn_info(str(working_copy / "Assets" / "File3.cs"))
+    assert info.path == "/trunk/Assets/File3.cs" and info.root_url == "file:///repo"
+
+    mirror = SvnLogMirror(info.wc_root, info.root_url)
+    assert mirror.sync() == {"added": 300, "last_revision": 300}
+    monkeypatch.setenv("FAKE_SVN_HEAD", "310")
+    assert mirror.sync() == {"added": 10, "last_revision": 310}
+    assert mirror.sync() == {"added": 0, "last_revision": 310}
+    assert fake_svn()[-2:] == [
+        "log --xml -v --non-interactive -r 301:HEAD file:///repo",
+        "log --xml -v --non-interactive -r 311:HEAD file:///repo",
+    ]
+
+    assert [e.revision for e in mirror.query(info.path, limit=3)] == [304, 297, 290]
+    assert [e.revision for e in mirror.query("/trunk/Assets", author="lisi", limit=5)] == [300, 200, 100]
+    assert [e.revision for e in mirror.query("/trunk/Assets/File", limit=5)] == []
+    assert [e.revision for e in mirror.query(search="CHANGE 30?", max_revision=305, limit=3)] == [305, 304, 303]
+    assert mirror.query(author="lisi", limit=1, with_paths=True)[0].paths == [("M", "/trunk/Assets/File6.cs")]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Fake svn client is a shebang script")
+def test_mirror_follows_branch_copy(working_copy, fake_svn, monkeypatch):
+    monkeypatch.setenv("FAKE_SVN_BRANCH", "250")
+    info = read_svn_info(str(working_copy / "Assets" / "File3.cs"))
+    assert info.path == "/branches/b/Assets/File3.cs"
+    mirror = SvnLogMirror(info.wc_root, info.root_url)
+    mirror.sync()
+
+    # The branch's own changes, the copy that created it, then trunk's history up to the copy source
+    history = mirror.query(info.path, limit=12, with_paths=True)
+    assert [e.revision for e in history] == [297, 290, 283, 276, 269, 262, 255, 250, 248, 241, 234, 227]
+    assert history[7].paths == [("A", "/branches/b")]
+    assert history[8].paths == [("M", "/trunk/Assets/File3.cs")]
+    assert [e.revision for e in mirror.query("/branches/b/Assets", author="lisi", limit=5)] == [300, 200, 100]
+    # Trunk is not followed into the branch
+    assert [e.revision for e in mirror.query("/trunk/Assets/File3.cs", limit=2)] == [248, 241]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Fake svn client is a shebang script")
+@pytest.mark.anyio
+async def test_log_tool_answers_from_mirror(working_copy, fake_svn, monkeypatch):
+    context = _context(working_copy)
+    hero = str(working_copy / "Assets" / "File3.cs")
+
+    # No mirror yet: svn log answers while the mirror syncs in the background
+    result = await get_svn_log_tool(path=hero, tool_context=context, limit=2)
+    assert [c["revision"] for c in result["commits"]] == ["300", "299"]
+    mirror = SvnLogMirror(str(working_copy), "file:///repo")
+    SvnLogMirror._syncing[mirror.db_path].join()
+    assert mirror.last_revision() == 300
+
+    calls = len(fake_svn())
+    result = await get_svn_log_tool(path=hero, tool_context=context, limit=2, verbose=True)
+    assert [c["revision"] for c in result["commits"]] == ["297", "290"]
+    assert result["commits"][0]["paths"] == ["M /trunk/Assets/File3.cs"]
+    assert len(fake_svn()) == calls
+
+    # After `svn update`, only the new revisions are fetched
+    monkeypatch.setenv("FAKE_SVN_HEAD", "320")
+    result = await get_svn_log_tool(path=hero, tool_context=context, limit=1)
+    assert [c["revision"] for c in result["commits"]] == ["318"]
+    assert fake_svn()[calls:] == ["log --xml -v --non-interactive -r 301:320 file:///repo"]
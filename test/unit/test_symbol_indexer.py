@@ -0,0 +1,290 @@
+import os
+import importlib.util
+import shutil
+import sqlite3
+import pytest
+
+from bug_sleuth.indexer.parsers import extract_file, extract_symbols
+from bug_sleuth.indexer.builder import index_repository
+from bug_sleuth.indexer.symbol_index import SymbolIndex, search_symbols, has_fts
+from bug_sleuth.indexer.trigram_index import TrigramIndex
+
+requires_git = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _symbols(repo):
+    conn = sqlite3.connect(SymbolIndex(str(repo)).db_path)
+    try:
+        return sorted(conn.execute("SELECT name, type, file_path FROM symbols").fetchall())
+    finally:
+        conn.close()
+
+
+def test_extract_csharp_symbols():
+    code = b"""
+namespace Game {
+    public class BattleManager {
+        public int round, turn;
+        public string Name { get; set; }
+        public BattleManager() { }
+        void Explode(int radius) { }
+        enum Phase { Start, End }
+    }
+}
+"""
+    symbols = {(s.name, s.type, s.parent) for s in extract_symbols("Scripts/BattleManager.cs", code)}
+    assert ("BattleManager", "class", "") in symbols
+    assert ("round", "field", "BattleManager") in symbols
+    assert ("turn", "field", "BattleManager") in symbols
+    assert ("Name", "property", "BattleManager") in symbols
+    assert ("Explode", "method", "BattleManager") in symbols
+    assert ("Phase", "enum", "BattleManager") in symbols
+    assert ("Start", "enum_member", "Phase") in symbols
+
+    explode = next(s for s in extract_symbols("a.cs", code) if s.name == "Explode")
+    assert explode.start_line == 7 and explode.end_line == 7
+
+
+def test_extract_csharp_references():
+    code = b"""class BattleManager : MonoBehaviour {
+    int hp = MaxHp();
+    void Update() {
+        Explode(3);
+        Explode(4); var fx = new Effect();
+    }
+    void Explode(int radius) { Log(radius); }
+}
+"""
+    refs = {(r.name, r.line, r.enclosing) for r in extract_file("Battle.cs", code).refs}
+    assert ("Explode", 4, "BattleManager.Update") in refs
+    assert ("Explode", 5, "BattleManager.Update") in refs
+    assert ("Effect", 5, "BattleManager.Update") in refs
+    assert ("MaxHp", 2, "BattleManager") in refs
+    assert ("MonoBehaviour", 1, "BattleManager") in refs
+    assert ("radius", 7, "BattleManager.Explode") in refs
+    # Declared names are not references
+    assert not any(name == "Explode" and line == 7 for name, line, _ in refs)
+    assert not any(name in ("hp", "fx", "Update", "BattleManager") for name, _, _ in refs)
+
+
+def _requires_grammar(module):
+    return pytest.mark.skipif(importlib.util.find_spec(module) is None, reason=f"{module} not installed")
+
+
+@_requires_grammar("tree_sitter_lua")
+def test_extract_lua_symbols():
+    code = b"""local M = {}
+function M.Init(a) end
+function M:OnHit() end
+local function helper() end
+M.Reset = function() end
+local Cfg = { onLoad = function() end }
+return M
+"""
+    symbols = {(s.name, s.type, s.parent) for s in extract_symbols("Lua/battle.lua", code)}
+    assert symbols == {
+        ("M", "table", ""), ("Init", "function", "M"), ("OnHit", "function", "M"),
+        ("helper", "function", ""), ("Reset", "function", "M"),
+        ("Cfg", "table", ""), ("onLoad", "function", "Cfg"),
+    }
+
+
+@_requires_grammar("tree_sitter_cpp")
+def test_extract_cpp_symbols():
+    code = b"""#define MAX_HP 100
+namespace game {
+class Actor {
+public:
+    Actor();
+    void Tick(float dt);
+    int hp;
+    enum State { Idle, Dead };
+};
+void Actor::Tick(float dt) { int local = 0; }
+typedef int ActorId;
+}
+"""
+    symbols = {(s.name, s.type, s.parent) for s in extract_symbols("Engine/Actor.h", code)}
+    assert ("MAX_HP", "macro", "") in symbols
+    assert ("game", "namespace", "") in symbols
+    assert ("Actor", "class", "game") in symbols
+    assert ("Tick", "method", "Actor") in symbols
+    assert ("hp", "field", "Actor") in symbols
+    assert ("Dead", "enum_member", "State") in symbols
+    assert ("ActorId", "typedef", "game") in symbols
+    assert not any(name == "local" for name, _, _ in symbols)
+
+    macro = next(s for s in extract_symbols("a.h", code) if s.name == "MAX_HP")
+    assert macro.start_line == 1 and macro.end_line == 1
+
+
+@_requires_grammar("tree_sitter_python")
+def test_extract_python_symbols():
+    code = b"""MAX = 3
+class Tool(Base):
+    name = "x"
+    def run(self):
+        value = 1
+def main(): pass
+"""
+    symbols = {(s.name, s.type, s.parent) for s in extract_symbols("tools/tool.py", code)}
+    assert symbols == {
+        ("MAX", "variable", ""), ("Tool", "class", ""), ("name", "field", "Tool"),
+        ("run", "method", "Tool"), ("main", "function", ""),
+    }
+
+
+def test_extract_config_keys():
+    json_code = b'{\n  "1001": {\n    "name": "Sword"\n  },\n  "1002": 5\n}\n'
+    assert [(s.name, s.start_line, s.end_line) for s in extract_symbols("Config/items.json", json_code)] == [
+        ("1001", 2, 4), ("1002", 5, 5),
+    ]
+    assert extract_symbols("rows.json", b'[{"a": 1}]') == []
+
+    xml_code = b'<Items>\n  <Item Id="Sword">\n    <Stat/>\n  </Item>\n  <Shield/>\n</Items>\n'
+    assert [(s.name, s.parent, s.start_line, s.end_line) for s in extract_symbols("Config/items.xml", xml_code)] == [
+        ("Sword", "Items", 2, 4), ("Shield", "Items", 5, 5),
+    ]
+
+
+def test_unsupported_file_has_no_symbols():
+    assert extract_symbols("readme.md", b"# class Foo") == []
+
+
+@requires_git
+def test_incremental_index_follows_git_changes(tmp_path, git):
+    repo = tmp_path
+    git(repo, "init", "-q")
+    (repo / "A.cs").write_text("class Alpha { void Run() {} }", encoding="utf-8")
+    (repo / "B.cs").write_text("class Beta { }", encoding="utf-8")
+    git(repo, "add", ".")
+    git(repo, "commit", "-qm", "init")
+
+    first = index_repository(str(repo))
+    assert first["mode"] == "full"
+    assert ("Alpha", "class", "A.cs") in _symbols(repo)
+
+    # Commit a change, delete a file, and leave an uncommitted new file
+    (repo / "A.cs").write_text("class AlphaRenamed { }", encoding="utf-8")
+    os.remove(repo / "B.cs")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-qm", "change")
+    (repo / "C.cs").write_text("class Gamma { }", encoding="utf-8")
+
+    second = index_repository(str(repo))
+    assert second["mode"] == "incremental"
+    assert second["symbols"]["parsed"] == 2  # A.cs and C.cs only
+    assert _symbols(repo) == [("AlphaRenamed", "class", "A.cs"), ("Gamma", "class", "C.cs")]
+    assert TrigramIndex(str(repo)).candidates("Gamma") == [str(repo / "C.cs")]
+    assert TrigramIndex(str(repo)).candidates("Beta") == []
+
+    # A previously uncommitted file that is removed again must drop out of the index
+    os.remove(repo / "C.cs")
+    third = index_repository(str(repo))
+    assert third["mode"] == "incremental"
+    assert _symbols(repo) == [("AlphaRenamed", "class", "A.cs")]
+
+
+def test_parallel_parse_matches_serial(tmp_path):
+    for i in range(450):
+        (tmp_path / f"C{i}.cs").write_text(f"class C{i} {{ void M{i}() {{}} }}", encoding="utf-8")
+    files = [f"C{i}.cs" for i in range(450)]
+
+    progress = []
+    parallel = SymbolIndex(str(tmp_path)).rebuild(
+        files, {"revision": ""}, workers=2,
+        on_progress=lambda done, total, nbytes, elapsed: progress.append((done, total)),
+    )
+    assert parallel["parsed"] == 450
+    assert parallel["symbols"] == 900
+    assert parallel["bytes"] > 0 and "files_per_sec" in parallel and "mb_per_sec" in parallel
+    assert progress[-1] == (450, 450)
+    assert len(_symbols(tmp_path)) == 900
+
+    serial = SymbolIndex(str(tmp_path)).rebuild(files, {"revision": ""}, workers=1)
+    assert serial["symbols"] == 900
+    assert len(_symbols(tmp_path)) == 900
+
+
+def _insert(conn, *names):
+    conn.executemany(
+        "INSERT INTO symbols (name, type, file_path, start_line, end_line) VALUES (?, 'class', ?, 1, 1)",
+        [(n, f"{n}.cs") for n in names],
+    )
+    conn.commit()
+
+
+def test_search_ranks_exact_prefix_substring(tmp_path):
+    conn = SymbolIndex(str(tmp_path)).connect()
+    try:
+        _insert(conn, "UIBattleManager", "BattleManagerExt", "BattleManager", "Shop", "Foo_Bar", "FooXBar")
+        found = [(r["name"], r["match"]) for r in search_symbols(conn, "battlemanager")]
+        assert found == [("BattleManager", "exact"), ("BattleManagerExt", "prefix"), ("UIBattleManager", "substring")]
+        # LIKE wildcards in the query are literal
+        assert [r["name"] for r in search_symbols(conn, "Foo_")] == ["Foo_Bar"]
+        assert [r["name"] for r in search_symbols(conn, "anager", limit=1)] == ["BattleManager"]
+        # Short queries cannot use the trigram index and fall back to LIKE
+        assert [r["name"] for r in search_symbols(conn, "ho")] == ["Shop"]
+
+        conn.execute("DELETE FROM symbols WHERE name = 'UIBattleManager'")
+        conn.commit()
+        assert [r["name"] for r in search_symbols(conn, "attleMan")] == ["BattleManager", "BattleManagerExt"]
+    finally:
+        conn.close()
+
+
+def test_connect_migrates_database_without_fts(tmp_path):
+    index = SymbolIndex(str(tmp_path))
+    os.makedirs(os.path.dirname(index.db_path))
+    old = sqlite3.connect(index.db_path)
+    old.executescript(
+        "CREATE TABLE symbols (id INTEGER PRIMARY KEY, name TEXT NOT NULL, type TEXT NOT NULL, "
+        "file_path TEXT NOT NULL, start_line INTEGER NOT NULL, end_line INTEGER NOT NULL);"
+        "CREATE INDEX idx_symbols_name ON symbols(name);"
+        "INSERT INTO symbols (name, type, file_path, start_line, end_line) VALUES ('PlayerController', 'class', 'P.cs', 1, 9);"
+    )
+    old.commit()
+    old.close()
+
+    index.connect().close()
+    conn = sqlite3.connect(index.db_path)
+    try:
+        assert has_fts(conn)
+    finally:
+        conn.close()
+    assert [(r["name"], r["match"]) for r in index.search("Controller")] == [("PlayerController", "substring")]
+
+
+def test_connect_adds_language_column_to_old_database(tmp_path):
+    index = SymbolIndex(str(tmp_path))
+    os.makedirs(os.path.dirname(index.db_path))
+    old = sqlite3.connect(index.db_path)
+    old.executescript(
+        "CREATE TABLE symbols (id INTEGER PRIMARY KEY, name TEXT NOT NULL, type TEXT NOT NULL, "
+        "file_path TEXT NOT NULL, start_line INTEGER NOT NULL, end_line INTEGER NOT NULL, "
+        "parent TEXT NOT NULL DEFAULT '');"
+        "INSERT INTO symbols (name, type, file_path, start_line, end_line) VALUES ('Hero', 'class', 'H.cs', 1, 9);"
+    )
+    old.commit()
+    old.close()
+
+    index.connect().close()
+    assert [(r["name"], r["language"]) for r in index.search("Hero")] == [("Hero", "csharp")]
+
+
+def test_find_references_from_index(tmp_path):
+    (tmp_path / "A.cs").write_text("class A { void Run() { Helper.Go(); } }", encoding="utf-8")
+    (tmp_path / "B.cs").write_text("class B {\n void Tick() {\n  Helper.Go();\n }\n}", encoding="utf-8")
+    index = SymbolIndex(str(tmp_path))
+    stats = index.rebuild(["A.cs", "B.cs"], {"revision": ""})
+    assert stats["refs"] > 0
+
+    assert index.find_references("Go") == [
+        {"file": "A.cs", "line": 1, "enclosing": "A.Run"},
+        {"file": "B.cs", "line": 3, "enclosing": "B.Tick"},
+    ]
+    assert index.find_references("go") == []
+
+    (tmp_path / "B.cs").write_text("class B { }", encoding="utf-8")
+    index.update(["B.cs"], {"revision": ""})
+    assert [r["file"] for r in index.find_references("Go")] == ["A.cs"]
@@ -0,0 +1,119 @@
+import os
+import shutil
+import pytest
+
+from bug_sleuth.indexer.trigram_index import TrigramIndex, required_literals, query_trigrams
+
+
+@pytest.fixture
+def sample_repo(tmp_path):
+    """A plain (non-git) directory with a few source files."""
+    (tmp_path / "Scripts").mkdir()
+    (tmp_path / "Scripts" / "BattleManager.cs").write_text(
+        "public class BattleManager {\n    void InitPlayer() { }\n}\n", encoding="utf-8"
+    )
+    (tmp_path / "Scripts" / "Shop.cs").write_text(
+        "public class Shop {\n    // ERR_1001 when buying\n}\n", encoding="utf-8"
+    )
+    (tmp_path / "config.json").write_text('{"code": "ERR_1001"}', encoding="utf-8")
+    (tmp_path / "icon.png").write_bytes(b"\x89PNG\0\0InitPlayer")
+    return tmp_path
+
+
+def test_required_literals():
+    assert required_literals("InitPlayer") == ["InitPlayer"]
+    assert required_literals(r"ERR_10\d+") == ["ERR_10"]
+    assert required_literals(r"class\s+Battle.*Mgr") == ["class", "Battle", "Mgr"]
+    assert required_literals("colou?r") == ["colo", "r"]
+    assert required_literals(r"Foo\.Bar") == ["Foo.Bar"]
+    assert required_literals("Foo|Bar") is None
+    assert required_literals("(Init)Player") is None
+    # Escapes are skipped whole: their payload is not part of the next literal
+    assert required_literals(r"\x41BCD") == ["BCD"]
+    assert required_literals(r"\x{41}BCD") == ["BCD"]
+    assert required_literals(r"\u0041BCD") == ["BCD"]
+    assert required_literals(r"\0101abc") == ["abc"]
+    assert required_literals(r"\p{Han}abc") == ["abc"]
+    assert required_literals(r"\pLabc") == ["abc"]
+
+
+def test_query_without_long_literal_cannot_narrow():
+    assert query_trigrams("ab") is None
+    assert query_trigrams(r"\w+") is None
+
+
+def test_missing_index_returns_none(sample_repo):
+    assert TrigramIndex(str(sample_repo)).candidates("InitPlayer") is None
+
+
+def test_candidates_narrow_to_matching_files(sample_repo):
+    index = TrigramIndex(str(sample_repo))
+    stats = index.build()
+
+    assert os.path.isfile(index.db_path)
+    assert stats["skipped_binary"] == 1
+
+    # Case-insensitive narrowing (ripgrep --smart-case verifies the real match)
+    candidates = index.candidates("initplayer")
+    assert candidates == [os.path.join(str(sample_repo), "Scripts", "BattleManager.cs")]
+
+    both = index.candidates("ERR_1001")
+    assert sorted(os.path.basename(p) for p in both) == ["Shop.cs", "config.json"]
+
+    only_cs = index.candidates("ERR_1001", file_pattern="*.cs")
+    assert [os.path.basename(p) for p in only_cs] == ["Shop.cs"]
+
+    assert index.candidates("NotPresentAnywhere") == []
+
+
+def test_index_dir_is_not_indexed(sample_repo):
+    index = TrigramIndex(str(sample_repo))
+    index.build()
+    # Rebuilding must not pick up the index database itself
+    stats = index.build()
+    assert stats["files"] == 3
+
+
+def _touch_later(path):
+    """Move a file's mtime past the index's write time (coarse filesystem clocks)."""
+    mtime = os.stat(path).st_mtime_ns + 5_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_working_tree_edits_are_candidates_without_git(sample_repo):
+    index = TrigramIndex(str(sample_repo))
+    index.build()
+
+    shop = sample_repo / "Scripts" / "Shop.cs"
+    shop.write_text("public class Shop {\n    void InitPlayer() { }\n}\n", encoding="utf-8")
+    _touch_later(shop)
+    (sample_repo / "Scripts" / "Hero.cs").write_text("class Hero { }\n", encoding="utf-8")
+    os.remove(sample_repo / "Scripts" / "BattleManager.cs")
+
+    assert sorted(os.path.basename(p) for p in index.candidates("InitPlayer")) == ["Hero.cs", "Shop.cs"]
+    # The unchanged binary file is known to the index and still never searched
+    assert "icon.png" not in [os.path.basename(p) for p in index.candidates("ERR_1001")]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_working_tree_edits_are_candidates_in_git(tmp_path, git):
+    git(tmp_path, "init", "-q")
+    (tmp_path / "A.cs").write_text("class Alpha { }\n", encoding="utf-8")
+    (tmp_path / "B.cs").write_text("class Beta { Legacy l; }\n", encoding="utf-8")
+    git(tmp_path, "add", "-A")
+    git(tmp_path, "commit", "-qm", "init")
+    # B.cs is dirty when the index is built
+    (tmp_path / "B.cs").write_text("class Beta { Draft d; }\n", encoding="utf-8")
+    index = TrigramIndex(str(tmp_path))
+    index.build()
+    assert index.candidates("Gamma") == []
+
+    (tmp_path / "A.cs").write_text("class Alpha { Gamma g; }\n", encoding="utf-8")
+    _touch_later(tmp_path / "A.cs")
+    (tmp_path / "C.cs").write_text("class Gamma { }\n", encoding="utf-8")
+    assert index.candidates("Gamma") == [str(tmp_path / "A.cs"), str(tmp_path / "C.cs")]
+
+    # Reverting makes B.cs clean again, but the index still holds the draft
+    git(tmp_path, "checkout", "--", "B.cs")
+    _touch_later(tmp_path / "B.cs")
+    assert str(tmp_path / "B.cs") in index.candidates("Legacy")